@@ -0,0 +1,8 @@
+"""
+ベンチマーク
+
+実機・実サービスなしで会話パイプラインの遅延を計測するためのツール群
+- live_stub: Gemini Live APIのローカル代替サーバー
+- scenarios: スタブが再生する会話シナリオ
+- run_live_bench: GeminiRealtimeClientをスタブに接続して遅延を計測
+"""
@@ -0,0 +1,272 @@
+"""
+Gemini Live APIスタブサーバー
+
+google-genaiのLive APIクライアントが接続できる最小限のwebsocketサーバー。
+- setup → setupComplete
+- realtimeInput（音声チャンク、activityStart/activityEnd）の受信
+- clientContent（テキスト送信）の受信
+- シナリオに沿ったserverContent（音声）・toolCallの送信とtoolResponseの待ち受け
+- goAway・切断
+
+genai.ClientはAPIキー使用時にwss://で接続するため、自己署名証明書でTLSを張る。
+クライアント側はGEMINI_BASE_URL / GEMINI_CA_CERTでこのサーバーを指す。
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import re
+import ssl
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from .scenarios import Scenario, Turn
+
+logger = logging.getLogger("bench")
+
+LIVE_PATH_PREFIX = "/ws/google.ai.generativelanguage."
+RECEIVE_SAMPLE_RATE = 24000
+
+
+def _snake(key: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", key).lower()
+
+
+def _normalize(obj: Any) -> Any:
+    """キーをsnake_caseに揃える（SDKのバージョンでcamelCase/snake_caseが混在するため）"""
+    if isinstance(obj, dict):
+        return {_snake(k): _normalize(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_normalize(v) for v in obj]
+    return obj
+
+
+def generate_self_signed_cert(directory: str) -> tuple:
+    """127.0.0.1用の自己署名証明書を生成（openssl使用）
+
+    Returns:
+        (証明書パス, 秘密鍵パス)
+    """
+    cert_path = os.path.join(directory, "stub_cert.pem")
+    key_path = os.path.join(directory, "stub_key.pem")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+        "-keyout", key_path, "-out", cert_path, "-days", "1",
+        "-subj", "/CN=localhost",
+        "-addext", "subjectAltName=IP:127.0.0.1,DNS:localhost",
+    ], check=True, capture_output=True)
+    return cert_path, key_path
+
+
+@dataclass
+class StubEvent:
+    """スタブで観測したイベント（perf_counter基準の時刻）"""
+    kind: str
+    t: float
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+class LiveStubServer:
+    """Gemini Live APIスタブサーバー"""
+
+    def __init__(self, scenario: Scenario, host: str = "127.0.0.1", port: int = 0,
+                 model_delay_ms: Optional[int] = None, loop: bool = False):
+        self.scenario = scenario
+        self.loop = loop  # シナリオの最後まで進んだら先頭から繰り返す（ソークテスト用）
+        self.host = host
+        self.port = port
+        self.model_delay_ms = model_delay_ms  # 指定時は全ターンの first_delay_ms を上書き
+
+        self.events: List[StubEvent] = []
+        self._next_turn = 0
+        self._server = None
+        self._tmpdir: Optional[tempfile.TemporaryDirectory] = None
+        self.cert_path: Optional[str] = None
+        self._connection_seq = 0
+        self._tool_waiters: Dict[int, asyncio.Future] = {}
+
+    @property
+    def base_url(self) -> str:
+        return f"https://{self.host}:{self.port}"
+
+    def _record(self, kind: str, **data) -> None:
+        self.events.append(StubEvent(kind, time.perf_counter(), data))
+
+    def events_of(self, kind: str) -> List[StubEvent]:
+        return [e for e in self.events if e.kind == kind]
+
+    async def start(self) -> None:
+        """サーバー起動"""
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="live_stub_")
+        self.cert_path, key_path = generate_self_signed_cert(self._tmpdir.name)
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(self.cert_path, key_path)
+
+        self._server = await serve(self._handle, self.host, self.port, ssl=ssl_context,
+                                   max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Live APIスタブ起動: {self.base_url} ({self.scenario.name})")
+
+    async def stop(self) -> None:
+        """サーバー停止"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._tmpdir:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+
+    def _take_turn(self) -> Optional[Turn]:
+        if self._next_turn >= len(self.scenario.turns):
+            if not self.loop or not self.scenario.turns:
+                return None
+            self._next_turn = 0
+        turn = self.scenario.turns[self._next_turn]
+        self._next_turn += 1
+        return turn
+
+    async def _handle(self, ws) -> None:
+        """1接続分の処理"""
+        if not ws.request.path.startswith(LIVE_PATH_PREFIX):
+            await ws.close(1008, "unknown path")
+            return
+
+        self._connection_seq += 1
+        conn_id = self._connection_seq
+        turn_task: Optional[asyncio.Task] = None
+
+        try:
+            setup = _normalize(json.loads(await ws.recv())).get("setup", {})
+            tools = [
+                decl.get("name")
+                for tool in setup.get("tools", [])
+                for decl in tool.get("function_declarations", [])
+            ]
+            self._record("setup", conn=conn_id, tool_count=len(tools), tools=tools)
+            await ws.send(json.dumps({"setupComplete": {}}))
+
+            audio_chunks = 0
+            async for raw in ws:
+                message = _normalize(json.loads(raw))
+
+                realtime_input = message.get("realtime_input")
+                if realtime_input:
+                    if "activity_start" in realtime_input:
+                        audio_chunks = 0
+                        self._record("activity_start", conn=conn_id)
+                    if realtime_input.get("audio") or realtime_input.get("media_chunks"):
+                        audio_chunks += 1
+                    if "activity_end" in realtime_input:
+                        self._record("activity_end", conn=conn_id, audio_chunks=audio_chunks)
+                        turn_task = self._start_turn(ws, conn_id)
+
+                client_content = message.get("client_content")
+                if client_content and client_content.get("turn_complete"):
+                    self._record("client_content", conn=conn_id)
+                    turn_task = self._start_turn(ws, conn_id)
+
+                if "tool_response" in message:
+                    self._record("tool_response", conn=conn_id)
+                    waiter = self._tool_waiters.pop(conn_id, None)
+                    if waiter is not None and not waiter.done():
+                        waiter.set_result(message["tool_response"])
+
+        except ConnectionClosed:
+            pass
+        finally:
+            self._record("closed", conn=conn_id)
+            self._tool_waiters.pop(conn_id, None)
+            if turn_task and not turn_task.done():
+                turn_task.cancel()
+
+    def _start_turn(self, ws, conn_id: int) -> Optional[asyncio.Task]:
+        turn = self._take_turn()
+        if turn is None:
+            logger.warning("シナリオのターンが残っていません")
+            return None
+        return asyncio.create_task(self._play_turn(ws, conn_id, turn))
+
+    async def _play_turn(self, ws, conn_id: int, turn: Turn) -> None:
+        """1ターン分の応答を送信"""
+        try:
+            if turn.tool_calls:
+                waiter = asyncio.get_running_loop().create_future()
+                self._tool_waiters[conn_id] = waiter
+                calls = [
+                    {"id": f"call-{conn_id}-{i}", "name": tc.name, "args": tc.args}
+                    for i, tc in enumerate(turn.tool_calls)
+                ]
+                self._record("tool_call", conn=conn_id, names=[c["name"] for c in calls])
+                await ws.send(json.dumps({"toolCall": {"functionCalls": calls}}))
+                # ツール拡張ではこの接続に応答が来ないまま閉じられる
+                await waiter
+
+            delay_ms = self.model_delay_ms if self.model_delay_ms is not None else turn.first_delay_ms
+            if delay_ms:
+                await asyncio.sleep(delay_ms / 1000)
+
+            samples = RECEIVE_SAMPLE_RATE * turn.chunk_ms // 1000
+            chunk = base64.b64encode(b"\x00\x00" * samples).decode("ascii")
+            for i in range(turn.audio_chunks):
+                if i == 0:
+                    self._record("first_audio", conn=conn_id)
+                await ws.send(json.dumps({"serverContent": {"modelTurn": {"parts": [{
+                    "inlineData": {"mimeType": f"audio/pcm;rate={RECEIVE_SAMPLE_RATE}", "data": chunk}
+                }]}}}))
+
+            await ws.send(json.dumps({"serverContent": {"turnComplete": True}}))
+            self._record("turn_complete", conn=conn_id)
+
+            if turn.close_after:
+                await ws.send(json.dumps({"goAway": {"timeLeft": "0s"}}))
+                self._record("go_away", conn=conn_id)
+                await ws.close(1000, "session end")
+
+        except (ConnectionClosed, asyncio.CancelledError):
+            pass
+
+
+async def _serve_forever(args) -> None:
+    from .scenarios import SCENARIOS
+
+    server = LiveStubServer(SCENARIOS[args.scenario], host=args.host, port=args.port,
+                            model_delay_ms=args.model_delay_ms, loop=True)
+    await server.start()
+    print(f"GEMINI_BASE_URL={server.base_url}")
+    print(f"GEMINI_CA_CERT={server.cert_path}", flush=True)
+    try:
+        await asyncio.Future()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    """スタブを単体で起動（main.py --simulate と組み合わせる）"""
+    import argparse
+    from .scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(description="Gemini Live APIスタブサーバー")
+    parser.add_argument("-s", "--scenario", default="conversation", choices=sorted(SCENARIOS))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--model-delay-ms", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(name)s | %(message)s")
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
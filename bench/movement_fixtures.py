@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+移動検知のラベル付きフィクスチャ
+
+乱数シードから部屋の画像を合成し、「同じ場所（移動していない）」と
+「別の場所（移動した）」の画像ペアをJPEGで書き出す。シードが同じなら毎回同じ画像になる。
+
+移動していない（moved=false）: 同じ部屋で
+- shift: 小さな首振り（画角の数%）
+- lighting: 照明の明るさ・色温度の変化
+- noise: 暗所ノイズ
+- person: 人が横切る
+- blur: 手ぶれ
+- mixed: 上の組み合わせ
+移動した（moved=true）:
+- room: 別の部屋
+- similar_room: 壁・床の色が同じ別の部屋
+- outdoor: 屋外
+
+書き出し先には labels.json（[{before, after, moved, kind}, ...]）を置く。
+実機で撮った写真も同じ形式で置けばベンチマークに使える。
+
+使い方:
+    python -m bench.movement_fixtures -o /tmp/movement_fixtures
+"""
+
+import argparse
+import json
+import os
+import random
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+WIDTH, HEIGHT = 1280, 960
+MARGIN = 0.15  # 首振り用に画角の外側も描いておく割合
+
+NOT_MOVED_KINDS = ("shift", "lighting", "noise", "person", "blur", "mixed")
+MOVED_KINDS = ("room", "similar_room", "outdoor")
+
+
+def _color(rng: random.Random, base=None, spread: int = 60) -> Tuple[int, int, int]:
+    if base is None:
+        return tuple(rng.randint(30, 225) for _ in range(3))
+    return tuple(max(0, min(255, c + rng.randint(-spread, spread))) for c in base)
+
+
+def _room(seed: int, wall=None, floor=None) -> Image.Image:
+    """部屋（壁・床・家具）を画角より広く描く"""
+    rng = random.Random(seed)
+    width = int(WIDTH * (1 + 2 * MARGIN))
+    height = int(HEIGHT * (1 + 2 * MARGIN))
+    wall = wall or _color(rng)
+    floor = floor or _color(rng)
+
+    image = Image.new("RGB", (width, height), wall)
+    draw = ImageDraw.Draw(image)
+    horizon = int(height * rng.uniform(0.55, 0.75))
+    draw.rectangle([0, horizon, width, height], fill=floor)
+
+    for _ in range(rng.randint(6, 11)):
+        w = rng.randint(width // 12, width // 4)
+        h = rng.randint(height // 10, height // 3)
+        x = rng.randint(0, width - w)
+        y = rng.randint(height // 8, horizon + h // 3) - h // 2
+        color = _color(rng)
+        shape = rng.choice(("rect", "rect", "ellipse", "shelf"))
+        if shape == "ellipse":
+            draw.ellipse([x, y, x + w, y + h], fill=color)
+        else:
+            draw.rectangle([x, y, x + w, y + h], fill=color)
+            if shape == "shelf":
+                for i in range(1, rng.randint(3, 6)):
+                    yy = y + h * i // 6
+                    draw.line([x, yy, x + w, yy], fill=_color(rng, color, 80), width=6)
+    # 窓・額縁
+    for _ in range(rng.randint(1, 3)):
+        w = rng.randint(width // 14, width // 7)
+        h = rng.randint(height // 12, height // 6)
+        x = rng.randint(0, width - w)
+        y = rng.randint(height // 12, horizon - h)
+        draw.rectangle([x, y, x + w, y + h], fill=_color(rng), outline=(20, 20, 20), width=8)
+    return image
+
+
+def _outdoor(seed: int) -> Image.Image:
+    """屋外（空・地面・建物・木）"""
+    rng = random.Random(seed)
+    width = int(WIDTH * (1 + 2 * MARGIN))
+    height = int(HEIGHT * (1 + 2 * MARGIN))
+    sky = (rng.randint(150, 200), rng.randint(190, 225), rng.randint(230, 255))
+    image = Image.new("RGB", (width, height), sky)
+    draw = ImageDraw.Draw(image)
+    horizon = int(height * rng.uniform(0.5, 0.7))
+    draw.rectangle([0, horizon, width, height], fill=_color(rng, (110, 110, 100), 30))
+    for _ in range(rng.randint(3, 6)):
+        w = rng.randint(width // 10, width // 4)
+        h = rng.randint(height // 5, height // 2)
+        x = rng.randint(0, width - w)
+        draw.rectangle([x, horizon - h, x + w, horizon], fill=_color(rng, (170, 160, 150), 50))
+    for _ in range(rng.randint(2, 5)):
+        r = rng.randint(width // 30, width // 14)
+        x = rng.randint(0, width)
+        draw.rectangle([x - r // 5, horizon - 3 * r, x + r // 5, horizon], fill=(90, 60, 40))
+        draw.ellipse([x - r, horizon - 5 * r, x + r, horizon - 2 * r], fill=_color(rng, (50, 120, 50), 30))
+    return image
+
+
+def _view(scene: Image.Image, rng: random.Random, shift: float = 0.0, gain: float = 1.0,
+          tint=(1.0, 1.0, 1.0), noise: float = 0.0, person: bool = False,
+          blur: float = 0.0) -> Image.Image:
+    """カメラの画角で切り出し、撮影条件を加える"""
+    max_dx = int(WIDTH * MARGIN)
+    max_dy = int(HEIGHT * MARGIN)
+    dx = int(max_dx + rng.uniform(-shift, shift) * WIDTH)
+    dy = int(max_dy + rng.uniform(-shift, shift) * HEIGHT * 0.5)
+    dx = max(0, min(2 * max_dx, dx))
+    dy = max(0, min(2 * max_dy, dy))
+    image = scene.crop((dx, dy, dx + WIDTH, dy + HEIGHT))
+
+    if person:
+        image = image.copy()
+        draw = ImageDraw.Draw(image)
+        w = rng.randint(WIDTH // 8, WIDTH // 5)
+        x = rng.randint(0, WIDTH - w)
+        top = rng.randint(HEIGHT // 6, HEIGHT // 3)
+        draw.ellipse([x + w // 4, top, x + 3 * w // 4, top + w // 2], fill=(224, 180, 150))
+        draw.rectangle([x, top + w // 2, x + w, HEIGHT], fill=_color(rng))
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+
+    pixels = np.asarray(image, dtype=np.float32)
+    pixels = pixels * gain * np.asarray(tint, dtype=np.float32)
+    if noise:
+        pixels += np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, noise, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def _not_moved_view(scene: Image.Image, kind: str, rng: random.Random) -> Image.Image:
+    if kind == "shift":
+        return _view(scene, rng, shift=rng.uniform(0.02, 0.06))
+    if kind == "lighting":
+        tint = (rng.uniform(0.9, 1.1), 1.0, rng.uniform(0.85, 1.15))
+        return _view(scene, rng, shift=0.01, gain=rng.choice((0.6, 0.75, 1.3, 1.45)), tint=tint)
+    if kind == "noise":
+        return _view(scene, rng, shift=0.01, gain=0.6, noise=rng.uniform(10, 20))
+    if kind == "person":
+        return _view(scene, rng, shift=0.01, person=True)
+    if kind == "blur":
+        return _view(scene, rng, shift=0.02, blur=rng.uniform(3, 8))
+    return _view(scene, rng, shift=rng.uniform(0.02, 0.05), gain=rng.uniform(0.7, 1.3),
+                 noise=rng.uniform(3, 10), person=rng.random() < 0.5, blur=rng.uniform(0, 3))
+
+
+def generate(output_dir: str, rooms: int = 12, seed: int = 0, quality: int = 85) -> List[Dict]:
+    """フィクスチャを書き出してラベルを返す"""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    labels = []
+
+    def save(image: Image.Image, name: str) -> str:
+        image.save(os.path.join(output_dir, name), format="JPEG", quality=quality)
+        return name
+
+    for index in range(rooms):
+        room_seed = seed * 1000 + index
+        room = _room(room_seed)
+        before = save(_view(room, rng), f"room{index:02d}_before.jpg")
+
+        for kind in NOT_MOVED_KINDS:
+            after = save(_not_moved_view(room, kind, rng), f"room{index:02d}_{kind}.jpg")
+            labels.append({"before": before, "after": after, "moved": False, "kind": kind})
+
+        for kind in MOVED_KINDS:
+            if kind == "room":
+                other = _room(room_seed + 500)
+            elif kind == "similar_room":
+                base = random.Random(room_seed)
+                other = _room(room_seed + 700, wall=_color(base), floor=_color(base))
+            else:
+                other = _outdoor(room_seed + 900)
+            view = _view(other, rng, shift=0.02, gain=rng.uniform(0.85, 1.15))
+            after = save(view, f"room{index:02d}_{kind}.jpg")
+            labels.append({"before": before, "after": after, "moved": True, "kind": kind})
+
+    with open(os.path.join(output_dir, "labels.json"), "w") as f:
+        json.dump(labels, f, ensure_ascii=False, indent=1)
+    return labels
+
+
+def load_labels(fixtures_dir: str) -> List[Dict]:
+    with open(os.path.join(fixtures_dir, "labels.json"), "r") as f:
+        return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="移動検知のラベル付きフィクスチャを生成")
+    parser.add_argument("-o", "--output", required=True, help="書き出し先ディレクトリ")
+    parser.add_argument("--rooms", type=int, default=12, help="部屋の数（1部屋9ペア）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    labels = generate(args.output, rooms=args.rooms, seed=args.seed)
+    print(f"{len(labels)}ペアを書き出しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+起動時間ベンチマーク
+
+main.pyと同じ順序で起動処理を（ネットワークを使わずに）実行し、段階ごとの時間を計る。
+- imports: main.pyの読み込み（capabilities / core は使う時に読み込むので軽いはず）
+- live_import / gmail / calendar / alarms: main()と同じく並行して実行
+- live_client: Live APIクライアントの作成（Capabilityの登録とセッション設定の構築を含む）
+- startup_sound: 準備完了音の生成
+- total: 計測の起点から準備完了まで / process: Pythonの起動を含むプロセス全体
+あわせて `python -X importtime` でモジュールの読み込み時間をツリー表示する。
+
+使い方:
+    python -m bench.run_boot_bench                         # 3回計測して中央値を表示
+    python -m bench.run_boot_bench -n 5 --tree-ms 10       # 10ms以上の読み込みをツリー表示
+    python -m bench.run_boot_bench --budget total=2500 --budget imports=300   # 超えたら終了コード1
+    python -m bench.run_boot_bench --json result.json      # CI用
+
+--budget を指定しなければ total に Config.BOOT_BUDGET_MS を使う。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.run_live_bench import parse_budgets
+
+
+# ---- 子プロセス（1回分の起動） ----
+
+def run_child() -> None:
+    """起動処理を1回実行し、結果をJSONで標準出力に書く"""
+    from core.boot_profile import get_boot_profile
+    boot = get_boot_profile()
+
+    # 本番の設定・トークンを使わない（Gmail・カレンダーは認証情報なしの経路を通る）
+    from config import Config
+    work_dir = tempfile.mkdtemp(prefix="boot_bench_")
+    Config.BASE_DIR = work_dir
+    Config.GMAIL_TOKEN_PATH = os.path.join(work_dir, "token.json")
+    Config.GMAIL_CREDENTIALS_PATH = os.path.join(work_dir, "credentials.json")
+    Config.ALARM_FILE_PATH = os.path.join(work_dir, "alarms.json")
+    Config.TOOL_USAGE_PATH = os.path.join(work_dir, "tool_usage.json")
+    os.environ.setdefault("GOOGLE_API_KEY", "boot-bench")
+
+    stdout = sys.stdout
+    with boot.step("imports"):
+        import main
+    sys.stdout = sys.stderr  # 起動時の表示はJSONと混ぜない
+
+    import importlib
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="init") as pool:
+        futures = [
+            pool.submit(boot.run, "live_import", importlib.import_module, "core.gemini_realtime_client"),
+            pool.submit(boot.run, "gmail", main.init_gmail),
+            pool.submit(boot.run, "calendar", main.init_calendar),
+            pool.submit(boot.run, "alarms", main.load_alarms),
+        ]
+        for future in futures:
+            future.result()
+
+    from core import GeminiRealtimeClient
+    with boot.step("live_client"):
+        GeminiRealtimeClient(None)
+    with boot.step("startup_sound"):
+        main.generate_startup_sound()
+    boot.mark("ready")
+
+    stdout.write(json.dumps(boot.to_dict()))
+    stdout.flush()
+
+
+# ---- import時間のツリー ----
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """`python -X importtime` の出力をツリーにする（子は親より先に出力される）"""
+    pending: Dict[int, List[Dict[str, Any]]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line.split(":", 1)[1].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        node = {
+            "name": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "children": pending.pop(depth + 1, []),
+        }
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+def format_tree(nodes: List[Dict[str, Any]], min_ms: float, max_depth: int, depth: int = 0) -> List[str]:
+    lines = []
+    for node in sorted(nodes, key=lambda n: -n["cumulative_ms"]):
+        if node["cumulative_ms"] < min_ms:
+            continue
+        lines.append(f"{node['cumulative_ms']:>8.1f}ms  {'  ' * depth}{node['name']}")
+        if depth + 1 < max_depth:
+            lines.extend(format_tree(node["children"], min_ms, max_depth, depth + 1))
+    return lines
+
+
+def import_tree(min_ms: float, max_depth: int) -> List[str]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    return format_tree(parse_importtime(result.stderr), min_ms, max_depth)
+
+
+# ---- 計測 ----
+
+def run_once() -> Dict[str, float]:
+    """子プロセスで1回起動して、段階ごとの時間（ms）を返す"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "bench.run_boot_bench", "--child"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    process_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"起動に失敗しました:\n{result.stderr[-2000:]}")
+    data = json.loads(result.stdout)
+
+    metrics = {step["name"]: step["duration_ms"] for step in data["steps"]}
+    metrics["total"] = data["marks"]["ready"]
+    metrics["process"] = round(process_ms, 1)
+    return metrics
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="起動時間ベンチマーク")
+    parser.add_argument("-n", "--iterations", type=int, default=3, help="起動の繰り返し回数")
+    parser.add_argument("--tree-ms", type=float, default=20.0,
+                        help="ツリーに表示する読み込み時間の下限（ms）")
+    parser.add_argument("--tree-depth", type=int, default=4, help="ツリーの深さ")
+    parser.add_argument("--budget", action="append", default=[],
+                        help="中央値の上限（例: total=2500, imports=300）。超えたら終了コード1")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return 0
+
+    from config import Config
+
+    print("モジュールの読み込み（import main）:")
+    tree = import_tree(args.tree_ms, args.tree_depth)
+    print("\n".join(tree))
+    print()
+
+    runs = [run_once() for _ in range(args.iterations)]
+    names = list(runs[0])
+    median = {name: round(statistics.median(run.get(name, 0.0) for run in runs), 1) for name in names}
+
+    print(f"{'段階':<16}{'中央値(ms)':>12}{'最大(ms)':>12}")
+    for name in names:
+        print(f"{name:<16}{median[name]:>12.1f}{max(run.get(name, 0.0) for run in runs):>12.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"median": median, "runs": runs, "import_tree": tree}, f, ensure_ascii=False, indent=2)
+
+    budgets = parse_budgets(args.budget) or {"total": float(Config.BOOT_BUDGET_MS)}
+    exit_code = 0
+    for metric, limit in budgets.items():
+        value = median.get(metric)
+        if value is not None and value > limit:
+            print(f"予算超過: {metric}={value}ms > {limit}ms")
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
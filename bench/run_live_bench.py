@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Live API遅延ベンチマーク
+
+GeminiRealtimeClientをローカルのLive APIスタブに接続し、シナリオを再生して計測する。
+- release_to_first_audio: ボタンを離して（activity_end送信）から最初の音声を再生するまで
+- tool_round_trip: サーバーがtoolCallを送ってからtoolResponseを受け取るまで
+- expand_switch: capability_expandのtoolCallから新しいセッションで依頼を受け取るまで
+- reconnect: サーバーがgoAwayで切断してから再接続が完了するまで
+- connect: 初回接続
+
+使い方:
+    python -m bench.run_live_bench                      # 全シナリオ
+    python -m bench.run_live_bench -s tool -n 20        # シナリオ指定・繰り返し
+    python -m bench.run_live_bench --budget release_to_first_audio=150   # p95が超えたら終了コード1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from bench.live_stub import LiveStubServer
+from bench.scenarios import SCENARIOS, Scenario
+
+TURN_TIMEOUT = 10.0
+
+
+class BenchAudioSink:
+    """再生の代わりに音声チャンクの到着時刻を記録するオーディオハンドラ"""
+
+    def __init__(self):
+        self.chunk_times: List[float] = []
+
+    def play_audio_chunk(self, audio_data: bytes) -> None:
+        self.chunk_times.append(time.perf_counter())
+
+    def play_audio_buffer(self, audio_data: bytes) -> None:
+        pass
+
+    def first_after(self, t: float) -> Optional[float]:
+        for chunk_time in self.chunk_times:
+            if chunk_time >= t:
+                return chunk_time
+        return None
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+async def _wait_until(predicate, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.005)
+    return True
+
+
+async def run_scenario(scenario: Scenario, model_delay_ms: Optional[int] = None) -> Dict[str, List[float]]:
+    """シナリオを1回再生して計測値を返す"""
+    from core.gemini_realtime_client import GeminiRealtimeClient
+
+    server = LiveStubServer(scenario, model_delay_ms=model_delay_ms)
+    await server.start()
+    os.environ["GEMINI_BASE_URL"] = server.base_url
+    os.environ["GEMINI_CA_CERT"] = server.cert_path
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+    metrics: Dict[str, List[float]] = {}
+    turn_done = asyncio.Event()
+    sink = BenchAudioSink()
+    client = GeminiRealtimeClient(sink, on_response_complete=turn_done.set)
+    receive_task = None
+
+    try:
+        start = time.perf_counter()
+        await client.connect()
+        metrics.setdefault("connect", []).append(_ms(time.perf_counter() - start))
+        receive_task = asyncio.create_task(client.receive_messages())
+
+        for _ in range(scenario.user_turns):
+            # 前のターンでサーバーが切断していたら、クライアントが検知するのを待って再接続
+            go_aways = server.events_of("go_away")
+            if go_aways and go_aways[-1].data["conn"] == server.events_of("setup")[-1].data["conn"]:
+                await _wait_until(lambda: client.needs_reconnect, TURN_TIMEOUT)
+                closed_at = go_aways[-1].t
+                await receive_task
+                await client.reset_session()
+                client.needs_reconnect = False
+                metrics.setdefault("reconnect", []).append(_ms(time.perf_counter() - closed_at))
+                receive_task = asyncio.create_task(client.receive_messages())
+
+            # ボタン押下 → 音声送信 → ボタンを離す
+            turn_done.clear()
+            await client.send_activity_start()
+            for _ in range(10):
+                await client.send_audio_chunk(b"\x00\x00" * Config.CHUNK_SIZE)
+            released_at = time.perf_counter()
+            await client.send_activity_end()
+
+            await asyncio.wait_for(turn_done.wait(), TURN_TIMEOUT)
+            first_audio = sink.first_after(released_at)
+            if first_audio is not None:
+                metrics.setdefault("release_to_first_audio", []).append(_ms(first_audio - released_at))
+
+        # ツール往復・ツール拡張はスタブ側のイベントから算出
+        calls = server.events_of("tool_call")
+        for call in calls:
+            later = [e for e in server.events if e.t > call.t and e.data.get("conn") == call.data["conn"]
+                     and e.kind in ("tool_response", "closed")]
+            if "capability_expand" in call.data["names"]:
+                switched = [e for e in server.events if e.t > call.t and e.kind == "client_content"]
+                if switched:
+                    metrics.setdefault("expand_switch", []).append(_ms(switched[0].t - call.t))
+            elif later and later[0].kind == "tool_response":
+                metrics.setdefault("tool_round_trip", []).append(_ms(later[0].t - call.t))
+
+    finally:
+        if receive_task and not receive_task.done():
+            receive_task.cancel()
+            try:
+                await receive_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        await client.disconnect()
+        await server.stop()
+
+    return metrics
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """計測値をp50/p95/maxに集計"""
+    return {
+        name: {
+            "n": len(values),
+            "p50": round(statistics.median(values), 2),
+            "p95": round(_percentile(values, 95), 2),
+            "max": round(max(values), 2),
+        }
+        for name, values in sorted(samples.items()) if values
+    }
+
+
+def parse_budgets(items: List[str]) -> Dict[str, float]:
+    budgets = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        budgets[name.strip()] = float(value)
+    return budgets
+
+
+async def main_async(args) -> int:
+    names = args.scenario or list(SCENARIOS)
+    samples: Dict[str, List[float]] = {}
+    per_scenario: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    for name in names:
+        scenario = SCENARIOS[name]
+        scenario_samples: Dict[str, List[float]] = {}
+        for _ in range(args.iterations):
+            result = await run_scenario(scenario, model_delay_ms=args.model_delay_ms)
+            for metric, values in result.items():
+                scenario_samples.setdefault(metric, []).extend(values)
+                samples.setdefault(metric, []).extend(values)
+        per_scenario[name] = summarize(scenario_samples)
+
+    total = summarize(samples)
+
+    print(f"{'metric':<24}{'n':>5}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}")
+    for metric, stats in total.items():
+        print(f"{metric:<24}{stats['n']:>5}{stats['p50']:>10}{stats['p95']:>10}{stats['max']:>10}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"total": total, "scenarios": per_scenario}, f, ensure_ascii=False, indent=2)
+
+    exit_code = 0
+    for metric, limit in parse_budgets(args.budget).items():
+        stats = total.get(metric)
+        if stats and stats["p95"] > limit:
+            print(f"予算超過: {metric} p95={stats['p95']}ms > {limit}ms")
+            exit_code = 1
+    return exit_code
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Live API遅延ベンチマーク（ローカルスタブ使用）")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="実行するシナリオ（複数指定可、省略時は全て）")
+    parser.add_argument("-n", "--iterations", type=int, default=5, help="シナリオごとの繰り返し回数")
+    parser.add_argument("--model-delay-ms", type=int, default=None,
+                        help="スタブが最初の音声を返すまでの待ち（モデルの考える時間を模擬）")
+    parser.add_argument("--budget", action="append", default=[],
+                        help="p95の上限（例: release_to_first_audio=150）。超えたら終了コード1")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    parser.add_argument("-v", "--verbose", action="store_true", help="クライアントのログを表示")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s | %(name)s | %(message)s")
+
+    # ツール利用統計は本番の統計と混ぜない
+    Config.TOOL_USAGE_PATH = os.path.join(tempfile.mkdtemp(prefix="live_bench_"), "tool_usage.json")
+
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+移動検知ベンチマーク
+
+ラベル付きの画像ペア（bench/movement_fixtures.py）で移動検知の正解率と遅延を比べる。
+- local: 端末内判定のみ（capabilities/scene_change.py）
+- hybrid: 本番と同じ（端末内で判断がつかない時だけGemini）  ※ --gemini 指定時
+- gemini: 毎回Gemini Vision API（従来の方式）               ※ --gemini 指定時
+
+使い方:
+    python -m bench.run_movement_bench                          # 合成フィクスチャで端末内判定のみ
+    python -m bench.run_movement_bench --fixtures ~/photos      # 実機写真（labels.json付き）
+    python -m bench.run_movement_bench --gemini                 # Geminiとも比較（APIを呼ぶ）
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from bench.movement_fixtures import generate, load_labels
+from bench.run_live_bench import summarize
+
+
+def _local(image1: bytes, image2: bytes) -> Dict:
+    from capabilities.scene_change import compare_scenes
+    result = compare_scenes(image1, image2)
+    if result is None:
+        return {"moved": False, "confidence": 0.0, "gemini": False}
+    return {
+        "moved": result.moved,
+        "confidence": result.confidence,
+        "gemini": result.confidence < Config.REMINDER_MOVEMENT_LOCAL_CONFIDENCE,
+    }
+
+
+def _hybrid(detector) -> Callable[[bytes, bytes], Dict]:
+    def run(image1: bytes, image2: bytes) -> Dict:
+        calls = []
+        original = detector.compare_images_with_gemini
+
+        def counting(a, b):
+            calls.append(1)
+            return original(a, b)
+
+        detector.compare_images_with_gemini = counting
+        try:
+            result = detector.compare_images(image1, image2)
+        finally:
+            detector.compare_images_with_gemini = original
+        return dict(result, gemini=bool(calls))
+    return run
+
+
+def _gemini(detector) -> Callable[[bytes, bytes], Dict]:
+    def run(image1: bytes, image2: bytes) -> Dict:
+        result = detector.compare_images_with_gemini(image1, image2)
+        if result is None:
+            return {"moved": False, "confidence": 0.0, "gemini": True, "error": True}
+        return dict(result, gemini=True)
+    return run
+
+
+def evaluate(name: str, method: Callable[[bytes, bytes], Dict], pairs: List[Dict]) -> Dict:
+    """1つの方式で全ペアを判定して集計"""
+    latencies: List[float] = []
+    correct = 0
+    gemini_calls = 0
+    errors = 0
+    per_kind: Dict[str, List[int]] = {}
+    mistakes = []
+
+    for pair in pairs:
+        start = time.perf_counter()
+        result = method(pair["image1"], pair["image2"])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        # 本番と同じく confidence >= 0.7 で移動と判定
+        moved = bool(result.get("moved")) and result.get("confidence", 0) >= 0.7
+        ok = moved == pair["moved"]
+        correct += ok
+        gemini_calls += bool(result.get("gemini"))
+        errors += bool(result.get("error"))
+        kind = per_kind.setdefault(pair["kind"], [0, 0])
+        kind[0] += ok
+        kind[1] += 1
+        if not ok:
+            mistakes.append(pair["after"])
+
+    return {
+        "method": name,
+        "accuracy": round(correct / len(pairs), 3),
+        "latency_ms": summarize({"compare": latencies})["compare"],
+        "gemini_calls": gemini_calls,
+        "errors": errors,
+        "per_kind": {k: round(v[0] / v[1], 3) for k, v in sorted(per_kind.items())},
+        "mistakes": mistakes,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="移動検知ベンチマーク（正解率と遅延）")
+    parser.add_argument("--fixtures", help="labels.json のあるディレクトリ（省略時は合成フィクスチャを生成）")
+    parser.add_argument("--rooms", type=int, default=12, help="合成フィクスチャの部屋数")
+    parser.add_argument("--seed", type=int, default=0, help="合成フィクスチャのシード")
+    parser.add_argument("--gemini", action="store_true", help="Gemini（hybrid / gemini）とも比較する")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+
+    fixtures_dir = args.fixtures
+    if not fixtures_dir:
+        fixtures_dir = tempfile.mkdtemp(prefix="movement_fixtures_")
+        generate(fixtures_dir, rooms=args.rooms, seed=args.seed)
+
+    pairs = []
+    for label in load_labels(fixtures_dir):
+        with open(os.path.join(fixtures_dir, label["before"]), "rb") as f:
+            image1 = f.read()
+        with open(os.path.join(fixtures_dir, label["after"]), "rb") as f:
+            image2 = f.read()
+        pairs.append(dict(label, image1=image1, image2=image2))
+
+    methods = [("local", _local)]
+    if args.gemini:
+        from capabilities.proactive_reminder import MovementDetector
+        detector = MovementDetector()
+        methods += [("hybrid", _hybrid(detector)), ("gemini", _gemini(detector))]
+
+    results = [evaluate(name, method, pairs) for name, method in methods]
+
+    print(f"{len(pairs)}ペア ({fixtures_dir})")
+    print(f"{'method':<10}{'accuracy':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'gemini':>8}{'errors':>8}")
+    for r in results:
+        latency = r["latency_ms"]
+        print(f"{r['method']:<10}{r['accuracy']:>10}{latency['p50']:>10}{latency['p95']:>10}"
+              f"{r['gemini_calls']:>8}{r['errors']:>8}")
+    for r in results:
+        kinds = " ".join(f"{k}={v}" for k, v in r["per_kind"].items())
+        print(f"  {r['method']}: {kinds}")
+        if r["mistakes"]:
+            print(f"  {r['method']} 誤判定: {', '.join(r['mistakes'])}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
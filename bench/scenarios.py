@@ -0,0 +1,74 @@
+"""
+会話シナリオ
+
+スタブサーバーが1ターンごとに再生する応答を定義する。
+ターンはユーザーの発話終了（activity_end）またはテキスト送信（turn_complete）で開始し、
+接続をまたいで順番に進む（再接続・ツール拡張後も続きのターンから再生する）。
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+
+@dataclass
+class ToolCallSpec:
+    """サーバーから送るツール呼び出し"""
+    name: str
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Turn:
+    """1ターン分のサーバー応答"""
+    tool_calls: List[ToolCallSpec] = field(default_factory=list)  # 先にツール呼び出しを送り、応答を待つ
+    audio_chunks: int = 10        # 音声チャンク数
+    chunk_ms: int = 40            # 1チャンクの長さ（ミリ秒）
+    first_delay_ms: int = 0       # 最初の音声までの待ち（モデルの考える時間）
+    close_after: bool = False     # ターン完了後にgoAwayを送って切断
+
+
+@dataclass
+class Scenario:
+    """会話シナリオ"""
+    name: str
+    description: str
+    user_turns: int               # ボタンを押して話す回数
+    turns: List[Turn]             # サーバー側のターン（ツール拡張の続きもここに含める）
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "conversation": Scenario(
+        name="conversation",
+        description="音声だけの会話を3往復",
+        user_turns=3,
+        turns=[Turn(), Turn(), Turn()],
+    ),
+    "tool": Scenario(
+        name="tool",
+        description="ツール呼び出し（alarm_list）を挟む会話",
+        user_turns=2,
+        turns=[
+            Turn(tool_calls=[ToolCallSpec("alarm_list")]),
+            Turn(tool_calls=[ToolCallSpec("alarm_list"), ToolCallSpec("lifelog_status")]),
+        ],
+    ),
+    "expand": Scenario(
+        name="expand",
+        description="capability_expandでツールを追加したセッションに切り替え",
+        user_turns=1,
+        turns=[
+            # 古いセッションにはツール応答が返らず、新しいセッションで依頼が続行される
+            Turn(tool_calls=[ToolCallSpec("capability_expand", {
+                "groups": "mail",
+                "request": "新しいメールある？",
+            })]),
+            Turn(),
+        ],
+    ),
+    "reconnect": Scenario(
+        name="reconnect",
+        description="応答後にサーバーが切断し、再接続して会話を続ける",
+        user_turns=2,
+        turns=[Turn(close_after=True), Turn()],
+    ),
+}
@@ -4,50 +4,89 @@ Capability層
 ユーザーの意図を実現するための能力群
 """
 
+import importlib
+
 from .base import Capability, CapabilityCategory, CapabilityResult
-from .executor import CapabilityExecutor, get_executor
 
-from .vision import (
-    VISION_CAPABILITIES, capture_image_raw,
-    get_last_capture, clear_last_capture
-)
-from .communication import (
-    COMMUNICATION_CAPABILITIES,
-    init_gmail, init_firebase, get_firebase_messenger
-)
-from .schedule import (
-    SCHEDULE_CAPABILITIES,
-    load_alarms, start_alarm_thread, stop_alarm_thread,
-    set_alarm_notify_callback
-)
-from .memory import (
-    MEMORY_CAPABILITIES,
-    start_lifelog_thread, stop_lifelog_thread,
-    set_firebase_messenger, set_play_audio_callback,
-    pause_lifelog, resume_lifelog, is_lifelog_paused
-)
-from .search import SEARCH_CAPABILITIES
-from .calendar import CALENDAR_CAPABILITIES, init_calendar, get_calendar_service
-from .videocall import (
-    VIDEOCALL_CAPABILITIES,
-    set_videocall_callbacks
-)
-from .detail_info import DETAIL_INFO_CAPABILITIES
-from .music import (
-    MUSIC_CAPABILITIES, is_music_playing, get_current_track, stop_music_player,
-    set_music_audio_callbacks, is_music_active, pause_music_for_conversation,
-    resume_music_after_conversation
-)
-from .proactive_reminder import (
-    start_reminder_thread,
-    stop_reminder_thread,
-    set_reminder_notify_callback
-)
-from .openclaw import (
-    OPENCLAW_CAPABILITIES,
-    close_openclaw_client,
-    get_openclaw_client
-)
+
+# 各Capabilityモジュールと重い依存（google.genai, googleapiclient, tavily, websocketsなど）は
+# 最初に使われた時に読み込む（PEP 562）。起動時に使わない機能の読み込みを待たない
+_LAZY_ATTRS = {
+    # 実行エンジン
+    'CapabilityExecutor': 'executor',
+    'get_executor': 'executor',
+    # 視覚
+    'VISION_CAPABILITIES': 'vision',
+    'capture_image_raw': 'vision',
+    'get_last_capture': 'vision',
+    'clear_last_capture': 'vision',
+    'set_live_frame_sender': 'vision',
+    # コミュニケーション
+    'COMMUNICATION_CAPABILITIES': 'communication',
+    'init_gmail': 'communication',
+    'init_firebase': 'communication',
+    'get_firebase_messenger': 'communication',
+    'stop_mailbox_sync': 'communication',
+    # スケジュール
+    'SCHEDULE_CAPABILITIES': 'schedule',
+    'load_alarms': 'schedule',
+    'start_alarm_thread': 'schedule',
+    'stop_alarm_thread': 'schedule',
+    'set_alarm_notify_callback': 'schedule',
+    # 記憶
+    'MEMORY_CAPABILITIES': 'memory',
+    'start_lifelog_thread': 'memory',
+    'stop_lifelog_thread': 'memory',
+    'set_firebase_messenger': 'memory',
+    'set_play_audio_callback': 'memory',
+    'pause_lifelog': 'memory',
+    'resume_lifelog': 'memory',
+    'is_lifelog_paused': 'memory',
+    # 検索
+    'SEARCH_CAPABILITIES': 'search',
+    # カレンダー
+    'CALENDAR_CAPABILITIES': 'calendar',
+    'init_calendar': 'calendar',
+    'get_calendar_service': 'calendar',
+    'get_calendar_store': 'calendar',
+    # ビデオ通話
+    'VIDEOCALL_CAPABILITIES': 'videocall',
+    'set_videocall_callbacks': 'videocall',
+    'is_video_call_active': 'videocall',
+    # 詳細情報
+    'DETAIL_INFO_CAPABILITIES': 'detail_info',
+    # 音楽
+    'MUSIC_CAPABILITIES': 'music',
+    'is_music_playing': 'music',
+    'get_current_track': 'music',
+    'stop_music_player': 'music',
+    'set_music_audio_callbacks': 'music',
+    'is_music_active': 'music',
+    'pause_music_for_conversation': 'music',
+    'resume_music_after_conversation': 'music',
+    # 移動リマインダー
+    'start_reminder_thread': 'proactive_reminder',
+    'stop_reminder_thread': 'proactive_reminder',
+    'set_reminder_notify_callback': 'proactive_reminder',
+    # OpenClaw
+    'OPENCLAW_CAPABILITIES': 'openclaw',
+    'close_openclaw_client': 'openclaw',
+    'get_openclaw_client': 'openclaw',
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
 
 __all__ = [
     'Capability',
@@ -73,7 +112,9 @@ __all__ = [
     'capture_image_raw',
     'get_last_capture',
     'clear_last_capture',
+    'set_live_frame_sender',
     'init_gmail',
+    'stop_mailbox_sync',
     'init_firebase',
     'get_firebase_messenger',
     'load_alarms',
@@ -91,7 +132,9 @@ __all__ = [
     'CALENDAR_CAPABILITIES',
     'init_calendar',
     'get_calendar_service',
+    'get_calendar_store',
     'set_videocall_callbacks',
+    'is_video_call_active',
     'start_reminder_thread',
     'stop_reminder_thread',
     'set_reminder_notify_callback',
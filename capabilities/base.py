@@ -19,6 +19,7 @@ class CapabilityCategory(Enum):
     MEMORY = "記録する"
     CALL = "通話する"
     MUSIC = "聴く"
+    SYSTEM = "整える"
 
 
 @dataclass
@@ -60,15 +61,39 @@ class Capability(ABC):
         """説明（AIが理解するため）"""
         pass
 
+    @property
+    def tool_group(self) -> str:
+        """ツールグループ（セッション開始時に送るツールの絞り込み用）"""
+        return "core"
+
     @property
     def requires_confirmation(self) -> bool:
         """確認が必要か（送信・公開・取消不可な操作）"""
         return False
 
-    @abstractmethod
+    @property
+    def is_async(self) -> bool:
+        """ネイティブの非同期実装（execute_async）を持つか"""
+        return type(self).execute_async is not Capability.execute_async
+
     def execute(self, **kwargs) -> CapabilityResult:
-        """実行"""
-        pass
+        """実行（同期）
+
+        execute_asyncのみを実装したCapabilityは、
+        実行エンジンのイベントループ上で実行して結果を待つ。
+        """
+        if not self.is_async:
+            raise NotImplementedError(f"{self.name}: execute または execute_async を実装してください")
+        from .executor import get_executor
+        return get_executor().run_coroutine(self.execute_async(**kwargs))
+
+    async def execute_async(self, **kwargs) -> CapabilityResult:
+        """実行（非同期）
+
+        長寿命の非同期クライアントを共有するCapabilityはこちらを実装する。
+        実行エンジンはメインのイベントループ上で直接awaitする。
+        """
+        raise NotImplementedError
 
     def get_tool_definition(self) -> Dict[str, Any]:
         """Gemini API用のツール定義を取得"""
@@ -11,16 +11,16 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from .base import Capability, CapabilityCategory, CapabilityResult
+from .calendar_store import CalendarStore
 from config import Config
 
 # Google Calendar API
 try:
-    from google.auth.transport.requests import Request
-    from google.oauth2.credentials import Credentials
-    from google_auth_oauthlib.flow import InstalledAppFlow
-    from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
-    CALENDAR_AVAILABLE = True
+    from .google_services import (
+        GOOGLE_API_AVAILABLE as CALENDAR_AVAILABLE,
+        load_credentials, LazyService, TokenRefresher
+    )
 except ImportError:
     CALENDAR_AVAILABLE = False
 
@@ -30,6 +30,8 @@ CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar']
 
 # カレンダー状態管理
 _calendar_service = None
+_calendar_store: Optional[CalendarStore] = None
+_calendar_token_refresher = None
 
 
 def get_calendar_service():
@@ -37,38 +39,31 @@ def get_calendar_service():
     return _calendar_service
 
 
+def get_calendar_store() -> Optional[CalendarStore]:
+    """予定のキャッシュを取得（カレンダー未接続ならNone）"""
+    return _calendar_store
+
+
 def init_calendar() -> bool:
-    """Google Calendar API初期化"""
-    global _calendar_service
+    """Google Calendar API初期化（トークンの更新とサービスの作成は後で行う）"""
+    global _calendar_service, _calendar_store, _calendar_token_refresher
 
     if not CALENDAR_AVAILABLE:
         return False
 
-    creds = None
     token_path = os.path.join(Config.BASE_DIR, "calendar_token.json")
-
-    if os.path.exists(token_path):
-        creds = Credentials.from_authorized_user_file(token_path, CALENDAR_SCOPES)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists(Config.GMAIL_CREDENTIALS_PATH):
-                return False
-            flow = InstalledAppFlow.from_client_secrets_file(
-                Config.GMAIL_CREDENTIALS_PATH, CALENDAR_SCOPES
-            )
-            creds = flow.run_local_server(port=0)
-
-        with open(token_path, 'w') as token:
-            token.write(creds.to_json())
-
     try:
-        _calendar_service = build('calendar', 'v3', credentials=creds)
-        return True
+        creds = load_credentials(token_path, CALENDAR_SCOPES, Config.GMAIL_CREDENTIALS_PATH)
     except Exception:
         return False
+    if creds is None:
+        return False
+
+    _calendar_service = LazyService('calendar', 'v3', creds)
+    _calendar_store = CalendarStore(get_calendar_service)
+    _calendar_token_refresher = TokenRefresher(creds, token_path, "calendar")
+    _calendar_token_refresher.start()
+    return True
 
 
 def _parse_datetime(dt_str: str, default_date: datetime = None) -> Optional[datetime]:
@@ -122,6 +117,10 @@ class CalendarList(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.SCHEDULE
 
+    @property
+    def tool_group(self) -> str:
+        return "calendar"
+
     @property
     def description(self) -> str:
         return """予定を確認する。以下の場面で使う：
@@ -151,16 +150,7 @@ daysで何日分の予定を取得するか指定（デフォルト1日）"""
             start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
             end_time = start_of_day + timedelta(days=days)
 
-            events_result = _calendar_service.events().list(
-                calendarId='primary',
-                timeMin=start_of_day.isoformat() + 'Z',
-                timeMax=end_time.isoformat() + 'Z',
-                maxResults=10,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-
-            events = events_result.get('items', [])
+            events = _calendar_store.events_between(start_of_day, end_time, limit=10)
 
             if not events:
                 if days == 1:
@@ -213,6 +203,10 @@ class CalendarAdd(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.SCHEDULE
 
+    @property
+    def tool_group(self) -> str:
+        return "calendar"
+
     @property
     def description(self) -> str:
         return """予定を追加する。以下の場面で使う：
@@ -285,9 +279,10 @@ class CalendarAdd(Capability):
                 },
             }
 
-            _calendar_service.events().insert(
+            created = _calendar_service.events().insert(
                 calendarId='primary', body=event
             ).execute()
+            _calendar_store.add(created)
 
             time_str = start_dt.strftime("%m/%d %H:%M")
             return CapabilityResult.ok(f"{time_str}に「{title}」を追加しました")
@@ -307,6 +302,10 @@ class CalendarDelete(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.SCHEDULE
 
+    @property
+    def tool_group(self) -> str:
+        return "calendar"
+
     @property
     def description(self) -> str:
         return """予定を削除する。以下の場面で使う：
@@ -356,15 +355,7 @@ titleで削除する予定のタイトル（部分一致）を指定"""
             end_of_day = start_of_day + timedelta(days=1)
 
             # 予定を検索
-            events_result = _calendar_service.events().list(
-                calendarId='primary',
-                timeMin=start_of_day.isoformat() + 'Z',
-                timeMax=end_of_day.isoformat() + 'Z',
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-
-            events = events_result.get('items', [])
+            events = _calendar_store.events_between(start_of_day, end_of_day)
 
             # タイトルで検索
             for event in events:
@@ -373,6 +364,7 @@ titleで削除する予定のタイトル（部分一致）を指定"""
                     _calendar_service.events().delete(
                         calendarId='primary', eventId=event['id']
                     ).execute()
+                    _calendar_store.remove(event['id'])
                     return CapabilityResult.ok(f"「{summary}」を削除しました")
 
             return CapabilityResult.fail("その予定は見つかりません")
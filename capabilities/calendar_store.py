@@ -0,0 +1,218 @@
+"""
+カレンダーの予定のキャッシュ（syncTokenによる差分同期）
+
+予定の確認・削除・移動リマインダー・メールからの予定登録が
+それぞれCalendar APIを呼ぶ代わりに、ここにある予定を使う。
+- 初回（と1日1回）は一定期間（過去N日〜未来M日）の予定をまとめて取得
+- 以降は前回のsyncTokenで変わった予定だけ取得（古すぎれば410が返るので取り直す）
+- 予定は開始時刻順に並べ、期間で重なる予定を二分探索で引く
+- 端末から追加・削除した予定はすぐに反映する
+"""
+
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger("conversation")
+
+
+def event_interval(event: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """予定の (開始, 終了) をUNIX時刻で返す（終日の予定は端末のタイムゾーンの0時区切り）"""
+    def to_ts(value: Dict[str, Any]) -> Optional[float]:
+        if 'dateTime' in value:
+            return datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00')).timestamp()
+        if 'date' in value:
+            return datetime.fromisoformat(value['date']).timestamp()
+        return None
+
+    start = to_ts(event.get('start', {}))
+    if start is None:
+        return None
+    end = to_ts(event.get('end', {}))
+    return start, max(end if end is not None else start, start)
+
+
+class CalendarStore:
+    """予定のキャッシュと期間の索引"""
+
+    def __init__(self, service_getter: Callable[[], Any], calendar_id: str = 'primary'):
+        self._service_getter = service_getter
+        self.calendar_id = calendar_id
+        self._lock = threading.RLock()
+        self._events: Dict[str, Dict[str, Any]] = {}
+        # 期間の索引（開始時刻順）
+        self._starts: List[float] = []
+        self._entries: List[Tuple[float, float, str]] = []
+        self._max_duration = 0.0
+        self._dirty = False
+
+        self._sync_token: Optional[str] = None
+        self._window: Tuple[float, float] = (0.0, 0.0)
+        self._full_synced_at = 0.0
+        self.last_sync = 0.0
+
+        self.api_calls = 0
+
+    # ---- 同期 ----
+
+    def _list_pages(self, **params) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """events.listを最後のページまで読む
+
+        Returns:
+            (予定, nextSyncToken)
+        """
+        service = self._service_getter()
+        items: List[Dict[str, Any]] = []
+        page_token = None
+        while True:
+            self.api_calls += 1
+            response = service.events().list(
+                calendarId=self.calendar_id, singleEvents=True, pageToken=page_token, **params
+            ).execute()
+            items.extend(response.get('items', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return items, response.get('nextSyncToken')
+
+    def full_sync(self) -> None:
+        """期間内の予定を取り直す"""
+        now = datetime.now().astimezone()
+        time_min = now - timedelta(days=Config.CALENDAR_SYNC_PAST_DAYS)
+        time_max = now + timedelta(days=Config.CALENDAR_SYNC_FUTURE_DAYS)
+        items, sync_token = self._list_pages(
+            timeMin=time_min.isoformat(), timeMax=time_max.isoformat(), maxResults=250
+        )
+        with self._lock:
+            self._events = {}
+            for event in items:
+                if event.get('status') != 'cancelled':
+                    self._events[event['id']] = event
+            self._dirty = True
+            self._sync_token = sync_token
+            self._window = (time_min.timestamp(), time_max.timestamp())
+            self._full_synced_at = self.last_sync = time.time()
+        logger.info(f"カレンダー同期（全体）: {len(self._events)}件")
+
+    def incremental_sync(self) -> None:
+        """前回から変わった予定を反映"""
+        from googleapiclient.errors import HttpError
+
+        try:
+            items, sync_token = self._list_pages(syncToken=self._sync_token)
+        except HttpError as e:
+            if getattr(e, 'resp', None) is not None and e.resp.status == 410:
+                self.full_sync()
+                return
+            raise
+        with self._lock:
+            for event in items:
+                self._apply(event)
+            if sync_token:
+                self._sync_token = sync_token
+            self.last_sync = time.time()
+
+    def sync(self, force: bool = False) -> None:
+        """古くなっていれば同期する"""
+        with self._lock:
+            now = time.time()
+            if (self._sync_token is None
+                    or now - self._full_synced_at > Config.CALENDAR_RESYNC_INTERVAL):
+                self.full_sync()
+            elif force or now - self.last_sync > Config.CALENDAR_SYNC_INTERVAL:
+                self.incremental_sync()
+
+    def invalidate(self) -> None:
+        """次の検索で差分を取りに行く"""
+        with self._lock:
+            self.last_sync = 0.0
+
+    # ---- 端末からの変更 ----
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        if event.get('status') == 'cancelled':
+            self._events.pop(event['id'], None)
+        else:
+            self._events[event['id']] = event
+        self._dirty = True
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """追加した予定（events.insertの結果）を反映"""
+        with self._lock:
+            if event and event.get('id'):
+                self._apply(event)
+            self.invalidate()
+
+    def remove(self, event_id: str) -> None:
+        """削除した予定を反映"""
+        with self._lock:
+            if self._events.pop(event_id, None) is not None:
+                self._dirty = True
+            self.invalidate()
+
+    # ---- 検索 ----
+
+    def _rebuild(self) -> None:
+        entries = []
+        for event_id, event in self._events.items():
+            interval = event_interval(event)
+            if interval:
+                entries.append((interval[0], interval[1], event_id))
+        entries.sort()
+        self._entries = entries
+        self._starts = [e[0] for e in entries]
+        self._max_duration = max((e[1] - e[0] for e in entries), default=0.0)
+        self._dirty = False
+
+    def events_between(self, start: datetime, end: datetime,
+                       limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """期間に重なる予定（開始時刻順）
+
+        naiveなdatetimeは端末のタイムゾーンとして扱う。
+        同期できる期間の外はCalendar APIから直接取得する。
+        """
+        start_ts = start.timestamp()
+        end_ts = end.timestamp()
+
+        try:
+            self.sync()
+        except Exception as e:
+            # 一度でも同期できていれば、古い内容で答える
+            if self._sync_token is None:
+                raise
+            logger.error(f"カレンダー同期エラー: {e}")
+
+        with self._lock:
+            if start_ts < self._window[0] or end_ts > self._window[1]:
+                return self._list_direct(start, end, limit)
+            if self._dirty:
+                self._rebuild()
+            # 開始がend_tsより前で、終了がstart_tsより後のもの
+            lo = bisect.bisect_left(self._starts, start_ts - self._max_duration)
+            hi = bisect.bisect_left(self._starts, end_ts)
+            events = []
+            for entry_start, entry_end, event_id in self._entries[lo:hi]:
+                if entry_end > start_ts or entry_start >= start_ts:
+                    events.append(self._events[event_id])
+                    if limit and len(events) >= limit:
+                        break
+        return events
+
+    def _list_direct(self, start: datetime, end: datetime,
+                     limit: Optional[int]) -> List[Dict[str, Any]]:
+        service = self._service_getter()
+        self.api_calls += 1
+        params = dict(
+            calendarId=self.calendar_id,
+            timeMin=start.astimezone().isoformat(),
+            timeMax=end.astimezone().isoformat(),
+            singleEvents=True,
+            orderBy='startTime'
+        )
+        if limit:
+            params['maxResults'] = limit
+        return service.events().list(**params).execute().get('items', [])
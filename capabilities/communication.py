@@ -6,9 +6,11 @@
 - スマホへの音声/写真メッセージ送信
 """
 
-import os
 import re
 import base64
+import threading
+import time
+from collections import OrderedDict
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -19,16 +21,16 @@ from typing import Any, Dict, List, Optional
 from .base import Capability, CapabilityCategory, CapabilityResult
 from .vision import capture_image_raw
 from .email_to_calendar import check_and_add_schedule
+from .mailbox import MailboxCache, MailboxSync, decode_body
 from config import Config
 
 # Gmail API
 try:
-    from google.auth.transport.requests import Request
-    from google.oauth2.credentials import Credentials
-    from google_auth_oauthlib.flow import InstalledAppFlow
-    from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
-    GMAIL_AVAILABLE = True
+    from .google_services import (
+        GOOGLE_API_AVAILABLE as GMAIL_AVAILABLE,
+        load_credentials, build_service, LazyService, TokenRefresher
+    )
 except ImportError:
     GMAIL_AVAILABLE = False
 
@@ -42,45 +44,78 @@ except ImportError:
 
 # Gmail状態管理
 _gmail_service = None
+_gmail_token_refresher = None
 _last_email_list: List[Dict] = []
 
+# メールのヘッダーのキャッシュ（メールIDごと。ヘッダーは変わらないので期限なし）
+_metadata_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_metadata_cache_lock = threading.Lock()
+METADATA_HEADERS = ['From', 'Subject', 'Date', 'Reply-To', 'Message-ID']
+BATCH_LIMIT = 50  # 1回のバッチリクエストに入れる最大数（Gmailの推奨。100件だと429が返りやすい）
+BATCH_RETRY_DELAY = 1.0  # バッチ内で失敗したメールを取り直すまでの秒数
+
+# メールボックスのローカルキャッシュ（差分同期）
+_mailbox: Optional[MailboxCache] = None
+_mailbox_sync: Optional[MailboxSync] = None
+
 # Firebase状態管理
 _firebase_messenger = None
 
 
 def init_gmail() -> bool:
-    """Gmail API初期化"""
-    global _gmail_service
+    """Gmail API初期化（トークンの更新とサービスの作成は後で行う）"""
+    global _gmail_service, _gmail_token_refresher
 
     if not GMAIL_AVAILABLE:
         return False
 
-    creds = None
-    if os.path.exists(Config.GMAIL_TOKEN_PATH):
-        creds = Credentials.from_authorized_user_file(
-            Config.GMAIL_TOKEN_PATH, Config.GMAIL_SCOPES
+    try:
+        creds = load_credentials(
+            Config.GMAIL_TOKEN_PATH, Config.GMAIL_SCOPES, Config.GMAIL_CREDENTIALS_PATH
         )
+    except Exception:
+        return False
+    if creds is None:
+        return False
+
+    _gmail_service = LazyService('gmail', 'v1', creds)
+    _gmail_token_refresher = TokenRefresher(creds, Config.GMAIL_TOKEN_PATH, "gmail")
+    _gmail_token_refresher.start()
+
+    if Config.GMAIL_SYNC_ENABLED:
+        _start_mailbox_sync(creds)
+    return True
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists(Config.GMAIL_CREDENTIALS_PATH):
-                return False
-            flow = InstalledAppFlow.from_client_secrets_file(
-                Config.GMAIL_CREDENTIALS_PATH, Config.GMAIL_SCOPES
-            )
-            creds = flow.run_local_server(port=0)
 
-        os.makedirs(os.path.dirname(Config.GMAIL_TOKEN_PATH), exist_ok=True)
-        with open(Config.GMAIL_TOKEN_PATH, 'w') as token:
-            token.write(creds.to_json())
+def _start_mailbox_sync(creds) -> None:
+    """メールボックスの差分同期を開始（同期スレッドは自分のサービスを使う）"""
+    global _mailbox, _mailbox_sync
 
     try:
-        _gmail_service = build('gmail', 'v1', credentials=creds)
-        return True
+        _mailbox = MailboxCache(Config.GMAIL_MAILBOX_PATH)
+        _mailbox_sync = MailboxSync(_mailbox, lambda: build_service('gmail', 'v1', creds))
+        _mailbox_sync.start()
     except Exception:
-        return False
+        _mailbox = None
+        _mailbox_sync = None
+
+
+def stop_mailbox_sync() -> None:
+    """メールボックスの同期を停止"""
+    if _mailbox_sync:
+        _mailbox_sync.stop()
+
+
+def _local_mailbox() -> Optional[MailboxCache]:
+    """同期済みのローカルキャッシュ（まだ同期できていなければNone）"""
+    if _mailbox is not None and _mailbox.ready:
+        return _mailbox
+    return None
+
+
+def _request_mailbox_sync() -> None:
+    if _mailbox_sync:
+        _mailbox_sync.request_sync()
 
 
 def init_firebase(on_message_callback=None) -> bool:
@@ -106,6 +141,95 @@ def get_firebase_messenger():
     return _firebase_messenger
 
 
+def _from_name(from_header: str) -> str:
+    """Fromヘッダーから表示名を取り出す"""
+    from_match = re.match(r'(.+?)\s*<', from_header)
+    return from_match.group(1).strip() if from_match else from_header.split('@')[0]
+
+
+def _cache_metadata(message_id: str, msg: Dict[str, Any]) -> None:
+    headers = {h['name']: h['value'] for h in msg.get('payload', {}).get('headers', [])}
+    with _metadata_cache_lock:
+        _metadata_cache[message_id] = {'threadId': msg.get('threadId'), 'headers': headers}
+        _metadata_cache.move_to_end(message_id)
+        while len(_metadata_cache) > Config.GMAIL_METADATA_CACHE_SIZE:
+            _metadata_cache.popitem(last=False)
+
+
+def _get_cached_metadata(message_id: str) -> Optional[Dict[str, Any]]:
+    with _metadata_cache_lock:
+        return _metadata_cache.get(message_id)
+
+
+def _mailbox_metadata(message_id: str) -> Optional[Dict[str, Any]]:
+    """ローカルキャッシュのメールをfetch_metadataと同じ形で返す"""
+    mailbox = _local_mailbox()
+    row = mailbox.get(message_id) if mailbox else None
+    if row is None:
+        return None
+    return {
+        'threadId': row['thread_id'],
+        'headers': {
+            'From': row['from_header'], 'Subject': row['subject'], 'Date': row['date'],
+            'Reply-To': row['reply_to'], 'Message-ID': row['message_id_header'],
+        },
+    }
+
+
+def fetch_metadata(message_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """メールのヘッダーをまとめて取得（キャッシュにないものだけ1回のバッチリクエストで）
+
+    バッチ内で失敗したもの（429・5xxなど）は少し待って1回だけ取り直し、
+    それでも取れなければ例外を投げる（一覧から黙って抜けないように）。
+
+    Returns:
+        {メールID: {'threadId': ..., 'headers': {ヘッダー名: 値}}}（削除済みのものは含まない）
+    """
+    # 同期済みのメールはローカルから
+    result = {}
+    for message_id in message_ids:
+        metadata = _get_cached_metadata(message_id) or _mailbox_metadata(message_id)
+        if metadata is not None:
+            result[message_id] = metadata
+    missing = [m for m in message_ids if m not in result]
+    errors: Dict[str, Exception] = {}
+
+    def on_response(request_id, response, exception):
+        if exception is None:
+            if response:
+                _cache_metadata(request_id, response)
+        elif getattr(getattr(exception, 'resp', None), 'status', None) != 404:
+            errors[request_id] = exception
+
+    pending = missing
+    for attempt in range(2):
+        if attempt:
+            time.sleep(BATCH_RETRY_DELAY)
+        errors.clear()
+        for start in range(0, len(pending), BATCH_LIMIT):
+            batch = _gmail_service.new_batch_http_request(callback=on_response)
+            for message_id in pending[start:start + BATCH_LIMIT]:
+                batch.add(
+                    _gmail_service.users().messages().get(
+                        userId='me', id=message_id, format='metadata',
+                        metadataHeaders=METADATA_HEADERS
+                    ),
+                    request_id=message_id
+                )
+            batch.execute()
+        pending = list(errors)
+        if not pending:
+            break
+    if errors:
+        raise next(iter(errors.values()))
+
+    for message_id in missing:
+        metadata = _get_cached_metadata(message_id)
+        if metadata is not None:
+            result[message_id] = metadata
+    return {m: result[m] for m in message_ids if m in result}
+
+
 class GmailList(Capability):
     """メール一覧を確認"""
 
@@ -117,6 +241,10 @@ class GmailList(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.COMMUNICATION
 
+    @property
+    def tool_group(self) -> str:
+        return "mail"
+
     @property
     def description(self) -> str:
         return """メールを確認する。以下の場面で使う：
@@ -145,6 +273,28 @@ class GmailList(Capability):
         if not _gmail_service:
             return CapabilityResult.fail("今はメールを確認できません")
 
+        # 同期済みのキャッシュで漏れなく答えられる検索ならネットワークを使わない
+        mailbox = _local_mailbox()
+        rows = mailbox.search(query, max_results) if mailbox else None
+        if rows is not None:
+            _request_mailbox_sync()
+            if not rows:
+                return CapabilityResult.ok("新しいメールはありません")
+            _last_email_list = []
+            email_list = []
+            for row in rows:
+                from_header = row['from_header'] or '不明'
+                from_name = _from_name(from_header)
+                email_info = {
+                    'id': row['id'],
+                    'from': from_name,
+                    'from_email': from_header,
+                    'subject': row['subject'] or '(件名なし)',
+                }
+                _last_email_list.append(email_info)
+                email_list.append(f"{len(_last_email_list)}. {from_name}さんから: {email_info['subject']}")
+            return CapabilityResult.ok("メール一覧:\n" + "\n".join(email_list))
+
         try:
             results = _gmail_service.users().messages().list(
                 userId='me', q=query, maxResults=max_results
@@ -157,17 +307,15 @@ class GmailList(Capability):
             email_list = []
             _last_email_list = []
 
-            for i, msg in enumerate(messages, 1):
-                msg_detail = _gmail_service.users().messages().get(
-                    userId='me', id=msg['id'], format='metadata',
-                    metadataHeaders=['From', 'Subject', 'Date']
-                ).execute()
+            # ヘッダーは件数によらず1往復（前に見たメールは取得しない）
+            metadata = fetch_metadata([msg['id'] for msg in messages])
 
-                headers = {h['name']: h['value']
-                          for h in msg_detail.get('payload', {}).get('headers', [])}
+            for msg in messages:
+                if msg['id'] not in metadata:
+                    continue
+                headers = metadata[msg['id']]['headers']
                 from_header = headers.get('From', '不明')
-                from_match = re.match(r'(.+?)\s*<', from_header)
-                from_name = from_match.group(1).strip() if from_match else from_header.split('@')[0]
+                from_name = _from_name(from_header)
 
                 email_info = {
                     'id': msg['id'],
@@ -176,7 +324,7 @@ class GmailList(Capability):
                     'subject': headers.get('Subject', '(件名なし)'),
                 }
                 _last_email_list.append(email_info)
-                email_list.append(f"{i}. {from_name}さんから: {email_info['subject']}")
+                email_list.append(f"{len(_last_email_list)}. {from_name}さんから: {email_info['subject']}")
 
             return CapabilityResult.ok("メール一覧:\n" + "\n".join(email_list))
 
@@ -195,6 +343,10 @@ class GmailRead(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.COMMUNICATION
 
+    @property
+    def tool_group(self) -> str:
+        return "mail"
+
     @property
     def description(self) -> str:
         return """メールの本文を読む。以下の場面で使う：
@@ -226,22 +378,22 @@ class GmailRead(Capability):
                 return CapabilityResult.fail("そのメールは見つかりません")
 
         try:
-            msg = _gmail_service.users().messages().get(
-                userId='me', id=message_id, format='full'
-            ).execute()
-
-            headers = {h['name']: h['value']
-                      for h in msg.get('payload', {}).get('headers', [])}
-            body = ""
-            payload = msg.get('payload', {})
+            # 同期済みのメールはローカルの本文を使う
+            mailbox = _local_mailbox()
+            row = mailbox.get(message_id) if mailbox else None
+            if row is not None and row['body'] is not None:
+                headers = {'From': row['from_header'], 'Subject': row['subject']}
+                body = row['body']
+            else:
+                msg = _gmail_service.users().messages().get(
+                    userId='me', id=message_id, format='full'
+                ).execute()
+                if mailbox:
+                    mailbox.put_message(msg)
 
-            if 'body' in payload and payload['body'].get('data'):
-                body = base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8')
-            elif 'parts' in payload:
-                for part in payload['parts']:
-                    if part.get('mimeType') == 'text/plain' and part.get('body', {}).get('data'):
-                        body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
-                        break
+                headers = {h['name']: h['value']
+                          for h in msg.get('payload', {}).get('headers', [])}
+                body = decode_body(msg.get('payload', {}))
 
             if len(body) > 500:
                 body = body[:500] + "...(以下省略)"
@@ -269,6 +421,10 @@ class GmailSend(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.COMMUNICATION
 
+    @property
+    def tool_group(self) -> str:
+        return "mail"
+
     @property
     def description(self) -> str:
         return """メールを送る。以下の場面で使う：
@@ -308,6 +464,8 @@ class GmailSend(Capability):
             result_msg = f"{to_name}さんに送りました"
 
             # 予定があればカレンダーに追加
+            _request_mailbox_sync()
+
             calendar_msg = check_and_add_schedule(to, subject, body)
             if calendar_msg:
                 result_msg += f"。{calendar_msg}"
@@ -329,6 +487,10 @@ class GmailReply(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.COMMUNICATION
 
+    @property
+    def tool_group(self) -> str:
+        return "mail"
+
     @property
     def description(self) -> str:
         return """メールに返信する。以下の場面で使う：
@@ -369,13 +531,11 @@ class GmailReply(Capability):
             actual_id = message_id
 
         try:
-            original = _gmail_service.users().messages().get(
-                userId='me', id=actual_id, format='metadata',
-                metadataHeaders=['From', 'Subject', 'Message-ID', 'References', 'Reply-To']
-            ).execute()
-
-            headers = {h['name']: h['value']
-                      for h in original.get('payload', {}).get('headers', [])}
+            # 一覧で取得済みならキャッシュのヘッダーを使う
+            original = fetch_metadata([actual_id]).get(actual_id)
+            if original is None:
+                return CapabilityResult.fail("そのメールは見つかりません")
+            headers = original['headers']
             to_raw = to_email or headers.get('Reply-To') or headers.get('From', '')
 
             match = re.search(r'<([^>]+)>', to_raw)
@@ -400,6 +560,8 @@ class GmailReply(Capability):
             result_msg = f"{to_name}さんに返信しました"
 
             # 予定があればカレンダーに追加
+            _request_mailbox_sync()
+
             calendar_msg = check_and_add_schedule(to, subject, body)
             if calendar_msg:
                 result_msg += f"。{calendar_msg}"
@@ -421,6 +583,10 @@ class GmailSendPhoto(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.COMMUNICATION
 
+    @property
+    def tool_group(self) -> str:
+        return "mail"
+
     @property
     def description(self) -> str:
         return """写真を撮ってメールで送る。以下の場面で使う：
@@ -8,9 +8,93 @@ import threading
 from typing import Any, Dict
 
 from .base import Capability, CapabilityCategory, CapabilityResult
-from .vision import get_last_capture, clear_last_capture, get_gemini_client
+from .vision import LastCaptureContext, get_last_capture, clear_last_capture
+from .imaging import prepare_image
 from .communication import get_firebase_messenger
 
+# 先読み中の詳細分析を待つ最大秒数（超えたら改めて分析する）
+PREFETCH_WAIT_SEC = 30
+
+
+def analyze_detail(context: LastCaptureContext, speculative: bool = False) -> str:
+    """撮影コンテキストの詳細分析（Gemini Vision、失敗時は例外）
+
+    Args:
+        speculative: 先読み（ユーザーはまだ待っていないので対話より後回し）
+    """
+    from google.genai import types
+    from core.llm_gateway import get_llm_gateway, PRIORITY_INTERACTIVE, PRIORITY_NORMAL
+    from core.model_router import route_image_preset
+
+    task = "detail_prefetch" if speculative else "detail"
+
+    prompt = f"""この画像から読み取れる情報（文字、ロゴ、署名、特徴など）を手がかりに、写っているものを特定し、詳しい情報を提供してください。
+
+元の質問: {context.prompt}
+簡潔な回答: {context.brief_analysis}
+
+■ 対象別に提供すべき情報:
+- 本 → タイトル、作者、あらすじ、ジャンル、出版年、評価など
+- アート作品 → 作品名、作者、制作年、作品の意味や背景、美術史的な位置づけなど
+- 場所・店舗 → 正式名称、どんな場所か、歴史、名物、特徴など
+- 商品 → 商品名、ブランド、用途、特徴、価格帯など
+- 人物 → 名前、職業、経歴、有名な業績など
+- 食べ物 → 料理名、由来、材料、発祥地など
+
+■ 重要:
+- 画像内の文字やロゴを読み取って特定の手がかりにする
+- 見た目の説明ではなく「調べたら分かる情報」を提供する
+- 特定できない場合は一般的な情報でも可
+
+以下の形式でMarkdown形式で回答してください：
+
+## 概要
+（これが何か1文で特定）
+
+## 詳細情報
+（上記の対象別情報を参考に、知りたくなるような情報を詳しく）
+
+## 補足
+（1-2文で豆知識）
+
+日本語で回答してください。"""
+
+    response = get_llm_gateway().generate(
+        task,
+        contents=[
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part(text=prompt),
+                    types.Part(
+                        inline_data=types.Blob(
+                            mime_type="image/jpeg",
+                            data=prepare_image(context.image_data, route_image_preset(task, "ocr"))
+                        )
+                    )
+                ]
+            )
+        ],
+        priority=PRIORITY_NORMAL if speculative else PRIORITY_INTERACTIVE,
+        timeout=45
+    )
+    return response.text
+
+
+def _get_detail_analysis(context: LastCaptureContext) -> str:
+    """詳細分析を取得（先読みが済んでいればすぐ返す、実行中なら待つ）"""
+    future = context.detail_future
+    if future is not None and not future.cancelled():
+        try:
+            detail_analysis = future.result(timeout=PREFETCH_WAIT_SEC)
+            if detail_analysis:
+                return detail_analysis
+        except Exception:
+            pass
+    detail_analysis = analyze_detail(context)
+    context.set_detail(detail_analysis)
+    return detail_analysis
+
 
 class SendDetailInfo(Capability):
     """直前に見たものの詳細情報をスマホに送る"""
@@ -56,67 +140,9 @@ class SendDetailInfo(Capability):
         if firebase is None:
             return CapabilityResult.fail("今はスマホに送れません")
 
-        # 3. Gemini Vision で詳細分析
+        # 3. Gemini Vision で詳細分析（先読み済みならそれを使う）
         try:
-            from google.genai import types
-            from config import Config
-
-            client = get_gemini_client()
-
-            prompt = f"""この画像から読み取れる情報（文字、ロゴ、署名、特徴など）を手がかりに、写っているものを特定し、詳しい情報を提供してください。
-
-元の質問: {context.prompt}
-簡潔な回答: {context.brief_analysis}
-
-■ 対象別に提供すべき情報:
-- 本 → タイトル、作者、あらすじ、ジャンル、出版年、評価など
-- アート作品 → 作品名、作者、制作年、作品の意味や背景、美術史的な位置づけなど
-- 場所・店舗 → 正式名称、どんな場所か、歴史、名物、特徴など
-- 商品 → 商品名、ブランド、用途、特徴、価格帯など
-- 人物 → 名前、職業、経歴、有名な業績など
-- 食べ物 → 料理名、由来、材料、発祥地など
-
-■ 重要:
-- 画像内の文字やロゴを読み取って特定の手がかりにする
-- 見た目の説明ではなく「調べたら分かる情報」を提供する
-- 特定できない場合は一般的な情報でも可
-
-以下の形式でMarkdown形式で回答してください：
-
-## 概要
-（これが何か1文で特定）
-
-## 詳細情報
-（上記の対象別情報を参考に、知りたくなるような情報を詳しく）
-
-## 補足
-（1-2文で豆知識）
-
-日本語で回答してください。"""
-
-            response = client.models.generate_content(
-                model=Config.VISION_MODEL,
-                contents=[
-                    types.Content(
-                        role="user",
-                        parts=[
-                            types.Part(text=prompt),
-                            types.Part(
-                                inline_data=types.Blob(
-                                    mime_type="image/jpeg",
-                                    data=context.image_data
-                                )
-                            )
-                        ]
-                    )
-                ],
-                config=types.GenerateContentConfig(
-                    max_output_tokens=1500
-                )
-            )
-
-            detail_analysis = response.text
-
+            detail_analysis = _get_detail_analysis(context)
         except Exception:
             return CapabilityResult.fail("詳細情報を取得できませんでした")
 
@@ -12,17 +12,16 @@ import logging
 import os
 import requests
 from datetime import datetime, timedelta
+from importlib.util import find_spec
 from typing import Any, Callable, Dict, Optional
 
 from config import Config
 
 logger = logging.getLogger("email_to_calendar")
 
-# Gemini API
+# Gemini API（読み込みは予定を抽出する時）
 try:
-    from google import genai
-    from google.genai import types
-    GEMINI_AVAILABLE = True
+    GEMINI_AVAILABLE = find_spec("google.genai") is not None
 except ImportError:
     GEMINI_AVAILABLE = False
 
@@ -48,14 +47,12 @@ def _get_calendar_service():
         return None
 
 
-def _get_gemini_client():
-    """Geminiクライアントを取得"""
-    if not GEMINI_AVAILABLE:
-        return None
+def _get_calendar_store():
+    """予定のキャッシュを取得"""
     try:
-        api_key = Config.get_google_api_key()
-        return genai.Client(api_key=api_key)
-    except Exception:
+        from .calendar import get_calendar_store
+        return get_calendar_store()
+    except ImportError:
         return None
 
 
@@ -152,8 +149,7 @@ def _set_alarm(time_str: str, label: str, message: str) -> bool:
 
 def _extract_schedule(to: str, subject: str, body: str) -> Optional[Dict[str, Any]]:
     """メールから予定情報を抽出"""
-    client = _get_gemini_client()
-    if not client:
+    if not GEMINI_AVAILABLE:
         return None
 
     today = datetime.now()
@@ -196,8 +192,11 @@ def _extract_schedule(to: str, subject: str, body: str) -> Optional[Dict[str, An
 }}"""
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
+        from google.genai import types
+        from core.llm_gateway import get_llm_gateway, PRIORITY_BACKGROUND
+
+        response = get_llm_gateway().generate(
+            "schedule_extract",
             contents=[
                 types.Content(
                     role="user",
@@ -206,9 +205,9 @@ def _extract_schedule(to: str, subject: str, body: str) -> Optional[Dict[str, An
             ],
             config=types.GenerateContentConfig(
                 system_instruction="あなたはメールから予定情報を抽出するアシスタントです。JSONのみを返してください。",
-                max_output_tokens=300,
                 response_mime_type="application/json"
-            )
+            ),
+            priority=PRIORITY_BACKGROUND
         )
 
         result_text = response.text
@@ -264,9 +263,12 @@ def _add_to_calendar(schedule: Dict[str, Any], to: str, subject: str) -> bool:
             },
         }
 
-        calendar_service.events().insert(
+        created = calendar_service.events().insert(
             calendarId='primary', body=event
         ).execute()
+        store = _get_calendar_store()
+        if store:
+            store.add(created)
 
         logger.info(f"カレンダーに追加: {title} @ {start_dt.strftime('%m/%d %H:%M')}")
         return True
@@ -4,19 +4,19 @@ Capability実行エンジン
 ツール呼び出しを受けて適切なCapabilityを実行
 """
 
-from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, Dict, FrozenSet, Iterable, List, Optional
 
 from .base import Capability, CapabilityResult
-from .vision import VISION_CAPABILITIES
-from .communication import COMMUNICATION_CAPABILITIES
-from .schedule import SCHEDULE_CAPABILITIES
-from .memory import MEMORY_CAPABILITIES
-from .search import SEARCH_CAPABILITIES
-from .calendar import CALENDAR_CAPABILITIES
-from .videocall import VIDEOCALL_CAPABILITIES
-from .detail_info import DETAIL_INFO_CAPABILITIES
-from .music import MUSIC_CAPABILITIES
-from .openclaw import OPENCLAW_CAPABILITIES
+from .tool_profiles import (
+    TOOL_PROFILE_CAPABILITIES, META_GROUP, ALL_GROUPS,
+    ToolUsageStats, select_tool_profile
+)
+from config import Config
+
+logger = logging.getLogger("conversation")
 
 
 class CapabilityExecutor:
@@ -24,10 +24,34 @@ class CapabilityExecutor:
 
     def __init__(self):
         self._capabilities: Dict[str, Capability] = {}
+        # 同期Capability専用のワーカープール（Google API等のブロッキング呼び出し用）
+        self._sync_pool = ThreadPoolExecutor(
+            max_workers=Config.CAPABILITY_WORKERS,
+            thread_name_prefix="capability"
+        )
+        # 非同期Capabilityを実行するメインイベントループ
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 登録内容が変わるたびに増える版数（ツール定義キャッシュの無効化用）
+        self._registry_version = 0
+        self._tools_cache: Dict[Optional[FrozenSet[str]], List[Dict[str, Any]]] = {}
+        self._tools_cache_version = -1
+        # ツールグループの利用統計（セッション開始時のツール選択に使用）
+        self.usage = ToolUsageStats(Config.TOOL_USAGE_PATH)
         self._register_all()
 
     def _register_all(self) -> None:
-        """すべてのCapabilityを登録"""
+        """すべてのCapabilityを登録（各モジュールはここで初めて読み込む）"""
+        from .vision import VISION_CAPABILITIES
+        from .communication import COMMUNICATION_CAPABILITIES
+        from .schedule import SCHEDULE_CAPABILITIES
+        from .memory import MEMORY_CAPABILITIES
+        from .search import SEARCH_CAPABILITIES
+        from .calendar import CALENDAR_CAPABILITIES
+        from .videocall import VIDEOCALL_CAPABILITIES
+        from .detail_info import DETAIL_INFO_CAPABILITIES
+        from .music import MUSIC_CAPABILITIES
+        from .openclaw import OPENCLAW_CAPABILITIES
+
         all_capabilities = (
             VISION_CAPABILITIES +
             COMMUNICATION_CAPABILITIES +
@@ -38,32 +62,130 @@ class CapabilityExecutor:
             VIDEOCALL_CAPABILITIES +
             DETAIL_INFO_CAPABILITIES +
             MUSIC_CAPABILITIES +
-            OPENCLAW_CAPABILITIES
+            OPENCLAW_CAPABILITIES +
+            TOOL_PROFILE_CAPABILITIES
         )
         for cap in all_capabilities:
-            self._capabilities[cap.name] = cap
+            self.register(cap)
+
+    @property
+    def registry_version(self) -> int:
+        """Capability登録の版数"""
+        return self._registry_version
+
+    def register(self, cap: Capability) -> None:
+        """Capabilityを登録（同名は置き換え）"""
+        self._capabilities[cap.name] = cap
+        self._registry_version += 1
+
+    def unregister(self, name: str) -> None:
+        """Capabilityの登録を解除"""
+        if self._capabilities.pop(name, None) is not None:
+            self._registry_version += 1
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """非同期Capabilityを実行するメインイベントループを設定"""
+        self._loop = loop
+
+    def run_coroutine(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """コルーチンをメインイベントループ上で実行して結果を待つ（同期呼び出し用）
+
+        別スレッドから呼ばれた場合はメインループに投入する。
+        メインループが未設定の場合のみ一時的なループで実行する。
+        """
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return asyncio.run(coro)
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("イベントループ上からは execute_async を使用してください")
+
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        return future.result(timeout=timeout)
 
     def execute(self, name: str, arguments: Dict[str, Any]) -> CapabilityResult:
-        """Capabilityを実行"""
+        """Capabilityを実行（同期）"""
         cap = self._capabilities.get(name)
         if not cap:
             return CapabilityResult.fail("できませんでした")
 
+        self.usage.record(cap.tool_group)
         try:
             return cap.execute(**arguments)
         except Exception as e:
             # 技術的なエラーは隠蔽
+            logger.error(f"Capability実行エラー ({name}): {e}")
+            return CapabilityResult.fail("今はできません")
+
+    async def execute_async(self, name: str, arguments: Dict[str, Any]) -> CapabilityResult:
+        """Capabilityを実行（非同期）
+
+        ネイティブの非同期Capabilityはこのループ上でawaitし、
+        同期Capabilityは専用プールで実行してイベントループを塞がない。
+        """
+        cap = self._capabilities.get(name)
+        if not cap:
+            return CapabilityResult.fail("できませんでした")
+
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+
+        self.usage.record(cap.tool_group)
+
+        try:
+            if cap.is_async:
+                return await cap.execute_async(**arguments)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._sync_pool, lambda: cap.execute(**arguments)
+            )
+        except Exception as e:
+            # 技術的なエラーは隠蔽
+            logger.error(f"Capability実行エラー ({name}): {e}")
             return CapabilityResult.fail("今はできません")
 
+    def shutdown(self) -> None:
+        """ワーカープールを停止"""
+        self._sync_pool.shutdown(wait=False, cancel_futures=True)
+
     def get_capability(self, name: str) -> Optional[Capability]:
         """Capabilityを取得"""
         return self._capabilities.get(name)
 
-    def get_gemini_tools(self) -> List[Dict[str, Any]]:
-        """Gemini Live API用のツール定義を取得"""
+    def select_tool_profile(self, pinned: Iterable[str] = ()) -> Optional[FrozenSet[str]]:
+        """利用統計からセッション開始時のツールグループを選択（Noneは全ツール）"""
+        return select_tool_profile(self.usage, pinned)
+
+    def get_gemini_tools(self, groups: Optional[FrozenSet[str]] = None) -> List[Dict[str, Any]]:
+        """Gemini Live API用のツール定義を取得（登録が変わるまでキャッシュ）
+
+        Args:
+            groups: 含めるツールグループ。Noneなら全ツール
+        """
+        if self._tools_cache_version != self._registry_version:
+            self._tools_cache = {}
+            self._tools_cache_version = self._registry_version
+        if groups not in self._tools_cache:
+            self._tools_cache[groups] = self._build_gemini_tools(groups)
+        return self._tools_cache[groups]
+
+    def _build_gemini_tools(self, groups: Optional[FrozenSet[str]] = None) -> List[Dict[str, Any]]:
+        """ツール定義を組み立て"""
         function_declarations = []
 
         for cap in self._capabilities.values():
+            if cap.tool_group == META_GROUP:
+                # 拡張用ツールは絞り込みセッションでのみ送る
+                if groups is None or groups >= ALL_GROUPS:
+                    continue
+            elif groups is not None and cap.tool_group not in groups:
+                continue
+
             tool_def = cap.get_tool_definition()
             params = tool_def.get("parameters", {})
             properties = params.get("properties", {})
@@ -0,0 +1,151 @@
+"""
+Google API（Gmail・カレンダー）の認証とサービスの用意
+
+起動を待たせないように:
+- 保存済みのトークンを読むだけで初期化を終える（期限切れの更新はバックグラウンドで）
+- サービスは最初に使う時に作る（APIの定義はライブラリ同梱のもの＝static discoveryを使い、
+  ネットワークから取得しない）
+- トークンは期限の少し前に更新しておき、最初のリクエストで更新を待たないようにする
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from importlib.util import find_spec
+from typing import Any, List, Optional
+
+logger = logging.getLogger("conversation")
+
+
+def _installed(name: str) -> bool:
+    try:
+        return find_spec(name) is not None
+    except ImportError:  # 親パッケージ（google）がない
+        return False
+
+
+# ライブラリは使う時に読み込む（googleapiclient.discovery などは読み込みだけで重い）
+GOOGLE_API_AVAILABLE = all(
+    _installed(name) for name in ("google.oauth2", "google_auth_oauthlib", "googleapiclient")
+)
+
+# 期限のこれだけ前に更新する
+REFRESH_MARGIN = timedelta(minutes=5)
+# 更新に失敗した時に再試行するまでの秒数
+REFRESH_RETRY_SEC = 60
+
+# ブラウザでの認証フローは同時に1つだけ（ポートやブラウザ画面の取り合いを防ぐ）
+_auth_flow_lock = threading.Lock()
+
+
+def load_credentials(token_path: str, scopes: List[str], client_secrets_path: str):
+    """保存済みのトークンを読む（ネットワークは使わない）
+
+    トークンがなければ認証フローを行う（初回のみ）。
+
+    Returns:
+        Credentials（使えなければNone）
+    """
+    creds = _read_token(token_path, scopes)
+    if creds:
+        return creds
+
+    if not os.path.exists(client_secrets_path):
+        return None
+    with _auth_flow_lock:
+        # 待っている間に別スレッドが同じトークンを作っていればそれを使う
+        creds = _read_token(token_path, scopes)
+        if creds:
+            return creds
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        flow = InstalledAppFlow.from_client_secrets_file(client_secrets_path, scopes)
+        creds = flow.run_local_server(port=0)
+        save_credentials(creds, token_path)
+    return creds
+
+
+def _read_token(token_path: str, scopes: List[str]):
+    """保存済みのトークンが使えれば返す（なければNone）"""
+    from google.oauth2.credentials import Credentials
+
+    if not os.path.exists(token_path):
+        return None
+    creds = Credentials.from_authorized_user_file(token_path, scopes)
+    if creds.valid or creds.refresh_token:
+        return creds
+    return None
+
+
+def save_credentials(creds, token_path: str) -> None:
+    os.makedirs(os.path.dirname(token_path), exist_ok=True)
+    with open(token_path, 'w') as token:
+        token.write(creds.to_json())
+
+
+def build_service(api: str, version: str, creds):
+    """サービスを作る（同梱のAPI定義を使う）"""
+    from googleapiclient.discovery import build
+    return build(api, version, credentials=creds, static_discovery=True, cache_discovery=False)
+
+
+class LazyService:
+    """最初に使う時にサービスを作るプロキシ
+
+    service.users().messages()... のように、そのままサービスとして使える。
+    """
+
+    def __init__(self, api: str, version: str, creds):
+        self._api = api
+        self._version = version
+        self._creds = creds
+        self._service = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = build_service(self._api, self._version, self._creds)
+        return self._service
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
+
+
+class TokenRefresher:
+    """トークンを期限前にバックグラウンドで更新するスレッド"""
+
+    def __init__(self, creds, token_path: str, name: str):
+        self.creds = creds
+        self.token_path = token_path
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"token-refresh-{name}")
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _next_refresh(self) -> float:
+        """次に更新するまでの秒数"""
+        expiry: Optional[datetime] = self.creds.expiry  # UTC（naive）
+        if not self.creds.token or expiry is None:
+            return 0
+        return max(0.0, (expiry - REFRESH_MARGIN - datetime.utcnow()).total_seconds())
+
+    def _run(self) -> None:
+        from google.auth.transport.requests import Request
+
+        while not self._stop.is_set():
+            wait = self._next_refresh()
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+            try:
+                self.creds.refresh(Request())
+                save_credentials(self.creds, self.token_path)
+            except Exception as e:
+                logger.error(f"トークン更新エラー: {e}")
+                self._stop.wait(REFRESH_RETRY_SEC)
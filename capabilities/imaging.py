@@ -0,0 +1,149 @@
+"""
+画像の前処理（Gemini Vision送信用）
+
+用途ごとに解像度とJPEG品質を選んで送信サイズを減らす:
+- movement: 移動検知（背景が分かれば十分）
+- brief: 「これ何？」などの簡潔な回答
+- ocr: 文字の読み取り・翻訳・詳細情報（撮影解像度のまま）
+
+Geminiは画像を768x768のタイルに分けてトークン化するため、
+briefは1タイルに収まるサイズにしている。
+縮小はJPEGのDCTスケーリング（draft）で行い、フル解像度のデコードを避ける。
+同じ撮影画像から作った変換結果はキャッシュして再利用する。
+
+また、同じ場面かどうかの判定に使う知覚ハッシュ（dHash）も提供する。
+"""
+
+import io
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Pillow（なければ元の画像をそのまま送る）
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger("conversation")
+
+
+@dataclass(frozen=True)
+class ImagePreset:
+    """送信用画像の設定"""
+    max_width: int
+    max_height: int
+    quality: int
+
+
+IMAGE_PRESETS = {
+    "movement": ImagePreset(384, 288, 60),
+    "brief": ImagePreset(768, 576, 75),
+    "ocr": ImagePreset(1280, 960, 90),
+}
+
+# 文字を読む必要がある質問（フル解像度で送る）
+OCR_KEYWORDS = (
+    "読んで", "読み", "文字", "書いて", "書か", "翻訳", "訳して", "英語", "漢字",
+    "値段", "価格", "いくら", "番号", "メニュー", "ラベル", "看板", "問題", "答え",
+)
+
+_CACHE_SIZE = 8  # 撮影画像数×プリセット数の上限
+_cache: "OrderedDict[Tuple[int, int, str], bytes]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def select_preset(prompt: Optional[str]) -> str:
+    """質問内容からプリセット名を選ぶ"""
+    if prompt and any(keyword in prompt for keyword in OCR_KEYWORDS):
+        return "ocr"
+    return "brief"
+
+
+def _encode(image_data: bytes, preset: ImagePreset) -> bytes:
+    with Image.open(io.BytesIO(image_data)) as image:
+        box = (preset.max_width, preset.max_height)
+        if image.width <= box[0] and image.height <= box[1]:
+            return image_data
+
+        # DCTスケーリングで1/2, 1/4, 1/8に縮小してからデコード
+        image.draft("RGB", box)
+        image = image.convert("RGB")
+        image.thumbnail(box, Image.Resampling.BILINEAR)
+
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=preset.quality)
+        return output.getvalue()
+
+
+def prepare_image(image_data: bytes, preset_name: str = "brief") -> bytes:
+    """送信用に縮小・再圧縮したJPEGを返す（失敗時は元の画像）
+
+    Args:
+        image_data: 撮影したJPEG
+        preset_name: IMAGE_PRESETSのキー
+    """
+    preset = IMAGE_PRESETS.get(preset_name)
+    if not PIL_AVAILABLE or preset is None or not image_data:
+        return image_data
+
+    key = (hash(image_data), len(image_data), preset_name)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    try:
+        prepared = _encode(image_data, preset)
+    except Exception as e:
+        logger.debug(f"画像前処理エラー: {e}")
+        return image_data
+
+    # 再圧縮で大きくなる場合は元の画像を使う
+    if len(prepared) >= len(image_data):
+        prepared = image_data
+    logger.debug(
+        f"画像前処理 ({preset_name}): {len(image_data) // 1024}KB -> {len(prepared) // 1024}KB"
+    )
+
+    with _cache_lock:
+        _cache[key] = prepared
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return prepared
+
+
+def image_dhash(image_data: bytes, hash_size: int = 8) -> Optional[int]:
+    """知覚ハッシュ（dHash）を計算（hash_size^2ビット、失敗時はNone）
+
+    縮小したグレースケール画像の隣り合う画素の明暗差をビットにしたもの。
+    同じ場面なら露出やノイズが多少違ってもハミング距離が小さくなる。
+    """
+    if not PIL_AVAILABLE or not image_data:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            image.draft("L", (hash_size * 8, hash_size * 8))
+            return dhash_from_image(image.convert("L"), hash_size)
+    except Exception as e:
+        logger.debug(f"画像ハッシュ計算エラー: {e}")
+        return None
+
+
+def dhash_from_image(gray, hash_size: int = 8) -> int:
+    """デコード済みのグレースケール画像（PIL.Image）からdHashを計算"""
+    small = gray.resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """2つのハッシュのハミング距離"""
+    return bin(a ^ b).count("1")
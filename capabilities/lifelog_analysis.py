@@ -0,0 +1,235 @@
+"""
+ライフログの分析（端末からまとめてGeminiに送る）
+
+保存した写真（同じ場面は省略済み）のうち未分析のものを、
+8〜16枚ずつ1回のGeminiリクエストにまとめて説明文を付ける。
+- 結果はJSONで受け取り、索引（全文検索）とFirebaseの analyzed / analysis に書き込む
+  （Firebaseへはバッチごとに1回のマルチパス更新）
+- 1回のリクエストは同じ日付の写真だけにする（撮影時刻HHMMSSで結果を対応付けるため）
+- 1日に使うトークン数の上限と、リクエストの最短間隔を守る
+- 写真1枚ごとにリクエストするよりも、プロンプトや通信のオーバーヘッドが約1/10になる
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+from .imaging import prepare_image
+from .lifelog_index import LifelogIndex
+
+logger = logging.getLogger("conversation")
+
+# 画像1枚あたりの入力トークン数（768px以下の画像は1タイル=258トークン）
+TOKENS_PER_IMAGE = 258
+# 写真1枚あたりの出力トークン数の目安
+TOKENS_PER_ANSWER = 80
+# プロンプト分
+PROMPT_TOKENS = 300
+# 分析に失敗した写真を諦めるまでの回数
+MAX_ATTEMPTS = 3
+
+ANALYSIS_PROMPT = """以下は首にかけたカメラで自動撮影したライフログ写真です。
+各写真の前に [撮影時刻] を付けています。
+
+それぞれの写真について、後で「あの時どこで何をしていたか」を思い出せるように、
+場所・していること・写っている主な物や人・読める文字を日本語で1〜2文にまとめてください。
+
+以下のJSON形式（写真ごとに1要素の配列）で回答してください:
+[
+  {"time": "HHMMSS", "analysis": "説明"}
+]"""
+
+
+def estimate_tokens(count: int) -> int:
+    """写真count枚を1回で分析する時のトークン数の見積もり"""
+    return PROMPT_TOKENS + count * (TOKENS_PER_IMAGE + TOKENS_PER_ANSWER)
+
+
+def _parse_results(text: str) -> Dict[str, str]:
+    """Geminiの回答から {HHMMSS: 説明} を取り出す"""
+    data = json.loads(text)
+    if isinstance(data, dict):
+        # {"results": [...]} のように包まれていても受け付ける
+        data = next((v for v in data.values() if isinstance(v, list)), [])
+    results = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        time_str = str(item.get("time", "")).replace(":", "")
+        analysis = str(item.get("analysis", "")).strip()
+        if len(time_str) == 6 and analysis:
+            results[time_str] = analysis
+    return results
+
+
+class LifelogAnalyzer:
+    """未分析のライフログ写真をまとめて分析するバックグラウンドスレッド"""
+
+    def __init__(self, index_getter: Callable[[], Optional[LifelogIndex]],
+                 messenger_getter: Callable[[], Any]):
+        """
+        Args:
+            index_getter: ライフログの索引を返す関数
+            messenger_getter: FirebaseVoiceMessengerを返す関数（Noneなら索引だけ更新）
+        """
+        self._index_getter = index_getter
+        self._messenger_getter = messenger_getter
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._attempts: Dict[str, int] = {}
+        self._unsynced: Dict[str, str] = {}  # Firebaseに書き込めなかった分析結果
+
+        self.requests = 0
+        self.analyzed = 0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="lifelog-analyzer")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ---- 分析 ----
+
+    def _pending(self, index: LifelogIndex, wait_upload: bool) -> List[Dict[str, Any]]:
+        """分析する写真（諦めたものは除く、最も古い写真と同じ日付のものだけ）"""
+        batch_size = Config.LIFELOG_ANALYSIS_BATCH_SIZE
+        # 再送の範囲より古い未送信の写真はもうアップロードされないので、索引のためだけに分析する
+        uploaded_after = (time.time() - Config.LIFELOG_UPLOAD_RESUME_HOURS * 3600
+                          if wait_upload else None)
+        rows = index.unanalyzed(limit=batch_size * 2, uploaded_after=uploaded_after)
+        rows = [r for r in rows if self._attempts.get(f"{r['date']}/{r['time']}", 0) < MAX_ATTEMPTS]
+        rows = [r for r in rows if r["date"] == rows[0]["date"]] if rows else rows
+        return rows[:batch_size]
+
+    def run_once(self) -> int:
+        """1バッチ分析する
+
+        Returns:
+            分析できた枚数（分析する写真がない・上限に達した場合は0）
+        """
+        index = self._index_getter()
+        if index is None:
+            return 0
+        messenger = self._messenger_getter()
+        self._flush(messenger)
+
+        # Firebase連携中は、エントリが書き込まれてから分析する（アップロード時に分析結果が空で上書きされるため）
+        rows = self._pending(index, wait_upload=messenger is not None)
+        if not rows:
+            return 0
+        waited = time.time() - rows[0]["taken_at"]
+        if len(rows) < Config.LIFELOG_ANALYSIS_MIN_BATCH and waited < Config.LIFELOG_ANALYSIS_MAX_WAIT:
+            return 0
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        remaining = Config.LIFELOG_ANALYSIS_DAILY_TOKENS - index.analysis_tokens(today)
+        while rows and estimate_tokens(len(rows)) > remaining:
+            rows.pop()
+        if not rows:
+            logger.info("ライフログ分析: 今日のトークン上限に達しました")
+            return 0
+
+        results, tokens = self._analyze(rows)
+        index.add_analysis_tokens(today, tokens)
+
+        updates = {}
+        firebase_updates = {}  # Firebaseにエントリがあるものだけ
+        for row in rows:
+            key = f"{row['date']}/{row['time']}"
+            analysis = results.get(row["time"])
+            if analysis:
+                index.set_analysis(row["date"], row["time"], analysis)
+                updates[key] = analysis
+                if row["uploaded"]:
+                    firebase_updates[key] = analysis
+                self._attempts.pop(key, None)
+            else:
+                self._attempts[key] = self._attempts.get(key, 0) + 1
+
+        self.requests += 1
+        self.analyzed += len(updates)
+        if firebase_updates and messenger is not None:
+            self._unsynced.update(firebase_updates)
+            self._flush(messenger)
+        logger.info(f"ライフログ分析: {len(updates)}/{len(rows)}枚 ({tokens}トークン)")
+        return len(updates)
+
+    def _analyze(self, rows: List[Dict[str, Any]]):
+        """写真をまとめてGeminiに送る
+
+        Returns:
+            ({HHMMSS: 説明}, 使ったトークン数)
+        """
+        from google.genai import types
+        from core.llm_gateway import get_llm_gateway, PRIORITY_BACKGROUND
+        from core.model_router import route_image_preset
+
+        preset = route_image_preset("lifelog_analysis")
+
+        parts = [types.Part(text=ANALYSIS_PROMPT)]
+        for row in rows:
+            try:
+                with open(row["path"], "rb") as f:
+                    image_data = f.read()
+            except OSError:
+                continue
+            parts.append(types.Part(text=f"[{row['time']}]"))
+            parts.append(types.Part(
+                inline_data=types.Blob(mime_type="image/jpeg", data=prepare_image(image_data, preset))
+            ))
+
+        response = get_llm_gateway().generate(
+            "lifelog_analysis",
+            contents=[types.Content(role="user", parts=parts)],
+            config=types.GenerateContentConfig(
+                max_output_tokens=len(rows) * TOKENS_PER_ANSWER * 2,
+                response_mime_type="application/json"
+            ),
+            priority=PRIORITY_BACKGROUND,
+            timeout=120,
+            retries=1
+        )
+
+        usage = getattr(response, "usage_metadata", None)
+        tokens = getattr(usage, "total_token_count", None) or estimate_tokens(len(rows))
+        try:
+            results = _parse_results(response.text or "[]")
+        except (ValueError, TypeError) as e:
+            logger.error(f"ライフログ分析の結果を読めません: {e}")
+            results = {}
+        return results, tokens
+
+    def _flush(self, messenger) -> None:
+        """Firebaseに書き込めていない分析結果を送る（1回のマルチパス更新）"""
+        if not self._unsynced or messenger is None:
+            return
+        if messenger.write_lifelog_analysis(self._unsynced):
+            self._unsynced.clear()
+
+    def _run(self) -> None:
+        backoff = 0
+        while not self._stop.is_set():
+            try:
+                analyzed = self.run_once()
+                backoff = 0
+            except Exception as e:
+                logger.error(f"ライフログ分析エラー: {e}")
+                analyzed = 0
+                backoff = min(1800, max(60, backoff * 2))
+
+            if backoff:
+                wait = backoff
+            elif analyzed:
+                # 続きがあってもリクエストの間隔は空ける
+                wait = Config.LIFELOG_ANALYSIS_MIN_INTERVAL
+            else:
+                wait = max(Config.LIFELOG_ANALYSIS_MIN_INTERVAL, 300)
+            self._stop.wait(wait)
@@ -0,0 +1,377 @@
+"""
+ライフログの索引（SQLite）
+
+撮影・アップロード・分析のたびに少しずつ更新し、
+ファイルを数えたりクラウドに問い合わせたりせずに振り返りに答える。
+- photos: 撮影時刻・画像ハッシュ・サイズ・アップロード状態・分析結果・保存場所
+  （写真ファイル、またはタイムラプス動画とそのフレーム番号）
+- photos_fts: 分析結果の全文検索（FTS5、trigramで日本語の部分一致に対応）
+- analysis_usage: 端末での分析に使ったトークン数（日ごと）
+
+既存の ~/lifelog/YYYY-MM-DD/HHMMSS.jpg は初回に一度だけ取り込む。
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger("conversation")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'photo',
+    path TEXT,
+    dhash TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    same_as TEXT,
+    uploaded INTEGER NOT NULL DEFAULT 0,
+    analysis TEXT NOT NULL DEFAULT '',
+    thumb_path TEXT,
+    archive TEXT,
+    frame INTEGER,
+    UNIQUE(date, time)
+);
+CREATE INDEX IF NOT EXISTS photos_taken_at ON photos(taken_at);
+
+CREATE TABLE IF NOT EXISTS analysis_usage (
+    date TEXT PRIMARY KEY,
+    tokens INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS photos_fts USING fts5(
+    analysis, content='photos', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS photos_ai AFTER INSERT ON photos BEGIN
+    INSERT INTO photos_fts(rowid, analysis) VALUES (new.id, new.analysis);
+END;
+CREATE TRIGGER IF NOT EXISTS photos_ad AFTER DELETE ON photos BEGIN
+    INSERT INTO photos_fts(photos_fts, rowid, analysis) VALUES ('delete', old.id, old.analysis);
+END;
+CREATE TRIGGER IF NOT EXISTS photos_au AFTER UPDATE OF analysis ON photos BEGIN
+    INSERT INTO photos_fts(photos_fts, rowid, analysis) VALUES ('delete', old.id, old.analysis);
+    INSERT INTO photos_fts(rowid, analysis) VALUES (new.id, new.analysis);
+END;
+"""
+
+_PHOTO_NAME = re.compile(r"^(\d{6})\.jpg$")
+_DATE_NAME = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _taken_at(date: str, time_str: str) -> float:
+    return datetime.strptime(f"{date} {time_str}", "%Y-%m-%d %H%M%S").timestamp()
+
+
+class LifelogIndex:
+    """ライフログの索引"""
+
+    def __init__(self, path: str, lifelog_dir: Optional[str] = None):
+        self.path = path
+        self.lifelog_dir = lifelog_dir
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+        if lifelog_dir and self._is_empty():
+            self.import_directory(lifelog_dir)
+
+    def _migrate(self) -> None:
+        """古い索引に後から追加した列を足す"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(photos)")}
+        for column, definition in (("thumb_path", "TEXT"), ("archive", "TEXT"), ("frame", "INTEGER")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE photos ADD COLUMN {column} {definition}")
+        self._conn.commit()
+
+    def _is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM photos LIMIT 1").fetchone() is None
+
+    # ---- 更新 ----
+
+    def add_photo(self, date: str, time_str: str, path: str, size: int,
+                  dhash: Optional[int] = None, thumb_path: Optional[str] = None) -> None:
+        """保存した写真を登録（同じ撮影時刻があれば、アップロード・分析の状態は残して更新）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO photos(date, time, taken_at, kind, path, dhash, size, thumb_path) "
+                "VALUES (?, ?, ?, 'photo', ?, ?, ?, ?) "
+                "ON CONFLICT(date, time) DO UPDATE SET taken_at = excluded.taken_at, "
+                "kind = excluded.kind, path = excluded.path, dhash = excluded.dhash, "
+                "size = excluded.size, thumb_path = excluded.thumb_path",
+                (date, time_str, _taken_at(date, time_str), path,
+                 f"{dhash:016x}" if dhash is not None else None, size, thumb_path)
+            )
+
+    def add_unchanged(self, date: str, time_str: str, same_as: str) -> None:
+        """「変化なし」を登録"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO photos(date, time, taken_at, kind, same_as) "
+                "VALUES (?, ?, ?, 'unchanged', ?) "
+                "ON CONFLICT(date, time) DO UPDATE SET taken_at = excluded.taken_at, "
+                "kind = excluded.kind, same_as = excluded.same_as",
+                (date, time_str, _taken_at(date, time_str), same_as)
+            )
+
+    def mark_uploaded(self, date: str, time_str: str) -> None:
+        """アップロード済みにする"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE photos SET uploaded = 1 WHERE date = ? AND time = ?", (date, time_str)
+            )
+
+    def set_analysis(self, date: str, time_str: str, analysis: str) -> None:
+        """分析結果を登録（全文検索の対象になる）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE photos SET analysis = ? WHERE date = ? AND time = ?",
+                (analysis or "", date, time_str)
+            )
+
+    def sync_analysis(self, date: str, entries: Dict[str, Dict[str, Any]]) -> int:
+        """Firebaseのライフログエントリから分析結果を取り込む
+
+        Args:
+            entries: {HHMMSS: エントリ}（lifelogs/{date} の内容）
+        Returns:
+            更新した件数
+        """
+        updates = [
+            (entry["analysis"], date, time_str)
+            for time_str, entry in entries.items()
+            if isinstance(entry, dict) and entry.get("analyzed") and entry.get("analysis")
+        ]
+        if not updates:
+            return 0
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                "UPDATE photos SET analysis = ? WHERE date = ? AND time = ? AND analysis = ''",
+                updates
+            )
+            return max(0, cursor.rowcount)
+
+    def add_analysis_tokens(self, date: str, tokens: int) -> None:
+        """分析に使ったトークン数を加算"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO analysis_usage(date, tokens) VALUES (?, ?) "
+                "ON CONFLICT(date) DO UPDATE SET tokens = tokens + excluded.tokens",
+                (date, tokens)
+            )
+
+    def remove(self, date: str, time_str: str) -> None:
+        """削除"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM photos WHERE date = ? AND time = ?", (date, time_str))
+
+    def remove_day(self, date: str) -> None:
+        """その日の記録を全て削除"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM photos WHERE date = ?", (date,))
+
+    def set_archived(self, date: str, frames: Dict[str, int], archive: str) -> None:
+        """写真をタイムラプス動画に移したことを記録（写真ファイルは削除済み）
+
+        Args:
+            frames: {HHMMSS: 動画内のフレーム番号}
+            archive: 動画のパス
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE photos SET path = NULL, archive = ?, frame = ? WHERE date = ? AND time = ?",
+                [(archive, frame, date, time_str) for time_str, frame in frames.items()]
+            )
+
+    def clear_thumbnails(self, date: str) -> None:
+        """その日のサムネイルを削除したことを記録"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE photos SET thumb_path = NULL WHERE date = ?", (date,))
+
+    def import_directory(self, lifelog_dir: str) -> int:
+        """既存の写真ファイルを取り込む（索引がない頃の分）"""
+        if not os.path.isdir(lifelog_dir):
+            return 0
+        rows = []
+        for date in sorted(os.listdir(lifelog_dir)):
+            day_dir = os.path.join(lifelog_dir, date)
+            if not _DATE_NAME.match(date) or not os.path.isdir(day_dir):
+                continue
+            for name in os.listdir(day_dir):
+                match = _PHOTO_NAME.match(name)
+                if not match:
+                    continue
+                path = os.path.join(day_dir, name)
+                try:
+                    rows.append((date, match.group(1), _taken_at(date, match.group(1)),
+                                 path, os.path.getsize(path)))
+                except (OSError, ValueError):
+                    continue
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO photos(date, time, taken_at, kind, path, size) "
+                "VALUES (?, ?, ?, 'photo', ?, ?)", rows
+            )
+        if rows:
+            logger.info(f"ライフログ索引: 既存の写真{len(rows)}枚を取り込みました")
+        return len(rows)
+
+    # ---- 検索 ----
+
+    def days(self) -> List[str]:
+        """記録のある日付（古い順）"""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT date FROM photos ORDER BY date").fetchall()
+        return [row[0] for row in rows]
+
+    def photos_of_day(self, date: str) -> List[Dict[str, Any]]:
+        """その日の写真（撮影順）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM photos WHERE date = ? AND kind = 'photo' ORDER BY taken_at", (date,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def unanalyzed(self, limit: int = 16,
+                   uploaded_after: Optional[float] = None) -> List[Dict[str, Any]]:
+        """まだ分析していない写真（古い順、写真ファイルが残っているもの）
+
+        Args:
+            uploaded_after: 指定すると、これより後に撮影した写真はアップロード済みのものだけ
+        """
+        sql = "SELECT * FROM photos WHERE kind = 'photo' AND analysis = '' AND path IS NOT NULL"
+        params: List[Any] = []
+        if uploaded_after is not None:
+            sql += " AND (uploaded = 1 OR taken_at < ?)"
+            params.append(uploaded_after)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY taken_at LIMIT ?", params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def pending_uploads(self, since: float) -> List[Dict[str, Any]]:
+        """まだアップロードしていない写真・「変化なし」（古い順、sinceより後に撮影したもの）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM photos WHERE uploaded = 0 AND taken_at >= ? AND "
+                "((kind = 'photo' AND path IS NOT NULL) OR kind = 'unchanged') ORDER BY taken_at",
+                (since,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def unfinished_count(self, date: str, upload_since: Optional[float] = None,
+                         analysis: bool = True) -> int:
+        """その日の写真のうち、アップロード・分析を待っているものの数
+
+        Args:
+            upload_since: 指定すると、これより後に撮影した未送信の写真を数える（再送の範囲）
+            analysis: Trueなら未分析の写真を数える
+        """
+        conditions = []
+        params: List[Any] = [date]
+        if upload_since is not None:
+            conditions.append("(uploaded = 0 AND taken_at >= ?)")
+            params.append(upload_since)
+        if analysis:
+            conditions.append("analysis = ''")
+        if not conditions:
+            return 0
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM photos WHERE date = ? AND kind = 'photo' AND path IS NOT NULL "
+                "AND (" + " OR ".join(conditions) + ")", params
+            ).fetchone()
+        return int(row[0])
+
+    def analysis_tokens(self, date: str) -> int:
+        """その日に分析で使ったトークン数"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tokens FROM analysis_usage WHERE date = ?", (date,)
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    def count(self, date: str) -> Tuple[int, int]:
+        """その日の(写真の枚数, 変化なしの回数)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT SUM(kind = 'photo'), SUM(kind = 'unchanged') FROM photos WHERE date = ?",
+                (date,)
+            ).fetchone()
+        return int(row[0] or 0), int(row[1] or 0)
+
+    def around(self, timestamp: float, window: float = 1800,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """指定時刻の前後window秒の写真（近い順）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM photos WHERE kind = 'photo' AND taken_at BETWEEN ? AND ? "
+                "ORDER BY ABS(taken_at - ?) LIMIT ?",
+                (timestamp - window, timestamp + window, timestamp, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, query: str, date: Optional[str] = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """分析結果を全文検索（新しい順）
+
+        trigramは3文字以上の語しか引けないので、短い語はLIKEで探す。
+        """
+        terms = [t for t in re.split(r"\s+", query.strip()) if t]
+        if not terms:
+            return []
+
+        conditions = []
+        params: List[Any] = []
+        fts_terms = [t for t in terms if len(t) >= 3]
+        if fts_terms:
+            conditions.append("id IN (SELECT rowid FROM photos_fts WHERE photos_fts MATCH ?)")
+            params.append(" AND ".join('"' + t.replace('"', '""') + '"' for t in fts_terms))
+        for term in terms:
+            if len(term) < 3:
+                # %や_は文字そのものとして探す
+                escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                conditions.append("analysis LIKE ? ESCAPE '\\'")
+                params.append(f"%{escaped}%")
+        if date:
+            conditions.append("date = ?")
+            params.append(date)
+
+        sql = ("SELECT * FROM photos WHERE kind = 'photo' AND " + " AND ".join(conditions)
+               + " ORDER BY taken_at DESC LIMIT ?")
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# シングルトン
+_lifelog_index: Optional[LifelogIndex] = None
+_lifelog_index_lock = threading.Lock()
+
+
+def get_lifelog_index() -> LifelogIndex:
+    """ライフログの索引を取得（初回は既存の写真を取り込む）"""
+    global _lifelog_index
+    with _lifelog_index_lock:
+        if _lifelog_index is None:
+            _lifelog_index = LifelogIndex(Config.LIFELOG_INDEX_PATH, Config.LIFELOG_DIR)
+        return _lifelog_index
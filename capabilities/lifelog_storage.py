@@ -0,0 +1,281 @@
+"""
+ライフログの保存容量の管理
+
+- サムネイル: 撮影時に小さなWebP（なければJPEG）を作り、アップロード・一覧表示に使う
+- タイムラプス: 数日たった日の写真を1本の動画（H.264）にまとめ、元の写真を削除
+  （アップロード・分析を待っている写真がある日は、一定の日数までまとめずに待つ）
+- 保存期間・容量: 古い日から削除して、SDカードの使用量を上限内に収める
+
+圧縮ジョブはバックグラウンドスレッドで、低い優先度（nice）・負荷が低い時だけ動く。
+バッテリーで動いている（放電中の）間は動かさない。
+"""
+
+import glob
+import io
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from fractions import Fraction
+from importlib.util import find_spec
+from typing import Callable, Optional
+
+from config import Config
+from .imaging import PIL_AVAILABLE
+from .lifelog_index import LifelogIndex
+
+if PIL_AVAILABLE:
+    from PIL import Image, features as pil_features
+
+# PyAV（タイムラプスの作成用。読み込みは初めて作成する時）
+AV_AVAILABLE = find_spec("av") is not None
+
+logger = logging.getLogger("conversation")
+
+THUMBNAIL_DIR = "thumbs"
+TIMELAPSE_NAME = "timelapse.mp4"
+
+
+# ---- サムネイル ----
+
+def _thumbnail_format() -> str:
+    return "WEBP" if pil_features.check("webp") else "JPEG"
+
+
+def write_thumbnail(image_path: str, image_data: bytes) -> Optional[str]:
+    """写真のサムネイルを同じ日のthumbs/に保存してパスを返す（失敗時はNone）"""
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        image_format = _thumbnail_format()
+        with Image.open(io.BytesIO(image_data)) as image:
+            image.draft("RGB", Config.LIFELOG_THUMBNAIL_SIZE)
+            image = image.convert("RGB")
+            image.thumbnail(Config.LIFELOG_THUMBNAIL_SIZE, Image.Resampling.BILINEAR)
+
+            thumb_dir = os.path.join(os.path.dirname(image_path), THUMBNAIL_DIR)
+            os.makedirs(thumb_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(image_path))[0]
+            suffix = ".webp" if image_format == "WEBP" else ".jpg"
+            thumb_path = os.path.join(thumb_dir, name + suffix)
+            image.save(thumb_path, format=image_format, quality=Config.LIFELOG_THUMBNAIL_QUALITY)
+        return thumb_path
+    except Exception as e:
+        logger.debug(f"サムネイル作成エラー: {e}")
+        return None
+
+
+# ---- タイムラプス ----
+
+def encode_timelapse(index: LifelogIndex, date: str, day_dir: str) -> bool:
+    """その日の写真をタイムラプス動画にまとめ、元の写真を削除"""
+    if not AV_AVAILABLE or not PIL_AVAILABLE:
+        return False
+    import av
+
+    photos = [p for p in index.photos_of_day(date) if p["path"] and os.path.exists(p["path"])]
+    if not photos:
+        return False
+
+    width, height = Config.LIFELOG_TIMELAPSE_SIZE
+    output_path = os.path.join(day_dir, TIMELAPSE_NAME)
+    temp_path = output_path + ".tmp"
+    frames = {}
+
+    try:
+        with av.open(temp_path, mode="w", format="mp4") as container:
+            stream = container.add_stream("libx264", rate=Fraction(Config.LIFELOG_TIMELAPSE_FPS))
+            stream.width = width
+            stream.height = height
+            stream.pix_fmt = "yuv420p"
+            stream.options = {"crf": str(Config.LIFELOG_TIMELAPSE_CRF), "preset": "veryfast"}
+
+            for photo in photos:
+                try:
+                    with Image.open(photo["path"]) as image:
+                        image.draft("RGB", (width, height))
+                        image = image.convert("RGB").resize((width, height), Image.Resampling.BILINEAR)
+                except Exception:
+                    continue
+                frame = av.VideoFrame.from_image(image)
+                frame.pts = len(frames)
+                for packet in stream.encode(frame):
+                    container.mux(packet)
+                frames[photo["time"]] = len(frames)
+
+            for packet in stream.encode():
+                container.mux(packet)
+    except Exception as e:
+        logger.error(f"タイムラプス作成エラー ({date}): {e}")
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        return False
+
+    if not frames:
+        os.unlink(temp_path)
+        return False
+
+    os.replace(temp_path, output_path)
+    index.set_archived(date, frames, output_path)
+    freed = 0
+    for photo in photos:
+        if photo["time"] in frames:
+            try:
+                freed += os.path.getsize(photo["path"])
+                os.unlink(photo["path"])
+            except OSError:
+                pass
+    logger.info(
+        f"タイムラプス作成: {date} {len(frames)}枚 "
+        f"{freed // 1024 // 1024}MB -> {os.path.getsize(output_path) // 1024 // 1024}MB"
+    )
+    return True
+
+
+# ---- 保存期間・容量 ----
+
+def _disk_usage(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _remove_day(index: LifelogIndex, date: str, day_dir: str) -> None:
+    shutil.rmtree(day_dir, ignore_errors=True)
+    index.remove_day(date)
+    logger.info(f"ライフログ削除: {date}")
+
+
+def _on_battery() -> bool:
+    """バッテリーで動いている（放電中）か。電源情報がなければFalse"""
+    for status_path in glob.glob("/sys/class/power_supply/*/status"):
+        try:
+            with open(status_path, "r") as f:
+                if f.read().strip() == "Discharging":
+                    return True
+        except OSError:
+            continue
+    return False
+
+
+def _is_idle() -> bool:
+    """圧縮ジョブを動かしてよいか（負荷が低く、放電中でない）"""
+    try:
+        if os.getloadavg()[0] > Config.LIFELOG_COMPACTION_MAX_LOAD:
+            return False
+    except OSError:
+        pass
+    return not _on_battery()
+
+
+def _deferred(index: LifelogIndex, date: str, defer_after: str, upload_since: Optional[float]) -> bool:
+    """アップロード・分析を待っている写真があり、まだまとめない日か"""
+    if date < defer_after:
+        return False
+    return index.unfinished_count(
+        date, upload_since=upload_since, analysis=Config.LIFELOG_ANALYSIS_ENABLED
+    ) > 0
+
+
+def compact(index: LifelogIndex, lifelog_dir: str = None, today: Optional[str] = None,
+            uploading: bool = False) -> None:
+    """タイムラプス化・保存期間・容量上限を適用
+
+    Args:
+        uploading: Firebaseにアップロードしている（未送信の写真を残しておく）
+    """
+    lifelog_dir = lifelog_dir or Config.LIFELOG_DIR
+    now = datetime.strptime(today, "%Y-%m-%d") if today else datetime.now()
+    timelapse_before = (now - timedelta(days=Config.LIFELOG_TIMELAPSE_AFTER_DAYS)).strftime("%Y-%m-%d")
+    retention_before = (now - timedelta(days=Config.LIFELOG_RETENTION_DAYS)).strftime("%Y-%m-%d")
+    defer_after = (now - timedelta(days=Config.LIFELOG_COMPACTION_MAX_DEFER_DAYS)).strftime("%Y-%m-%d")
+    upload_since = (now.timestamp() - Config.LIFELOG_UPLOAD_RESUME_HOURS * 3600) if uploading else None
+
+    days = index.days()
+
+    # 保存期間を過ぎた日は削除
+    for date in days:
+        if date < retention_before:
+            _remove_day(index, date, os.path.join(lifelog_dir, date))
+    days = [d for d in days if d >= retention_before]
+
+    # 数日たった日はタイムラプスにまとめる
+    for date in days:
+        if date >= timelapse_before:
+            break
+        day_dir = os.path.join(lifelog_dir, date)
+        if (not os.path.exists(os.path.join(day_dir, TIMELAPSE_NAME))
+                and not _deferred(index, date, defer_after, upload_since)):
+            encode_timelapse(index, date, day_dir)
+
+    # 容量上限を超えていれば古い日から削除（まず写真をまとめ、次にサムネイル、最後に日ごと）
+    budget = Config.LIFELOG_DISK_BUDGET_MB * 1024 * 1024
+    usage = _disk_usage(lifelog_dir)
+    for date in days:
+        if usage <= budget or date >= now.strftime("%Y-%m-%d"):
+            break
+        day_dir = os.path.join(lifelog_dir, date)
+        if (not os.path.exists(os.path.join(day_dir, TIMELAPSE_NAME))
+                and not _deferred(index, date, defer_after, upload_since)):
+            encode_timelapse(index, date, day_dir)
+        thumb_dir = os.path.join(day_dir, THUMBNAIL_DIR)
+        if os.path.isdir(thumb_dir):
+            shutil.rmtree(thumb_dir, ignore_errors=True)
+            index.clear_thumbnails(date)
+        usage = _disk_usage(lifelog_dir)
+        if usage > budget:
+            _remove_day(index, date, day_dir)
+            usage = _disk_usage(lifelog_dir)
+
+
+class LifelogCompactor:
+    """圧縮ジョブのバックグラウンドスレッド"""
+
+    def __init__(self, index_getter, uploading: Callable[[], bool] = lambda: False):
+        """
+        Args:
+            uploading: Firebaseにアップロードしているかを返す関数
+        """
+        self._index_getter = index_getter
+        self._uploading = uploading
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="lifelog-compactor")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        # このスレッドだけ優先度を下げる（Linuxではスレッド単位でnice値を持つ）
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+        # 起動直後は避ける
+        if self._stop.wait(300):
+            return
+        while not self._stop.is_set():
+            if not _is_idle():
+                # 忙しい・放電中なら少し待って再確認
+                self._stop.wait(300)
+                continue
+            try:
+                index = self._index_getter()
+                if index:
+                    compact(index, uploading=self._uploading())
+            except Exception as e:
+                logger.error(f"ライフログ圧縮エラー: {e}")
+            self._stop.wait(Config.LIFELOG_COMPACTION_INTERVAL)
@@ -0,0 +1,403 @@
+"""
+メールボックスのローカルキャッシュ（SQLite）とGmailとの差分同期
+
+最近のメールのヘッダー・スニペット・本文（テキスト）・未読状態を端末に保存し、
+一覧・本文・返信先の確認をネットワークなしで答える。
+- 初回: 直近のメールをまとめて取得（バッチリクエスト）
+- 以降: Gmailのhistory APIで前回からの差分（追加・削除・ラベル変更）だけを取得
+- 履歴が古すぎて取れない場合（404）は初回と同じく取り直す
+- 検索はキャッシュが漏れなく持っている期間に収まる時だけ答え、それ以外はGmailに問い合わせる
+
+同期は専用スレッドが自分のGmailサービスで行う（googleapiclientはスレッドセーフでないため）。
+"""
+
+import base64
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger("conversation")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    thread_id TEXT,
+    internal_date INTEGER NOT NULL DEFAULT 0,
+    from_header TEXT NOT NULL DEFAULT '',
+    subject TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT '',
+    reply_to TEXT NOT NULL DEFAULT '',
+    message_id_header TEXT NOT NULL DEFAULT '',
+    snippet TEXT NOT NULL DEFAULT '',
+    body TEXT,
+    labels TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS messages_date ON messages(internal_date);
+
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+BATCH_LIMIT = 50  # Gmailの推奨（100件だと429が返りやすい）
+FETCH_RETRIES = 3  # バッチ内で失敗したメールを取り直す回数
+
+
+def decode_body(payload: Dict[str, Any]) -> str:
+    """メールのpayloadからテキスト本文を取り出す（入れ子のmultipartにも対応）"""
+    if payload.get('mimeType', 'text/plain') == 'text/plain' and payload.get('body', {}).get('data'):
+        return base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8', errors='replace')
+    for part in payload.get('parts', []):
+        body = decode_body(part)
+        if body:
+            return body
+    # text/plainがなく、本文が直接入っている場合
+    if not payload.get('parts') and payload.get('body', {}).get('data'):
+        return base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8', errors='replace')
+    return ""
+
+
+class MailboxCache:
+    """メールのローカルキャッシュ"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ---- 状態 ----
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state(key, value) VALUES (?, ?)", (key, value)
+            )
+
+    @property
+    def ready(self) -> bool:
+        """一度でも同期できていればTrue"""
+        return self.get_state("history_id") is not None
+
+    # ---- 更新 ----
+
+    def put_message(self, msg: Dict[str, Any]) -> None:
+        """messages.get（format=full / metadata）の結果を保存"""
+        payload = msg.get('payload', {})
+        headers = {h['name']: h['value'] for h in payload.get('headers', [])}
+        body = decode_body(payload) if payload.get('parts') or payload.get('body', {}).get('data') else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO messages(id, thread_id, internal_date, from_header, subject, "
+                "date, reply_to, message_id_header, snippet, body, labels) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, "
+                "COALESCE(?, (SELECT body FROM messages WHERE id = ?)), ?)",
+                (msg['id'], msg.get('threadId'), int(msg.get('internalDate', 0)),
+                 headers.get('From', ''), headers.get('Subject', ''), headers.get('Date', ''),
+                 headers.get('Reply-To', ''), headers.get('Message-ID', ''),
+                 msg.get('snippet', ''), body, msg['id'],
+                 " ".join(msg.get('labelIds', [])))
+            )
+
+    def set_labels(self, message_id: str, labels: List[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE messages SET labels = ? WHERE id = ?", (" ".join(labels), message_id)
+            )
+
+    def labels(self, message_id: str) -> Optional[List[str]]:
+        with self._lock:
+            row = self._conn.execute("SELECT labels FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return row[0].split() if row else None
+
+    def remove(self, message_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+
+    def prune(self, keep: int) -> None:
+        """新しい順にkeep件だけ残す（漏れなく持っている期間も縮める）"""
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM messages WHERE id NOT IN "
+                "(SELECT id FROM messages ORDER BY internal_date DESC LIMIT ?)", (keep,)
+            ).rowcount
+        if deleted:
+            self.mark_covered_from_oldest()
+
+    def mark_covered_from_oldest(self) -> None:
+        """一番古いキャッシュのメール以降を、漏れなく持っている期間とする"""
+        with self._lock:
+            oldest = self._conn.execute("SELECT MIN(internal_date) FROM messages").fetchone()[0]
+        self.mark_covered_from(oldest or 0)
+
+    def mark_covered_from(self, internal_date: int) -> None:
+        """漏れなく持っている期間をこの時刻（ms）以降に縮める"""
+        current = self.covered_since()
+        self.set_state("covered_since", str(max(internal_date, current or 0)))
+
+    def covered_since(self) -> Optional[int]:
+        """この時刻（ms）以降のメールは漏れなくキャッシュにある（不明ならNone）"""
+        value = self.get_state("covered_since")
+        return int(value) if value is not None else None
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages")
+            self._conn.execute("DELETE FROM state")
+
+    # ---- 検索 ----
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return dict(row) if row else None
+
+    def search(self, query: str, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """Gmailの検索語の一部（is:unread, in:inbox, newer_than:Nd, from:, subject:, 単語）で探す（新しい順）
+
+        キャッシュにない古いメールが該当するかもしれない場合（limit件に満たず、
+        newer_than:で漏れなく持っている期間に絞られてもいない）は答えない。
+
+        Returns:
+            結果のリスト。ローカルで扱えない検索語が含まれているか、結果が欠けているかもしれなければNone
+        """
+        covered_since = self.covered_since()
+        if covered_since is None:
+            return None
+        conditions = ["1"]
+        params: List[Any] = []
+        newer_than: Optional[int] = None
+        for token in (query or "").split():
+            key, _, value = token.partition(":")
+            key = key.lower()
+            days = re.fullmatch(r"(\d+)d", value.lower()) if key == "newer_than" else None
+            if days:
+                since = int((time.time() - int(days.group(1)) * 86400) * 1000)
+                newer_than = max(newer_than or 0, since)
+                conditions.append("internal_date >= ?")
+                params.append(since)
+            elif token.lower() == "is:unread":
+                conditions.append("(' ' || labels || ' ') LIKE '% UNREAD %'")
+            elif token.lower() == "is:read":
+                conditions.append("(' ' || labels || ' ') NOT LIKE '% UNREAD %'")
+            elif token.lower() == "in:inbox":
+                conditions.append("(' ' || labels || ' ') LIKE '% INBOX %'")
+            elif key == "from" and value:
+                conditions.append("from_header LIKE ?")
+                params.append(f"%{value}%")
+            elif key == "subject" and value:
+                conditions.append("subject LIKE ?")
+                params.append(f"%{value}%")
+            elif ":" in token or token.upper() == "OR" or re.search(r'[(){}"\-]', token):
+                return None
+            else:
+                conditions.append("(subject LIKE ? OR snippet LIKE ? OR from_header LIKE ?)")
+                params.extend([f"%{token}%"] * 3)
+
+        sql = ("SELECT * FROM messages WHERE (' ' || labels || ' ') NOT LIKE '% TRASH %' AND "
+               "(' ' || labels || ' ') NOT LIKE '% SPAM %' AND " + " AND ".join(conditions)
+               + " ORDER BY internal_date DESC LIMIT ?")
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        # 結果が漏れなく持っている期間の中で決まっていれば完全
+        if len(rows) >= limit:
+            bound = rows[-1]["internal_date"]
+        else:
+            bound = newer_than if newer_than is not None else 0
+        if bound < covered_since:
+            return None
+        return [dict(row) for row in rows]
+
+
+class MailboxSync:
+    """Gmailとの差分同期（バックグラウンドスレッド）"""
+
+    def __init__(self, cache: MailboxCache, service_factory: Callable[[], Any]):
+        """
+        Args:
+            service_factory: 同期スレッド用のGmailサービスを作る関数
+        """
+        self.cache = cache
+        self._service_factory = service_factory
+        self._service = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_sync = 0.0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="mailbox-sync")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def request_sync(self) -> None:
+        """すぐに差分を取りに行く（送信・返信の後など）"""
+        self._wake.set()
+
+    # ---- 同期 ----
+
+    def _fetch(self, message_ids: List[str], message_format: str = 'full') -> List[str]:
+        """メールをまとめて取得して保存（バッチ内で失敗したものは間隔を空けて取り直す）
+
+        Returns:
+            取り直しても取得できなかったメールID（削除済み＝404は含まない）
+        """
+        service = self._service
+        failed: List[str] = []
+
+        def on_response(request_id, response, exception):
+            if exception is None:
+                if response:
+                    self.cache.put_message(response)
+            elif getattr(getattr(exception, 'resp', None), 'status', None) != 404:
+                failed.append(request_id)
+
+        pending = list(message_ids)
+        for attempt in range(FETCH_RETRIES + 1):
+            if attempt:
+                logger.warning(f"メール取得失敗: {len(pending)}件（取り直します）")
+                if self._stop.wait(2 ** attempt):
+                    break
+            failed.clear()
+            for start in range(0, len(pending), BATCH_LIMIT):
+                batch = service.new_batch_http_request(callback=on_response)
+                for message_id in pending[start:start + BATCH_LIMIT]:
+                    batch.add(
+                        service.users().messages().get(userId='me', id=message_id, format=message_format),
+                        request_id=message_id
+                    )
+                batch.execute()
+            pending = list(failed)
+            if not pending:
+                break
+        return pending
+
+    def full_sync(self) -> None:
+        """直近のメールを取り直す"""
+        service = self._service
+        history_id = service.users().getProfile(userId='me').execute()['historyId']
+
+        message_ids: List[str] = []
+        page_token = None
+        window_start = int((time.time() - Config.GMAIL_SYNC_DAYS * 86400) * 1000)
+        while len(message_ids) < Config.GMAIL_SYNC_MAX_MESSAGES:
+            response = service.users().messages().list(
+                userId='me', q=f"newer_than:{Config.GMAIL_SYNC_DAYS}d",
+                maxResults=min(100, Config.GMAIL_SYNC_MAX_MESSAGES - len(message_ids)),
+                pageToken=page_token
+            ).execute()
+            message_ids.extend(m['id'] for m in response.get('messages', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+        self.cache.clear()
+        failed = set(self._fetch(message_ids))
+        self.cache.set_state("covered_since", str(window_start))
+        if page_token:
+            # 件数の上限で打ち切った（期間内でも取っていないメールがある）
+            self.cache.mark_covered_from_oldest()
+        if failed:
+            # 取れなかったメールのうち最も新しいものより後だけを、漏れなく持っている期間とする
+            # （一覧は新しい順）
+            gap = next(i for i, message_id in enumerate(message_ids) if message_id in failed)
+            newer = self.cache.get(message_ids[gap - 1]) if gap else None
+            self.cache.mark_covered_from(newer['internal_date'] if newer else int(time.time() * 1000))
+            logger.warning(f"メール同期: {len(failed)}件を取得できませんでした")
+        self.cache.set_state("history_id", str(history_id))
+        logger.info(f"メール同期（全体）: {len(message_ids) - len(failed)}件")
+
+    def incremental_sync(self) -> bool:
+        """前回からの差分を反映（履歴が取れなければFalse）"""
+        from googleapiclient.errors import HttpError
+
+        service = self._service
+        start_history_id = self.cache.get_state("history_id")
+        added: List[str] = []
+        deleted: List[str] = []
+        page_token = None
+        latest = start_history_id
+
+        try:
+            while True:
+                response = service.users().history().list(
+                    userId='me', startHistoryId=start_history_id, pageToken=page_token,
+                    historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved']
+                ).execute()
+                for record in response.get('history', []):
+                    for item in record.get('messagesAdded', []):
+                        added.append(item['message']['id'])
+                    for item in record.get('messagesDeleted', []):
+                        deleted.append(item['message']['id'])
+                    for item in record.get('labelsAdded', []) + record.get('labelsRemoved', []):
+                        message = item['message']
+                        if message['id'] not in added and self.cache.labels(message['id']) is not None:
+                            self.cache.set_labels(message['id'], message.get('labelIds', []))
+                latest = response.get('historyId', latest)
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+        except HttpError as e:
+            if getattr(e, 'resp', None) is not None and e.resp.status == 404:
+                return False
+            raise
+
+        deleted_set = set(deleted)
+        added = [m for m in dict.fromkeys(added) if m not in deleted_set]
+        for message_id in deleted_set:
+            self.cache.remove(message_id)
+        if added:
+            failed = self._fetch(added)
+            self.cache.prune(Config.GMAIL_SYNC_MAX_MESSAGES)
+            if failed:
+                # 履歴を進めず、次の同期で同じ差分からやり直す（取れたものの保存は冪等）
+                logger.warning(f"メール同期: {len(failed)}件を取得できませんでした（次回やり直します）")
+                return True
+        self.cache.set_state("history_id", str(latest))
+        if added or deleted_set:
+            logger.info(f"メール同期（差分）: 追加{len(added)}件 削除{len(deleted_set)}件")
+        return True
+
+    def sync(self) -> None:
+        if self._service is None:
+            self._service = self._service_factory()
+        if (not self.cache.ready or self.cache.covered_since() is None
+                or not self.incremental_sync()):
+            self.full_sync()
+        self.last_sync = time.time()
+
+    def _run(self) -> None:
+        backoff = 0
+        while not self._stop.is_set():
+            try:
+                self.sync()
+                backoff = 0
+            except Exception as e:
+                logger.error(f"メール同期エラー: {e}")
+                backoff = min(900, max(Config.GMAIL_SYNC_INTERVAL, backoff * 2))
+            self._wake.wait(backoff or Config.GMAIL_SYNC_INTERVAL)
+            self._wake.clear()
@@ -7,38 +7,104 @@
 """
 
 import os
-import subprocess
+import logging
+import re
 import threading
 import time
 import io
 import wave
 import numpy as np
-from datetime import datetime
-from typing import Any, Dict, Optional, Callable
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Callable, Tuple
 
 from .base import Capability, CapabilityCategory, CapabilityResult
-from .vision import camera_lock
+from .vision import capture_frame
+from .imaging import hamming_distance, prepare_image
+from .scene_change import SceneFeatures, compare_features, extract_features, pixel_difference
+from .lifelog_index import LifelogIndex, get_lifelog_index
+from .lifelog_storage import LifelogCompactor, write_thumbnail
+from .lifelog_analysis import LifelogAnalyzer
 from config import Config
 
+logger = logging.getLogger("conversation")
+
 
 # ライフログ状態管理
 _lifelog_enabled = False
 _lifelog_paused = False  # 一時停止フラグ（ビデオ通話中など）
 _lifelog_thread: Optional[threading.Thread] = None
 _lifelog_photo_count = 0
+_lifelog_unchanged_count = 0  # 前の写真と同じで保存しなかった回数
 _running = True
 
+# 最後に保存した写真（特徴, 撮影時刻HHMMSS, 保存した時刻）
+_last_kept: Optional[Tuple[SceneFeatures, str, float]] = None
+
 # Firebase連携（オプション）
 _firebase_messenger = None
+_uploader = None  # ライフログのアップロードキュー（core.lifelog_uploader.LifelogUploader）
 
 # オーディオ再生コールバック
 _play_audio_callback: Optional[Callable] = None
 
 
 def set_firebase_messenger(messenger) -> None:
-    """Firebaseメッセンジャーを設定"""
-    global _firebase_messenger
+    """Firebaseメッセンジャーを設定（ライフログはバックグラウンドでアップロード）"""
+    global _firebase_messenger, _uploader
+    from core.lifelog_uploader import LifelogUploader
+    if _uploader:
+        _uploader.stop(flush_timeout=0)
     _firebase_messenger = messenger
+    _uploader = LifelogUploader(messenger, on_uploaded=_on_uploaded,
+                                resize=_upload_resize) if messenger else None
+    _resume_uploads()
+
+
+def _resume_uploads() -> None:
+    """前回までに送れなかった写真・「変化なし」を積み直す"""
+    index = _index()
+    if not _uploader or not index:
+        return
+    since = time.time() - Config.LIFELOG_UPLOAD_RESUME_HOURS * 3600
+    count = _uploader.resume(index.pending_uploads(since))
+    if count:
+        logger.info(f"ライフログ未送信分を再送します: {count}件")
+
+
+def _upload_resize(photo_data: bytes) -> bytes:
+    """アップロードする写真（設定がなければ縮小版）"""
+    if Config.LIFELOG_UPLOAD_FULL_SIZE:
+        return photo_data
+    return prepare_image(photo_data, "brief")
+
+
+def _index() -> Optional[LifelogIndex]:
+    """ライフログの索引（開けなければNone）"""
+    try:
+        return get_lifelog_index()
+    except Exception as e:
+        logger.error(f"ライフログ索引エラー: {e}")
+        return None
+
+
+def _on_uploaded(date: str, time_str: str) -> None:
+    index = _index()
+    if index:
+        index.mark_uploaded(date, time_str)
+
+
+def _sync_analysis(date: str) -> None:
+    """Firebaseで分析済みのエントリを索引に取り込む"""
+    index = _index()
+    if not index or not _firebase_messenger:
+        return
+    try:
+        updated = index.sync_analysis(date, _firebase_messenger.get_lifelog_entries(date))
+        if updated:
+            logger.info(f"ライフログ索引: 分析結果{updated}件を取り込みました")
+    except Exception as e:
+        logger.debug(f"ライフログ分析結果の取り込みエラー: {e}")
 
 
 def set_play_audio_callback(callback: Callable) -> None:
@@ -48,9 +114,13 @@ def set_play_audio_callback(callback: Callable) -> None:
 
 
 def stop_lifelog_thread() -> None:
-    """ライフログスレッドを停止"""
+    """ライフログスレッドを停止（未送信のアップロードは少し待って送る）"""
     global _running
     _running = False
+    _compactor.stop()
+    _analyzer.stop()
+    if _uploader:
+        _uploader.stop()
 
 
 def pause_lifelog() -> None:
@@ -70,6 +140,20 @@ def is_lifelog_paused() -> bool:
     return _lifelog_paused
 
 
+_shutter_sound: Optional[bytes] = None
+
+
+def _play_shutter_sound() -> None:
+    """シャッター音を鳴らす（再生完了を待たない）"""
+    global _shutter_sound
+    if not _play_audio_callback:
+        return
+    if _shutter_sound is None:
+        _shutter_sound = _generate_shutter_sound()
+    if _shutter_sound:
+        threading.Thread(target=_play_audio_callback, args=(_shutter_sound,), daemon=True).start()
+
+
 def _generate_shutter_sound() -> Optional[bytes]:
     """シャッター音を生成"""
     try:
@@ -96,13 +180,91 @@ def _generate_shutter_sound() -> Optional[bytes]:
         return None
 
 
-def _capture_lifelog_photo() -> bool:
-    """ライフログ用の写真を撮影"""
-    global _lifelog_photo_count, _firebase_messenger, _play_audio_callback
+def _is_duplicate(features: Optional[SceneFeatures]) -> bool:
+    """最後に保存した写真とほぼ同じか"""
+    if not Config.LIFELOG_DEDUPE_ENABLED or features is None or _last_kept is None:
+        return False
+    kept_features, _, kept_at = _last_kept
+    if time.time() - kept_at >= Config.LIFELOG_DEDUPE_MAX_AGE:
+        return False
+    distance = hamming_distance(features.dhash, kept_features.dhash)
+    return (distance <= Config.LIFELOG_DEDUPE_MAX_HASH_DISTANCE
+            and pixel_difference(features, kept_features) <= Config.LIFELOG_DEDUPE_MAX_DIFF)
+
+
+class LifelogScheduler:
+    """撮影間隔の調整
+
+    撮影のたびに最新フレームを縮小デコードして前に保存した写真と比べ、
+    - 大きく変わった（外に出た・別の部屋）: すぐ保存し、しばらく短い間隔で撮る
+    - 少し変わった: 保存し、通常の間隔に戻す
+    - 変わらない: 保存せず、間隔を倍々に延ばす（カメラも休める）
+    1時間あたりの保存枚数には上限を設ける。
+    """
+
+    def __init__(self):
+        self.interval = Config.LIFELOG_INTERVAL
+        self._kept_times: deque = deque()
+
+    def classify(self, features: Optional[SceneFeatures]) -> str:
+        """最後に保存した写真からの変化（"new" / "minor" / "same"）"""
+        if _last_kept is None:
+            return "new"
+        if features is None:
+            return "minor"
+        if _is_duplicate(features):
+            return "same"
+        if compare_features(_last_kept[0], features).score >= Config.LIFELOG_SIGNIFICANT_SCORE:
+            return "new"
+        return "minor"
+
+    def within_budget(self, now: float) -> bool:
+        """1時間の保存枚数の上限内か"""
+        while self._kept_times and now - self._kept_times[0] >= 3600:
+            self._kept_times.popleft()
+        return len(self._kept_times) < Config.LIFELOG_HOURLY_BUDGET
+
+    def record_kept(self, now: float) -> None:
+        self._kept_times.append(now)
+
+    def update(self, change: str) -> None:
+        """変化に応じて次の撮影までの間隔を決める"""
+        if change == "new":
+            self.interval = Config.LIFELOG_MIN_INTERVAL
+        elif change == "minor":
+            self.interval = Config.LIFELOG_INTERVAL
+        else:
+            self.interval = min(self.interval * 2, Config.LIFELOG_MAX_INTERVAL)
+
+
+_scheduler = LifelogScheduler()
+
+# 古い写真のタイムラプス化・容量管理
+_compactor = LifelogCompactor(_index, lambda: _firebase_messenger is not None)
+
+# 写真をまとめて分析
+_analyzer = LifelogAnalyzer(_index, lambda: _firebase_messenger)
 
-    # カメラロックを即座に試行（ユーザー操作を優先）
-    if not camera_lock.acquire(blocking=False):
+
+# ビデオ通話の購読者名（core.webrtc.CameraVideoTrack.SUBSCRIBER_NAME。aiortcを読み込まないよう名前で持つ）
+_CALL_SUBSCRIBER = "webrtc"
+
+
+def _camera_used_since(since: float) -> bool:
+    """ライフログ以外の機能（ビジョンなど）がカメラを動かしているか
+
+    ビデオ通話中は常に購読されているので数えない（通話中も通常の間隔で撮影する）。
+    """
+    from core.camera import get_camera_service
+    service = get_camera_service()
+    if not service.is_running:
         return False
+    return bool(service.subscriber_names - {_CALL_SUBSCRIBER}) or service.last_request > since
+
+
+def _capture_lifelog_photo() -> bool:
+    """ライフログ用の写真を撮影（前の写真とほぼ同じなら「変化なし」だけ記録）"""
+    global _lifelog_photo_count, _lifelog_unchanged_count, _last_kept
 
     try:
         # 今日のディレクトリを作成
@@ -115,30 +277,47 @@ def _capture_lifelog_photo() -> bool:
         filename = f"{timestamp}.jpg"
         image_path = os.path.join(lifelog_dir, filename)
 
-        # 撮影
-        result = subprocess.run(
-            ["rpicam-still", "-o", image_path, "-t", "500",
-             "--width", "1280", "--height", "960"],
-            capture_output=True, timeout=10
-        )
-
-        if result.returncode == 0:
+        # 撮影（他の機能でカメラが動いていれば最新フレーム、止まっていれば1枚だけ撮る）
+        photo_data = capture_frame(keep_alive=False)
+
+        if photo_data:
+            features = extract_features(photo_data)
+            change = _scheduler.classify(features)
+            _scheduler.update(change)
+
+            # 座ったままなど前の写真と同じ場面なら、保存・アップロードしない
+            if change == "same":
+                _lifelog_unchanged_count += 1
+                index = _index()
+                if index:
+                    index.add_unchanged(today, timestamp, _last_kept[1])
+                if _uploader:
+                    _uploader.enqueue_unchanged(today, timestamp, _last_kept[1])
+                return True
+
+            now = time.time()
+            if not _scheduler.within_budget(now):
+                logger.info("ライフログ: 1時間の撮影上限に達したため保存しません")
+                return True
+
+            with open(image_path, "wb") as f:
+                f.write(photo_data)
             _lifelog_photo_count += 1
+            _scheduler.record_kept(now)
+            thumb_path = write_thumbnail(image_path, photo_data)
+            index = _index()
+            if index:
+                index.add_photo(today, timestamp, image_path, len(photo_data),
+                                features.dhash if features else None, thumb_path)
+            if features is not None:
+                _last_kept = (features, timestamp, now)
 
             # シャッター音
-            if _play_audio_callback:
-                shutter = _generate_shutter_sound()
-                if shutter:
-                    _play_audio_callback(shutter)
-
-            # Firebaseにアップロード
-            if _firebase_messenger:
-                try:
-                    with open(image_path, "rb") as f:
-                        photo_data = f.read()
-                    _firebase_messenger.upload_lifelog_photo(photo_data, today, timestamp)
-                except Exception:
-                    pass
+            _play_shutter_sound()
+
+            # Firebaseへのアップロードはバックグラウンドで
+            if _uploader:
+                _uploader.enqueue_photo(today, timestamp, image_path, thumb_path)
 
             return True
         else:
@@ -146,16 +325,16 @@ def _capture_lifelog_photo() -> bool:
 
     except Exception:
         return False
-    finally:
-        camera_lock.release()
 
 
 def _lifelog_thread_func() -> None:
     """ライフログ撮影のバックグラウンドスレッド"""
     global _running, _lifelog_enabled, _lifelog_paused, _lifelog_photo_count
+    global _lifelog_unchanged_count, _last_kept
 
     last_date = datetime.now().strftime("%Y-%m-%d")
     retry_interval = 30
+    last_sync = 0.0
 
     while _running:
         if _lifelog_enabled and not _lifelog_paused:
@@ -163,19 +342,30 @@ def _lifelog_thread_func() -> None:
             current_date = datetime.now().strftime("%Y-%m-%d")
             if current_date != last_date:
                 _lifelog_photo_count = 0
+                _lifelog_unchanged_count = 0
+                _last_kept = None
                 last_date = current_date
 
             success = _capture_lifelog_photo()
-            wait_time = Config.LIFELOG_INTERVAL if success else retry_interval
+
+            if time.time() - last_sync >= Config.LIFELOG_ANALYSIS_SYNC_INTERVAL:
+                last_sync = time.time()
+                _sync_analysis(current_date)
+            wait_time = _scheduler.interval if success else retry_interval
         else:
             wait_time = Config.LIFELOG_INTERVAL
 
         # 待機（1秒ごとにチェック）
-        for _ in range(wait_time):
+        captured_at = time.time()
+        for _ in range(int(wait_time)):
             if not _running:
                 break
             if _lifelog_enabled and not _lifelog_paused:
                 time.sleep(1)
+                # 他の機能でカメラが動いていれば、最新フレームを追加コストなしで確認できる
+                if (time.time() - captured_at >= Config.LIFELOG_MIN_INTERVAL
+                        and _camera_used_since(captured_at + 1)):
+                    break
             else:
                 time.sleep(5)
                 break
@@ -188,6 +378,10 @@ def start_lifelog_thread() -> None:
     if _lifelog_thread is None or not _lifelog_thread.is_alive():
         _lifelog_thread = threading.Thread(target=_lifelog_thread_func, daemon=True)
         _lifelog_thread.start()
+    _resume_uploads()
+    _compactor.start()
+    if Config.LIFELOG_ANALYSIS_ENABLED:
+        _analyzer.start()
 
 
 class LifelogStart(Capability):
@@ -219,7 +413,7 @@ class LifelogStart(Capability):
         start_lifelog_thread()
 
         interval_min = Config.LIFELOG_INTERVAL // 60
-        return CapabilityResult.ok(f"記録を始めます。{interval_min}分ごとに撮影します")
+        return CapabilityResult.ok(f"記録を始めます。{interval_min}分ごと、景色が変わったらすぐ撮影します")
 
 
 class LifelogStop(Capability):
@@ -275,19 +469,142 @@ class LifelogStatus(Capability):
 
         status = "記録中" if _lifelog_enabled else "停止中"
         today = datetime.now().strftime("%Y-%m-%d")
-        lifelog_dir = os.path.join(Config.LIFELOG_DIR, today)
-
-        # 実際のファイル数をカウント
-        actual_count = 0
-        if os.path.exists(lifelog_dir):
-            actual_count = len([f for f in os.listdir(lifelog_dir) if f.endswith('.jpg')])
 
+        # 索引から数える（開けなければファイル数）
+        index = _index()
+        if index:
+            actual_count, unchanged_count = index.count(today)
+        else:
+            lifelog_dir = os.path.join(Config.LIFELOG_DIR, today)
+            actual_count = 0
+            if os.path.exists(lifelog_dir):
+                actual_count = len([f for f in os.listdir(lifelog_dir) if f.endswith('.jpg')])
+            unchanged_count = _lifelog_unchanged_count
+
+        if unchanged_count:
+            return CapabilityResult.ok(
+                f"今日は{actual_count}枚撮影しました（変化がなく省いたのは{unchanged_count}回）。{status}です"
+            )
         return CapabilityResult.ok(f"今日は{actual_count}枚撮影しました。{status}です")
 
 
+def _parse_date(date: Optional[str]) -> Optional[str]:
+    """「今日」「昨日」「一昨日」やYYYY-MM-DDを日付文字列に（指定なしはNone）"""
+    if not date:
+        return None
+    offsets = {"今日": 0, "きょう": 0, "昨日": 1, "きのう": 1, "一昨日": 2, "おととい": 2}
+    if date in offsets:
+        return (datetime.now() - timedelta(days=offsets[date])).strftime("%Y-%m-%d")
+    try:
+        return datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _parse_time(value: str) -> Optional[Tuple[int, int]]:
+    """「15:00」「15時」「15時30分」を(時, 分)に"""
+    match = re.match(r"^\s*(\d{1,2})\s*[:：時]\s*(\d{1,2})?", value or "")
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def _spoken_when(row: Dict[str, Any]) -> str:
+    """撮影日時を読み上げ用に（今日なら時刻だけ）"""
+    taken = datetime.fromtimestamp(row["taken_at"])
+    days = (datetime.now().date() - taken.date()).days
+    prefix = {0: "", 1: "昨日"}.get(days, f"{taken.month}月{taken.day}日")
+    return f"{prefix}{taken.hour}時{taken.minute:02d}分"
+
+
+def _short(text: str, length: int = 60) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= length else text[:length] + "…"
+
+
+class LifelogSearch(Capability):
+    """ライフログを振り返る（端末内の索引から検索）"""
+
+    @property
+    def name(self) -> str:
+        return "lifelog_search"
+
+    @property
+    def category(self) -> CapabilityCategory:
+        return CapabilityCategory.MEMORY
+
+    @property
+    def description(self) -> str:
+        return """記録した写真から振り返る。以下の場面で使う：
+- 「3時ごろ何してた？」→ timeに時刻
+- 「赤い車を見たのはいつ？」「コーヒー飲んだっけ？」→ queryに見たもの・したこと
+- 「昨日の夕方何してた？」→ dateとtime"""
+
+    def _get_parameters(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "探したい物・場所・行動（例: '赤い車', 'コーヒー'）"
+                },
+                "time": {
+                    "type": "string",
+                    "description": "時刻（24時間表記、例: '15:00'）"
+                },
+                "date": {
+                    "type": "string",
+                    "description": "日付（'今日', '昨日', 'YYYY-MM-DD'）。省略時は今日（queryのみなら全期間）"
+                }
+            }
+        }
+
+    def execute(self, query: str = "", time: str = "", date: str = "") -> CapabilityResult:
+        index = _index()
+        if not index:
+            return CapabilityResult.fail("記録を見られませんでした")
+
+        day = _parse_date(date)
+        if time:
+            parsed = _parse_time(time)
+            if not parsed:
+                return CapabilityResult.fail("時刻が分かりませんでした")
+            target_day = datetime.strptime(day, "%Y-%m-%d") if day else datetime.now()
+            target = target_day.replace(hour=parsed[0], minute=parsed[1], second=0, microsecond=0)
+            rows = index.around(target.timestamp())
+            if query:
+                terms = query.split()
+                rows = [r for r in rows if all(t in r["analysis"] for t in terms)]
+            if not rows:
+                return CapabilityResult.ok("その時間の記録はありません")
+            analyzed = [r for r in rows if r["analysis"]]
+            if not analyzed:
+                return CapabilityResult.ok(
+                    f"その時間の写真は{len(rows)}枚ありますが、まだ内容が分析されていません"
+                )
+            lines = [f"{_spoken_when(r)}頃: {_short(r['analysis'])}" for r in analyzed[:3]]
+            return CapabilityResult.ok("\n".join(lines))
+
+        if not query:
+            return CapabilityResult.fail("何を探すか教えてください")
+
+        rows = index.search(query, date=day)
+        if not rows:
+            return CapabilityResult.ok(f"「{query}」の記録は見つかりませんでした")
+        times = "、".join(_spoken_when(r) for r in rows[:3])
+        more = f"など{len(rows)}件" if len(rows) > 3 else ""
+        return CapabilityResult.ok(
+            f"「{query}」は{times}{more}に記録があります。直近: {_short(rows[0]['analysis'])}"
+        )
+
+
 # エクスポート
 MEMORY_CAPABILITIES = [
     LifelogStart(),
     LifelogStop(),
     LifelogStatus(),
+    LifelogSearch(),
 ]
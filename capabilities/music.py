@@ -273,6 +273,10 @@ class MusicPlay(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.MUSIC
 
+    @property
+    def tool_group(self) -> str:
+        return "music"
+
     @property
     def description(self) -> str:
         return """音楽を流す。YouTubeで検索して再生するため、どんな曲でも再生可能。
@@ -323,6 +327,10 @@ class MusicStop(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.MUSIC
 
+    @property
+    def tool_group(self) -> str:
+        return "music"
+
     @property
     def description(self) -> str:
         return """音楽を止める。以下の場面で使う：
@@ -350,6 +358,10 @@ class MusicPause(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.MUSIC
 
+    @property
+    def tool_group(self) -> str:
+        return "music"
+
     @property
     def description(self) -> str:
         return """音楽を一時停止または再開。以下の場面で使う：
@@ -30,9 +30,18 @@ class OpenClawClient:
         self.token = token
         self.websocket: Optional[websockets.client.WebSocketClientProtocol] = None
         self._connected = False
+        # 1本の接続を共有するため、リクエストと応答の対応を直列化
+        self._request_lock = asyncio.Lock()
+        # 再接続を直列化（同時に失敗したリクエストがそれぞれ接続を開かないように）
+        self._connect_lock = asyncio.Lock()
 
     async def connect(self) -> bool:
-        """Gatewayに接続"""
+        """Gatewayに接続（前の接続は閉じる）"""
+        async with self._connect_lock:
+            return await self._connect_locked()
+
+    async def _connect_locked(self) -> bool:
+        await self._close_socket()
         try:
             # ヘッダーに認証情報を追加
             headers = {}
@@ -52,15 +61,38 @@ class OpenClawClient:
 
     async def disconnect(self):
         """接続を閉じる"""
-        if self.websocket:
-            await self.websocket.close()
-            self._connected = False
+        async with self._connect_lock:
+            await self._close_socket()
+
+    async def _close_socket(self) -> None:
+        """今の接続を閉じる（_connect_lockを保持して呼ぶ）"""
+        websocket, self.websocket = self.websocket, None
+        self._connected = False
+        if websocket is not None:
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+
+    async def _ensure_connected(self):
+        """接続済みのWebSocketを返す（切れていれば1回だけ再接続、失敗時はNone）"""
+        async with self._connect_lock:
+            if not self._connected or not self.websocket:
+                if not await self._connect_locked():
+                    return None
+            return self.websocket
+
+    async def _drop(self, websocket) -> None:
+        """エラーになった接続を閉じる（他のリクエストが既に再接続していればそのまま）"""
+        async with self._connect_lock:
+            if self.websocket is websocket:
+                await self._close_socket()
 
     async def _send_request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """RPCリクエストを送信して応答を取得"""
-        if not self._connected or not self.websocket:
-            if not await self.connect():
-                return {"error": "OpenClawに接続できません"}
+        websocket = await self._ensure_connected()
+        if websocket is None:
+            return {"error": "OpenClawに接続できません"}
 
         try:
             # リクエストフレームを作成
@@ -70,10 +102,11 @@ class OpenClawClient:
                 "id": str(uuid.uuid4()),
             }
 
-            await self.websocket.send(json.dumps(request))
+            async with self._request_lock:
+                await websocket.send(json.dumps(request))
 
-            # 応答を待機
-            response_text = await self.websocket.recv()
+                # 応答を待機
+                response_text = await websocket.recv()
             response = json.loads(response_text)
 
             if "error" in response:
@@ -83,6 +116,8 @@ class OpenClawClient:
 
         except Exception as e:
             print(f"OpenClaw RPC error: {e}")
+            # 壊れた接続を閉じ、次回のリクエストで再接続する
+            await self._drop(websocket)
             return {"error": str(e)}
 
     async def send_chat(
@@ -147,6 +182,10 @@ class OpenClawChat(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.VISION  # 「詳しく知る」の拡張として
 
+    @property
+    def tool_group(self) -> str:
+        return "openclaw"
+
     @property
     def description(self) -> str:
         return """OpenClawパーソナルアシスタントを利用する。以下の場面で使う：
@@ -186,7 +225,7 @@ session_keyでセッションを指定（デフォルト: "main"）。"""
         }
 
     async def execute_async(self, message: str, session_key: str = "main") -> CapabilityResult:
-        """OpenClawチャットを実行（非同期）"""
+        """OpenClawチャットを実行（メインループ上で接続を共有）"""
         client = await get_openclaw_client()
         if client is None:
             return CapabilityResult.fail("OpenClawに接続できません")
@@ -214,17 +253,6 @@ session_keyでセッションを指定（デフォルト: "main"）。"""
         except Exception as e:
             return CapabilityResult.fail(f"OpenClaw通信エラー: {str(e)}")
 
-    def execute(self, message: str, session_key: str = "main") -> CapabilityResult:
-        """同期インターフェース（Capability実行は同期で行う）"""
-        # 非同期関数を同期コンテキストで実行
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result = loop.run_until_complete(self.execute_async(message, session_key))
-            return result
-        finally:
-            loop.close()
-
 
 class OpenClawSkills(Capability):
     """OpenClawのスキル一覧を取得"""
@@ -237,6 +265,10 @@ class OpenClawSkills(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.VISION
 
+    @property
+    def tool_group(self) -> str:
+        return "openclaw"
+
     @property
     def description(self) -> str:
         return """OpenClawで利用可能なスキル一覧を取得する。
@@ -245,21 +277,15 @@ class OpenClawSkills(Capability):
     def _get_parameters(self) -> Dict[str, Any]:
         return {"type": "object", "properties": {}}
 
-    def execute(self) -> CapabilityResult:
+    async def execute_async(self) -> CapabilityResult:
         """スキル一覧を取得"""
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            async def _get_status():
-                client = await get_openclaw_client()
-                if client is None:
-                    return None
-                # statusメソッドで情報を取得
-                return await client._send_request("status", {})
+            client = await get_openclaw_client()
+            if client is None:
+                return CapabilityResult.fail("OpenClawに接続できません")
 
-            result = loop.run_until_complete(_get_status())
-            loop.close()
+            # statusメソッドで情報を取得
+            result = await client._send_request("status", {})
 
             if result and "error" not in result:
                 return CapabilityResult.ok("OpenClawに接続済みです", data=result)
@@ -18,15 +18,16 @@ from datetime import datetime, timedelta, timezone
 from typing import Any, Callable, Dict, List, Optional, Set
 
 from config import Config
+from .scene_change import compare_scenes
 
 # ロガー設定
 logger = logging.getLogger("proactive_reminder")
 
 # Google Calendar API（calendar.pyから取得）
 try:
-    from .calendar import get_calendar_service, CALENDAR_AVAILABLE
+    from .calendar import get_calendar_store, CALENDAR_AVAILABLE
 except ImportError:
-    def get_calendar_service():
+    def get_calendar_store():
         return None
     CALENDAR_AVAILABLE = False
 
@@ -41,7 +42,8 @@ FIREBASE_DATABASE_URL = os.getenv("FIREBASE_DATABASE_URL", "")
 
 # Vision機能
 try:
-    from .vision import capture_image_raw, get_gemini_client
+    from .vision import capture_image_raw
+    from .imaging import prepare_image
     VISION_AVAILABLE = True
 except ImportError:
     VISION_AVAILABLE = False
@@ -204,7 +206,7 @@ class FirebaseLocationClient:
 
 
 class MovementDetector:
-    """Gemini Vision APIで画像比較による移動検知"""
+    """画像比較による移動検知（端末内で判定し、判断がつかない時だけGemini Vision APIで確認）"""
 
     def compare_images(self, image1: bytes, image2: bytes) -> Dict[str, Any]:
         """
@@ -213,13 +215,29 @@ class MovementDetector:
         Returns:
             {moved: bool, confidence: float, reason: str}
         """
+        local = compare_scenes(image1, image2)
+        if local is not None and local.confidence >= Config.REMINDER_MOVEMENT_LOCAL_CONFIDENCE:
+            return local.to_dict()
+
+        # グレーゾーン（または端末内で判定できない）ならGeminiで確認
+        result = self.compare_images_with_gemini(image1, image2)
+        if result is None:
+            if local is not None:
+                return local.to_dict()
+            return {"moved": False, "confidence": 0.0, "reason": "画像比較不可"}
+        return result
+
+    def compare_images_with_gemini(self, image1: bytes, image2: bytes) -> Optional[Dict[str, Any]]:
+        """Gemini Vision APIで2枚の画像を比較（利用できない・失敗時はNone）"""
         if not VISION_AVAILABLE:
-            return {"moved": False, "confidence": 0.0, "reason": "Vision API利用不可"}
+            return None
 
         try:
             from google.genai import types
+            from core.llm_gateway import get_llm_gateway
+            from core.model_router import route_image_preset
 
-            client = get_gemini_client()
+            preset = route_image_preset("movement")
 
             prompt = """これは同じカメラで撮影された2枚の写真です。
 撮影者が別の場所に移動したかどうかを判定してください。
@@ -235,8 +253,8 @@ class MovementDetector:
   "reason": "理由（短く）"
 }"""
 
-            response = client.models.generate_content(
-                model=Config.VISION_MODEL,
+            response = get_llm_gateway().generate(
+                "movement",
                 contents=[
                     types.Content(
                         role="user",
@@ -245,22 +263,22 @@ class MovementDetector:
                             types.Part(
                                 inline_data=types.Blob(
                                     mime_type="image/jpeg",
-                                    data=image1
+                                    data=prepare_image(image1, preset)
                                 )
                             ),
                             types.Part(
                                 inline_data=types.Blob(
                                     mime_type="image/jpeg",
-                                    data=image2
+                                    data=prepare_image(image2, preset)
                                 )
                             )
                         ]
                     )
                 ],
                 config=types.GenerateContentConfig(
-                    max_output_tokens=200,
                     response_mime_type="application/json"
-                )
+                ),
+                timeout=15
             )
 
             result_text = response.text
@@ -274,7 +292,7 @@ class MovementDetector:
 
         except Exception as e:
             logger.error(f"画像比較エラー: {e}")
-            return {"moved": False, "confidence": 0.0, "reason": f"エラー: {e}"}
+            return None
 
 
 class ProactiveReminderManager:
@@ -287,25 +305,16 @@ class ProactiveReminderManager:
 
     def get_upcoming_events(self, hours: int = 3) -> List[UpcomingEvent]:
         """今後N時間以内の場所付き予定を取得"""
-        calendar_service = get_calendar_service()
-        if not CALENDAR_AVAILABLE or not calendar_service:
+        calendar_store = get_calendar_store()
+        if not CALENDAR_AVAILABLE or not calendar_store:
             return []
 
         try:
-            # UTCで現在時刻を取得（Google Calendar APIはRFC3339形式を要求）
+            # 60秒ごとに呼ばれるが、APIへは差分の確認だけ（間隔はCALENDAR_SYNC_INTERVAL）
             now_utc = datetime.now(timezone.utc)
             time_max_utc = now_utc + timedelta(hours=hours)
 
-            events_result = calendar_service.events().list(
-                calendarId='primary',
-                timeMin=now_utc.isoformat(),
-                timeMax=time_max_utc.isoformat(),
-                maxResults=10,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-
-            events = events_result.get('items', [])
+            events = calendar_store.events_between(now_utc, time_max_utc, limit=10)
             result = []
 
             for event in events:
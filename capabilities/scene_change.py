@@ -0,0 +1,154 @@
+"""
+場面変化の判定（端末内で移動検知）
+
+同じカメラで撮った2枚の画像を比べ、撮影者が別の場所に移動したかを判定する。
+縮小グレースケール画像に対して以下をNumPyで計算し、重み付きで合成する:
+- 構造類似度（SSIM、ブロック単位）: 物の配置・輪郭が同じか
+- 知覚ハッシュ（dHash）のハミング距離: 大まかな明暗の配置が同じか
+- 輝度ヒストグラムの差: 部屋の明るさ・色合いが同じか
+
+明るさ・コントラストは正規化してから比べるので、照明の変化だけでは移動と判定しにくい。
+"""
+
+import io
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .imaging import PIL_AVAILABLE, dhash_from_image, hamming_distance
+
+if PIL_AVAILABLE:
+    from PIL import Image
+
+logger = logging.getLogger("conversation")
+
+ANALYSIS_SIZE = (64, 48)  # 判定に使う縮小サイズ
+SSIM_BLOCK = 8            # SSIMを計算するブロックの大きさ（画素）
+SSIM_KEEP_RATIO = 0.7     # SSIMの平均に使うブロックの割合（似ている方から）
+HISTOGRAM_BINS = 16
+
+# 変化スコア（0: 同じ場面 〜 1: 全く別の場面）の重みとしきい値
+WEIGHT_SSIM = 0.5
+WEIGHT_HASH = 0.4
+WEIGHT_HISTOGRAM = 0.1
+MOVED_THRESHOLD = 0.5
+CONFIDENCE_SPAN = 0.2     # しきい値からこれだけ離れていれば確信度1.0
+
+
+@dataclass
+class SceneFeatures:
+    """1枚の画像から取り出した特徴"""
+    pixels: np.ndarray     # 明るさ・コントラストを正規化した縮小画像
+    histogram: np.ndarray  # 正規化済み輝度ヒストグラム
+    dhash: int
+
+
+@dataclass
+class SceneComparison:
+    """2枚の画像の比較結果"""
+    score: float           # 変化スコア（0〜1）
+    ssim: float
+    hash_distance: int
+    histogram_distance: float
+
+    @property
+    def moved(self) -> bool:
+        return self.score >= MOVED_THRESHOLD
+
+    @property
+    def confidence(self) -> float:
+        """判定の確信度（0.5: しきい値付近 〜 1.0: はっきりしている）"""
+        margin = abs(self.score - MOVED_THRESHOLD) / CONFIDENCE_SPAN
+        return round(0.5 + 0.5 * min(1.0, margin), 2)
+
+    @property
+    def reason(self) -> str:
+        return (f"端末内判定 score={self.score:.2f} ssim={self.ssim:.2f} "
+                f"hash={self.hash_distance} hist={self.histogram_distance:.2f}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """MovementDetector.compare_imagesと同じ形式"""
+        return {"moved": self.moved, "confidence": self.confidence, "reason": self.reason}
+
+
+def _extract(image_data: bytes) -> SceneFeatures:
+    width, height = ANALYSIS_SIZE
+    with Image.open(io.BytesIO(image_data)) as image:
+        # DCTスケーリングで縮小してからデコード
+        image.draft("L", (width * 4, height * 4))
+        gray = image.convert("L").resize(ANALYSIS_SIZE, Image.Resampling.BOX)
+
+    raw = np.asarray(gray, dtype=np.float32)
+    histogram, _ = np.histogram(raw, bins=HISTOGRAM_BINS, range=(0, 256))
+    histogram = histogram.astype(np.float32) / raw.size
+
+    std = float(raw.std())
+    pixels = (raw - raw.mean()) / (std if std > 1.0 else 1.0)
+    return SceneFeatures(pixels=pixels, histogram=histogram, dhash=dhash_from_image(gray))
+
+
+def _block_ssim(a: np.ndarray, b: np.ndarray) -> float:
+    """ブロック単位のSSIMの平均（正規化済み画像用の定数）"""
+    rows = a.shape[0] // SSIM_BLOCK
+    cols = a.shape[1] // SSIM_BLOCK
+    shape = (rows, SSIM_BLOCK, cols, SSIM_BLOCK)
+    a = a[:rows * SSIM_BLOCK, :cols * SSIM_BLOCK].reshape(shape)
+    b = b[:rows * SSIM_BLOCK, :cols * SSIM_BLOCK].reshape(shape)
+
+    mean_a = a.mean(axis=(1, 3))
+    mean_b = b.mean(axis=(1, 3))
+    var_a = a.var(axis=(1, 3))
+    var_b = b.var(axis=(1, 3))
+    cov = (a * b).mean(axis=(1, 3)) - mean_a * mean_b
+
+    c1, c2 = 0.01, 0.03
+    ssim = ((2 * mean_a * mean_b + c1) * (2 * cov + c2)) / \
+           ((mean_a ** 2 + mean_b ** 2 + c1) * (var_a + var_b + c2))
+    # 人が横切るなど一部だけの変化は無視する（似ている方から一定割合のブロックの平均）
+    ssim = np.sort(ssim.ravel())[::-1]
+    return float(ssim[:max(1, int(len(ssim) * SSIM_KEEP_RATIO))].mean())
+
+
+def extract_features(image_data: bytes) -> Optional[SceneFeatures]:
+    """JPEGから特徴を取り出す（Pillowがない・デコードできない場合はNone）"""
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        return _extract(image_data)
+    except Exception as e:
+        logger.debug(f"場面比較エラー: {e}")
+        return None
+
+
+def pixel_difference(first: SceneFeatures, second: SceneFeatures) -> float:
+    """正規化した縮小画像の平均絶対差（同じ場面なら0に近い）"""
+    return float(np.abs(first.pixels - second.pixels).mean())
+
+
+def compare_features(first: SceneFeatures, second: SceneFeatures) -> SceneComparison:
+    """特徴どうしを比較"""
+    ssim = _block_ssim(first.pixels, second.pixels)
+    hash_distance = hamming_distance(first.dhash, second.dhash)
+    histogram_distance = float(np.abs(first.histogram - second.histogram).sum() / 2)
+
+    # 無関係な画像どうしのハッシュ距離は平均32ビットなので、32ビットで1.0とする
+    score = (WEIGHT_SSIM * min(1.0, max(0.0, 1.0 - ssim))
+             + WEIGHT_HASH * min(1.0, hash_distance / 32)
+             + WEIGHT_HISTOGRAM * histogram_distance)
+    return SceneComparison(
+        score=round(score, 3),
+        ssim=ssim,
+        hash_distance=hash_distance,
+        histogram_distance=histogram_distance,
+    )
+
+
+def compare_scenes(image1: bytes, image2: bytes) -> Optional[SceneComparison]:
+    """2枚のJPEGを比較（Pillowがない・デコードできない場合はNone）"""
+    first = extract_features(image1)
+    second = extract_features(image2)
+    if first is None or second is None:
+        return None
+    return compare_features(first, second)
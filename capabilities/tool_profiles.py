@@ -0,0 +1,177 @@
+"""
+ツールプロファイル
+
+セッション開始時に送るツール定義を絞り込むための仕組み:
+- Capabilityをグループ（core, mail, calendar, music, call, openclaw）に分類
+- セッションはcoreと「最近・よく使う」グループだけで開始
+- 他のグループが必要になったらcapability_expandで拡張セッションに切り替える
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+from .base import Capability, CapabilityCategory, CapabilityResult
+from config import Config
+
+logger = logging.getLogger("conversation")
+
+
+CORE_GROUP = "core"
+META_GROUP = "meta"
+
+# 拡張可能なグループとその説明（capability_expandの説明文に使用）
+TOOL_GROUP_DESCRIPTIONS: Dict[str, str] = {
+    "mail": "メールの確認・読み上げ・送信・返信、写真付きメール",
+    "calendar": "カレンダーの予定の確認・追加・削除",
+    "music": "音楽の再生・停止・一時停止",
+    "call": "スマホとのビデオ通話の開始・終了",
+    "openclaw": "OpenClaw経由の外部サービス（Notion, Slack, GitHubなど）",
+}
+
+ALL_GROUPS: FrozenSet[str] = frozenset([CORE_GROUP, *TOOL_GROUP_DESCRIPTIONS])
+
+
+class ToolUsageStats:
+    """ツールグループの利用統計（減衰スコア + 最終利用時刻、ファイルに永続化）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    self._stats = json.load(f)
+        except Exception:
+            self._stats = {}
+
+    def _save(self) -> None:
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(self._stats, f)
+        except Exception:
+            pass
+
+    def _decayed_score(self, entry: Dict[str, float], now: float) -> float:
+        """半減期で減衰させたスコア"""
+        elapsed = max(0.0, now - entry.get("last_used", now))
+        half_life = Config.TOOL_PROFILE_HALF_LIFE
+        return entry.get("score", 0.0) * math.pow(0.5, elapsed / half_life)
+
+    def record(self, group: str) -> None:
+        """グループの利用を記録"""
+        if group in (CORE_GROUP, META_GROUP):
+            return
+        now = time.time()
+        with self._lock:
+            entry = self._stats.setdefault(group, {"score": 0.0, "last_used": now, "count": 0})
+            entry["score"] = self._decayed_score(entry, now) + 1.0
+            entry["last_used"] = now
+            entry["count"] = entry.get("count", 0) + 1
+            self._save()
+
+    def hot_groups(self) -> FrozenSet[str]:
+        """最近使った、またはよく使うグループ"""
+        now = time.time()
+        hot = set()
+        with self._lock:
+            for group, entry in self._stats.items():
+                if group not in TOOL_GROUP_DESCRIPTIONS:
+                    continue
+                recent = now - entry.get("last_used", 0) <= Config.TOOL_PROFILE_HOT_WINDOW
+                frequent = self._decayed_score(entry, now) >= Config.TOOL_PROFILE_FREQUENT_SCORE
+                if recent or frequent:
+                    hot.add(group)
+        return frozenset(hot)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """統計のコピーを取得"""
+        with self._lock:
+            return {g: dict(e) for g, e in self._stats.items()}
+
+
+def select_tool_profile(stats: ToolUsageStats,
+                        pinned: Iterable[str] = ()) -> Optional[FrozenSet[str]]:
+    """セッション開始時のツールグループを選択
+
+    Returns:
+        送るグループの集合。絞り込みが無効ならNone（全ツール）
+    """
+    if not Config.TOOL_PROFILE_ENABLED:
+        return None
+    groups = {CORE_GROUP} | set(stats.hot_groups()) | set(pinned)
+    groups &= ALL_GROUPS
+    if groups == ALL_GROUPS:
+        return None
+    return frozenset(groups)
+
+
+class ExpandTools(Capability):
+    """今のセッションにない能力グループを読み込む"""
+
+    @property
+    def name(self) -> str:
+        return "capability_expand"
+
+    @property
+    def category(self) -> CapabilityCategory:
+        return CapabilityCategory.SYSTEM
+
+    @property
+    def tool_group(self) -> str:
+        return META_GROUP
+
+    @property
+    def description(self) -> str:
+        groups = "\n".join(
+            f"- {group}: {desc}" for group, desc in TOOL_GROUP_DESCRIPTIONS.items()
+        )
+        return f"""今使える能力にない依頼を受けたときに使う。以下のグループを読み込む：
+{groups}
+
+groupsに必要なグループ名（カンマ区切り）、requestにユーザーの依頼内容をそのまま渡す。
+読み込み後、依頼は自動的に続行されるので、ユーザーには何も言わなくてよい。"""
+
+    def _get_parameters(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "groups": {
+                    "type": "string",
+                    "description": "読み込むグループ名（例: 'mail', 'calendar,mail'）"
+                },
+                "request": {
+                    "type": "string",
+                    "description": "ユーザーの依頼内容（そのまま）"
+                }
+            },
+            "required": ["groups", "request"]
+        }
+
+    def execute(self, groups: str = "", request: str = "") -> CapabilityResult:
+        requested = [
+            g.strip() for g in str(groups).replace("、", ",").split(",")
+            if g.strip() in TOOL_GROUP_DESCRIPTIONS
+        ]
+        if not requested:
+            return CapabilityResult.fail("その能力はありません")
+
+        # 実際のセッション切り替えはGeminiRealtimeClientが行う
+        return CapabilityResult.ok(
+            "準備しています。少々お待ちください。",
+            data={"expand_groups": requested, "request": request}
+        )
+
+
+# エクスポート
+TOOL_PROFILE_CAPABILITIES = [
+    ExpandTools(),
+]
@@ -32,6 +32,16 @@ def set_videocall_callbacks(
     _is_in_call_callback = is_in_call_callback
 
 
+def is_video_call_active() -> bool:
+    """ビデオ通話中かどうか"""
+    if _is_in_call_callback is None:
+        return False
+    try:
+        return bool(_is_in_call_callback())
+    except Exception:
+        return False
+
+
 class VideoCallStart(Capability):
     """ビデオ通話発信"""
 
@@ -43,6 +53,10 @@ class VideoCallStart(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.CALL
 
+    @property
+    def tool_group(self) -> str:
+        return "call"
+
     @property
     def description(self) -> str:
         return """ビデオ通話を開始する。以下の場面で使う：
@@ -82,6 +96,10 @@ class VideoCallEnd(Capability):
     def category(self) -> CapabilityCategory:
         return CapabilityCategory.CALL
 
+    @property
+    def tool_group(self) -> str:
+        return "call"
+
     @property
     def description(self) -> str:
         return """ビデオ通話を終了する。以下の場面で使う：
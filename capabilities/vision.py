@@ -7,35 +7,56 @@
 - 目の前のものを理解する
 """
 
-import base64
-import subprocess
-import threading
+import logging
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
-from google import genai
-from google.genai import types
+from typing import Any, Callable, Dict, Optional
 
 from .base import Capability, CapabilityCategory, CapabilityResult
+from .imaging import image_dhash, prepare_image, select_preset
+from .vision_cache import get_vision_cache
 from config import Config
 
 
-# カメラ排他制御用ロック
-camera_lock = threading.Lock()
+logger = logging.getLogger("conversation")
 
 # Geminiクライアント（Vision API用）
 _gemini_client = None
 
+# 詳細分析の先読み用スレッド
+_prefetch_executor: Optional[ThreadPoolExecutor] = None
+
+# Liveセッションに映像を送るコールバック（LIVE_VIDEO_MODE用、送れたらTrue）
+_live_frame_sender: Optional[Callable[[bytes], bool]] = None
+
+
+def set_live_frame_sender(sender: Optional[Callable[[bytes], bool]]) -> None:
+    """Liveセッションに映像を送るコールバックを設定"""
+    global _live_frame_sender
+    _live_frame_sender = sender
+
 
 # 直前の撮影コンテキスト
 @dataclass
 class LastCaptureContext:
     """直前の撮影コンテキスト"""
-    image_data: bytes        # 画像バイナリ
-    image_base64: str        # Base64エンコード済み
+    image_data: bytes        # 画像バイナリ（撮影解像度）
     brief_analysis: str      # 簡潔な分析結果
     prompt: str              # 元の質問
     timestamp: float         # 撮影時刻（5分でタイムアウト）
+    detail_future: Optional[Future] = None  # 先読み中・済みの詳細分析
+    on_detail: Optional[Callable[[str], None]] = None  # 詳細分析ができた時に呼ぶ（回答キャッシュに保存）
+
+    def set_detail(self, detail: str) -> None:
+        """詳細分析の結果を受け取る"""
+        if detail and self.on_detail is not None:
+            self.on_detail(detail)
+
+    def cancel_prefetch(self) -> None:
+        """先読みを取り消す（実行中の場合は結果を使わない）"""
+        if self.detail_future is not None:
+            self.detail_future.cancel()
 
 
 _last_capture: Optional[LastCaptureContext] = None
@@ -48,6 +69,7 @@ def get_last_capture() -> Optional[LastCaptureContext]:
     if _last_capture is None:
         return None
     if time.time() - _last_capture.timestamp > CAPTURE_TIMEOUT_SEC:
+        _last_capture.cancel_prefetch()
         _last_capture = None
         return None
     return _last_capture
@@ -56,27 +78,69 @@ def get_last_capture() -> Optional[LastCaptureContext]:
 def clear_last_capture() -> None:
     """撮影コンテキストをクリア"""
     global _last_capture
+    if _last_capture is not None:
+        _last_capture.cancel_prefetch()
     _last_capture = None
 
 
-def _save_capture_context(image_data: bytes, image_base64: str,
-                          brief_analysis: str, prompt: str) -> None:
+def _save_capture_context(image_data: bytes, brief_analysis: str, prompt: str) -> LastCaptureContext:
     """撮影コンテキストを保存"""
     global _last_capture
+    if _last_capture is not None:
+        _last_capture.cancel_prefetch()
     _last_capture = LastCaptureContext(
         image_data=image_data,
-        image_base64=image_base64,
         brief_analysis=brief_analysis,
         prompt=prompt,
         timestamp=time.time()
     )
+    return _last_capture
+
+
+def _start_detail_prefetch(context: LastCaptureContext) -> None:
+    """「詳しく」と言われる前に詳細分析を始めておく（回答を読み上げている間に生成する）"""
+    global _prefetch_executor
+    if not Config.VISION_DETAIL_PREFETCH:
+        return
+    from .communication import get_firebase_messenger
+    if get_firebase_messenger() is None:
+        # スマホに送れないなら詳細は使われない
+        return
+    from .detail_info import analyze_detail
+
+    def run() -> Optional[str]:
+        # 待っている間に別の撮影に置き換わった・期限が切れたなら分析しない
+        if get_last_capture() is not context:
+            return None
+        try:
+            detail = analyze_detail(context, speculative=True)
+            context.set_detail(detail)
+            return detail
+        except Exception as e:
+            logger.debug(f"詳細分析の先読みエラー: {e}")
+            return None
+
+    if _prefetch_executor is None:
+        _prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="detail-prefetch")
+    context.detail_future = _prefetch_executor.submit(run)
+
+
+def capture_frame(keep_alive: bool = True) -> Optional[bytes]:
+    """常駐カメラから最新フレームを取得（ビデオ通話中も通話と同じセンサーから取得できる）
+
+    Args:
+        keep_alive: Falseなら常駐させない（ライフログなどの定期撮影）
+    """
+    from core.camera import get_camera_service
+    return get_camera_service().capture_jpeg(keep_alive=keep_alive)
 
 
 def get_gemini_client():
-    """Geminiクライアントを取得（遅延初期化）"""
+    """Geminiクライアントを取得（LLMゲートウェイと共有）"""
     global _gemini_client
     if _gemini_client is None:
-        _gemini_client = genai.Client(api_key=Config.get_google_api_key())
+        from core.llm_gateway import get_llm_gateway
+        _gemini_client = get_llm_gateway().client
     return _gemini_client
 
 
@@ -122,38 +186,50 @@ promptで質問を渡すと、見たものについてその質問に答える""
 
     def execute(self, prompt: str = "何が見えますか？") -> CapabilityResult:
         """カメラで撮影して分析"""
-        with camera_lock:
-            try:
-                image_path = "/tmp/ai_necklace_capture.jpg"
-                result = subprocess.run(
-                    ["rpicam-still", "-o", image_path, "-t", "500",
-                     "--width", "1280", "--height", "960"],
-                    capture_output=True, text=True, timeout=10
-                )
-
-                if result.returncode != 0:
-                    return CapabilityResult.fail("今は見えません")
-
-                with open(image_path, "rb") as f:
-                    image_data = f.read()
-
-            except subprocess.TimeoutExpired:
-                return CapabilityResult.fail("今は見えません")
-            except FileNotFoundError:
-                return CapabilityResult.fail("今は見えません")
-            except Exception:
-                return CapabilityResult.fail("今は見えません")
-
-        # 画像分析（ロック外で実行）
         try:
-            client = get_gemini_client()
+            image_data = capture_frame()
+        except Exception:
+            image_data = None
 
-            # 画像をBase64エンコード
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
+        if not image_data:
+            return CapabilityResult.fail("今は見えません")
 
-            # Gemini Vision APIで画像分析
-            response = client.models.generate_content(
-                model=Config.VISION_MODEL,
+        # Liveセッションに映像として渡し、Liveモデルが直接答える（Vision APIの往復を省く）
+        # 映像は何度も送られるので先読みはせず、「詳しく」と言われた時に分析する
+        if Config.LIVE_VIDEO_MODE != "off" and _live_frame_sender is not None:
+            if _live_frame_sender(image_data):
+                _save_capture_context(image_data, "", prompt)
+                return CapabilityResult.ok("目の前の映像を送りました。映像を見て質問に直接答えてください")
+
+        # 同じ場面で同じ質問なら前回の回答を返す（詳細分析も済んでいればそれを使う）
+        # 文字を読む質問は使わない（同じ位置から撮った別のページ・レシートは画像ハッシュでは区別できない）
+        preset = select_preset(prompt)
+        cache = get_vision_cache() if preset != "ocr" else None
+        image_hash = image_dhash(image_data) if cache else None
+        if cache:
+            cached = cache.get(image_hash, prompt)
+            if cached:
+                cached_answer, cached_detail = cached
+                context = _save_capture_context(image_data, cached_answer, prompt)
+                if cached_detail:
+                    context.detail_future = Future()
+                    context.detail_future.set_result(cached_detail)
+                else:
+                    context.on_detail = lambda detail: cache.put_detail(image_hash, prompt, detail)
+                    _start_detail_prefetch(context)
+                return CapabilityResult.ok(cached_answer)
+
+        # 画像分析
+        try:
+            from google.genai import types
+            from core.llm_gateway import get_llm_gateway, PRIORITY_INTERACTIVE
+
+            # 質問に合わせて縮小（文字を読む質問はフル解像度）
+            upload_data = prepare_image(image_data, preset)
+
+            # Gemini Vision APIで画像分析（ユーザーが待っているので最優先・ヘッジあり）
+            response = get_llm_gateway().generate(
+                "vision",
                 contents=[
                     types.Content(
                         role="user",
@@ -162,21 +238,26 @@ promptで質問を渡すと、見たものについてその質問に答える""
                             types.Part(
                                 inline_data=types.Blob(
                                     mime_type="image/jpeg",
-                                    data=image_data
+                                    data=upload_data
                                 )
                             )
                         ]
                     )
                 ],
-                config=types.GenerateContentConfig(
-                    max_output_tokens=300
-                )
+                priority=PRIORITY_INTERACTIVE,
+                timeout=15,
+                hedge=True
             )
 
             brief_analysis = response.text
+            if cache:
+                cache.put(image_hash, prompt, brief_analysis)
 
             # 撮影コンテキストを保存（後で「詳しく」と聞かれた時用）
-            _save_capture_context(image_data, image_base64, brief_analysis, prompt)
+            context = _save_capture_context(image_data, brief_analysis, prompt)
+            if cache:
+                context.on_detail = lambda detail: cache.put_detail(image_hash, prompt, detail)
+            _start_detail_prefetch(context)
 
             return CapabilityResult.ok(brief_analysis)
 
@@ -186,23 +267,10 @@ promptで質問を渡すと、見たものについてその質問に答える""
 
 def capture_image_raw() -> Optional[bytes]:
     """画像データを取得（他のCapabilityから使用）"""
-    with camera_lock:
-        try:
-            image_path = "/tmp/ai_necklace_capture.jpg"
-            result = subprocess.run(
-                ["rpicam-still", "-o", image_path, "-t", "500",
-                 "--width", "1280", "--height", "960"],
-                capture_output=True, timeout=10
-            )
-
-            if result.returncode != 0:
-                return None
-
-            with open(image_path, "rb") as f:
-                return f.read()
-
-        except Exception:
-            return None
+    try:
+        return capture_frame()
+    except Exception:
+        return None
 
 
 # エクスポート
@@ -218,4 +286,5 @@ __all__ = [
     'clear_last_capture',
     'LastCaptureContext',
     'get_gemini_client',
+    'set_live_frame_sender',
 ]
@@ -0,0 +1,190 @@
+"""
+Vision回答キャッシュ
+
+「これ何？」「読んで」を同じ場面で繰り返したときに、
+Geminiに問い合わせず前回の回答を返す。
+- キー: 画像の知覚ハッシュ（dHash）+ 正規化した質問
+- 画像はハミング距離がしきい値以下なら同じ場面とみなす
+  （文字を読む質問には使わない。別のページでも64bitのハッシュはほぼ同じになるため）
+- メモリ上のLRU + ファイルに永続化（再起動後も有効期限内なら使う）
+- 「詳しく」用の詳細分析も同じエントリに保存し、ヒットした時は詳細分析をやり直さない
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+from .imaging import hamming_distance
+
+logger = logging.getLogger("conversation")
+
+# 質問の正規化で取り除く文字（空白・句読点・記号）
+_PROMPT_STRIP = re.compile(r"[\s、。，．,.!！?？「」『』()（）・…ー〜~]+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """質問を正規化（全角半角・大文字小文字・句読点の違いを無視）"""
+    text = unicodedata.normalize("NFKC", prompt or "").lower()
+    return _PROMPT_STRIP.sub("", text)
+
+
+class VisionAnswerCache:
+    """画像ハッシュ + 質問で引く回答キャッシュ（LRU、ファイルに永続化）"""
+
+    def __init__(self, path: Optional[str] = None, ttl: float = Config.VISION_CACHE_TTL,
+                 max_distance: int = Config.VISION_CACHE_MAX_DISTANCE,
+                 max_entries: int = Config.VISION_CACHE_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        # (質問, ハッシュ) -> {"answer": str, "detail": Optional[str], "timestamp": float}
+        self._entries: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                for item in data.get("entries", []):
+                    key = (item["prompt"], int(item["hash"], 16))
+                    self._entries[key] = {"answer": item["answer"], "detail": item.get("detail"),
+                                          "timestamp": item["timestamp"]}
+                self.hits = data.get("hits", 0)
+                self.misses = data.get("misses", 0)
+        except Exception:
+            self._entries.clear()
+        self._expire(time.time())
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        data = {
+            "entries": [
+                {"prompt": prompt, "hash": f"{image_hash:016x}",
+                 "answer": entry["answer"], "detail": entry.get("detail"),
+                 "timestamp": entry["timestamp"]}
+                for (prompt, image_hash), entry in self._entries.items()
+            ],
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(data, f, ensure_ascii=False)
+        except Exception:
+            pass
+
+    def _expire(self, now: float) -> None:
+        """有効期限切れの回答を削除（ロック保持中に呼ぶ）"""
+        expired = [k for k, e in self._entries.items() if now - e["timestamp"] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def _find(self, image_hash: int, normalized: str) -> Tuple[Optional[Tuple[str, int]], int]:
+        """最も近い場面のキーと距離（ロック保持中に呼ぶ）"""
+        best_key = None
+        best_distance = self.max_distance + 1
+        for key in self._entries:
+            if key[0] != normalized:
+                continue
+            distance = hamming_distance(key[1], image_hash)
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key, best_distance
+
+    def get(self, image_hash: Optional[int], prompt: str) -> Optional[Tuple[str, Optional[str]]]:
+        """同じ場面・同じ質問の回答を取得
+
+        Returns:
+            (回答, 詳細分析（まだなければNone）)。なければNone
+        """
+        if image_hash is None:
+            return None
+        normalized = normalize_prompt(prompt)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            best_key, best_distance = self._find(image_hash, normalized)
+            if best_key is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            self._save()
+        logger.info(f"Vision回答キャッシュヒット (距離{best_distance}, ヒット率{self.hit_rate:.0%})")
+        return entry["answer"], entry.get("detail")
+
+    def put(self, image_hash: Optional[int], prompt: str, answer: str) -> None:
+        """回答を保存"""
+        if image_hash is None or not answer:
+            return
+        key = (normalize_prompt(prompt), image_hash)
+        with self._lock:
+            self._entries[key] = {"answer": answer, "detail": None, "timestamp": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def put_detail(self, image_hash: Optional[int], prompt: str, detail: str) -> None:
+        """同じ場面・同じ質問の回答に詳細分析を付ける（回答がなければ何もしない）"""
+        if image_hash is None or not detail:
+            return
+        with self._lock:
+            key, _ = self._find(image_hash, normalize_prompt(prompt))
+            if key is None:
+                return
+            self._entries[key]["detail"] = detail
+            self._save()
+
+    def clear(self) -> None:
+        """全ての回答を削除"""
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+            }
+
+
+# シングルトン
+_vision_cache: Optional[VisionAnswerCache] = None
+
+
+def get_vision_cache() -> Optional[VisionAnswerCache]:
+    """Vision回答キャッシュを取得（無効ならNone）"""
+    global _vision_cache
+    if not Config.VISION_CACHE_ENABLED or Config.VISION_CACHE_TTL <= 0:
+        return None
+    if _vision_cache is None:
+        _vision_cache = VisionAnswerCache(Config.VISION_CACHE_PATH)
+    return _vision_cache
@@ -20,6 +20,7 @@ class Config:
     # Live API用モデル（2025年12月以降は gemini-2.5-flash-native-audio を使用）
     MODEL = "gemini-2.5-flash-native-audio-preview-12-2025"
     VISION_MODEL = "gemini-2.0-flash"  # Vision API用モデル
+    LITE_MODEL = "gemini-2.0-flash-lite"  # 短い判定・抽出用の安いモデル（core/model_router.py）
     VOICE = "Aoede"  # Gemini voices: Puck, Charon, Kore, Fenrir, Aoede
 
     # オーディオ設定 (Gemini Live API仕様)
@@ -45,17 +46,88 @@ class Config:
     ALARM_FILE_PATH = os.path.join(BASE_DIR, "alarms.json")
     LOG_DIR = os.path.join(BASE_DIR, "logs")
     LIFELOG_DIR = os.path.expanduser("~/lifelog")
+    LIFELOG_INDEX_PATH = os.path.join(LIFELOG_DIR, "index.db")
+    TOOL_USAGE_PATH = os.path.join(BASE_DIR, "tool_usage.json")
+    VISION_CACHE_PATH = os.path.join(BASE_DIR, "vision_cache.json")
+
+    # カメラ設定（常駐rpicam-vid）
+    CAMERA_WIDTH = 1280
+    CAMERA_HEIGHT = 960
+    CAMERA_FPS = 5               # 常駐中のフレームレート（最新フレームの鮮度）
+    CAMERA_WARMUP_FRAMES = 5     # 起動直後に捨てるフレーム数（露出・ホワイトバランス調整）
+    CAMERA_IDLE_TIMEOUT = 120    # この秒数使われなければカメラを止める
+
+    # Vision回答キャッシュ（同じ場面への同じ質問はGeminiに問い合わせない）
+    VISION_CACHE_ENABLED = True
+    VISION_CACHE_TTL = 600          # 回答を再利用する期間（秒）
+    VISION_CACHE_MAX_DISTANCE = 6   # 画像ハッシュ（64bit）のハミング距離がこれ以下なら同じ場面
+    VISION_CACHE_SIZE = 200         # 保持する回答の最大数
+    VISION_DETAIL_PREFETCH = True   # 撮影の回答後、「詳しく」用の詳細分析を先に始めておく
+    # カメラ映像をLiveセッションに直接送り、Liveモデルが見て答える（Vision APIを経由しない）
+    #   "off": 使わない / "tool": camera_captureの時に送る / "press": ボタンを押すたびにも送る
+    LIVE_VIDEO_MODE = "off"
+
+    # Gemini呼び出し（Live API以外）の共通設定
+    LLM_MAX_CONCURRENCY = 3         # 同時に送るリクエストの上限
+    LLM_TIMEOUT = 30                # 既定の制限時間（秒、再試行を含む）
+    LLM_MAX_RETRIES = 2             # 通信エラー・429・5xx・タイムアウトの再試行回数
+    LLM_ATTEMPT_TIMEOUT_RATIO = 0.5 # 再試行の余地がある時、1回に使える時間（制限時間に対する割合）
+    LLM_HEDGE_DELAY = 2.5           # 対話用リクエストが遅い時、もう1本送るまでの秒数
+    LLM_HEDGE_MIN_SAMPLES = 20      # この回数の実績があれば、待ち時間にその呼び出しのp95を使う
 
     # ライフログ設定
-    LIFELOG_INTERVAL = 60  # 1分（秒）
+    LIFELOG_INTERVAL = 60                # 通常の撮影間隔（秒）
+    LIFELOG_MIN_INTERVAL = 20            # 景色が大きく変わった直後の撮影間隔（秒）
+    LIFELOG_MAX_INTERVAL = 480           # 変化がない時に延ばす最大の撮影間隔（秒）
+    LIFELOG_SIGNIFICANT_SCORE = 0.4      # 場面の変化スコアがこれ以上なら「大きく変わった」
+    LIFELOG_HOURLY_BUDGET = 60           # 1時間に保存する最大枚数
+    LIFELOG_DEDUPE_ENABLED = True        # 前に保存した写真とほぼ同じなら保存・アップロードしない
+    LIFELOG_DEDUPE_MAX_HASH_DISTANCE = 4 # 画像ハッシュ（64bit）のハミング距離がこれ以下
+    LIFELOG_DEDUPE_MAX_DIFF = 0.1        # かつ縮小画像の平均差（明るさ正規化後）がこれ以下なら同じ
+    LIFELOG_DEDUPE_MAX_AGE = 1800        # 変化がなくてもこの秒数ごとに1枚は保存する
+    LIFELOG_UPLOAD_BATCH_SIZE = 10       # まとめて書き込むエントリの最大数
+    LIFELOG_UPLOAD_BATCH_WAIT = 2.0      # 最初の1件からまとめて送るまで待つ秒数
+    LIFELOG_UPLOAD_MAX_RETRIES = 5       # 送信失敗時の再送回数（諦めた分は次の起動で再送）
+    LIFELOG_UPLOAD_RESUME_HOURS = 48     # 起動時に未送信分を再送する範囲（時間。索引を作る前の古い写真は送らない）
+    LIFELOG_ANALYSIS_SYNC_INTERVAL = 600 # Firebaseから分析結果を索引に取り込む間隔（秒）
+    LIFELOG_ANALYSIS_ENABLED = True      # 端末から写真をまとめてGeminiで分析する
+    LIFELOG_ANALYSIS_BATCH_SIZE = 12     # 1回のリクエストにまとめる最大枚数
+    LIFELOG_ANALYSIS_MIN_BATCH = 8       # この枚数が溜まってから分析する
+    LIFELOG_ANALYSIS_MAX_WAIT = 1800     # 溜まらなくても、最も古い写真からこの秒数たてば分析する
+    LIFELOG_ANALYSIS_MIN_INTERVAL = 60   # 分析リクエストの最短間隔（秒）
+    LIFELOG_ANALYSIS_DAILY_TOKENS = 200000  # 1日に分析で使うトークンの上限
+    LIFELOG_UPLOAD_FULL_SIZE = False     # Falseなら縮小版（768x576）をアップロード（元画像は端末に残す）
+    LIFELOG_THUMBNAIL_SIZE = (320, 240)  # 一覧表示用サムネイル
+    LIFELOG_THUMBNAIL_QUALITY = 70
+
+    # ライフログの保存容量（圧縮ジョブ）
+    LIFELOG_TIMELAPSE_AFTER_DAYS = 3     # この日数より前の写真はタイムラプス動画にまとめる
+    LIFELOG_TIMELAPSE_SIZE = (640, 480)
+    LIFELOG_TIMELAPSE_FPS = 4
+    LIFELOG_TIMELAPSE_CRF = 28           # H.264の画質（大きいほど小さく粗い）
+    LIFELOG_RETENTION_DAYS = 90          # この日数より前の記録は削除
+    LIFELOG_DISK_BUDGET_MB = 2048        # ライフログの容量上限（超えたら古い日から削除）
+    LIFELOG_COMPACTION_INTERVAL = 3600   # 圧縮ジョブの実行間隔（秒）
+    LIFELOG_COMPACTION_MAX_LOAD = 1.0    # ロードアベレージがこれ以下の時だけ圧縮する
+    LIFELOG_COMPACTION_MAX_DEFER_DAYS = 7  # 未送信・未分析の写真がある日は、この日数まではまとめずに待つ
 
     # プロアクティブリマインダー設定
     REMINDER_CHECK_INTERVAL = 60        # チェック間隔（秒）
     REMINDER_ADVANCE_MINUTES = 10       # 出発何分前にリマインド
     REMINDER_MOVEMENT_CHECK_DELAY = 30  # 移動検知の再撮影待ち（秒）
+    REMINDER_MOVEMENT_LOCAL_CONFIDENCE = 0.7  # 端末内判定の確信度がこれ未満ならGeminiで確認
     REMINDER_LOOKAHEAD_HOURS = 3        # 監視する予定の範囲（時間）
     REMINDER_MAX_RETRIES = 3            # 再リマインド最大回数
 
+    # Capability実行設定
+    CAPABILITY_WORKERS = 4  # 同期Capability用ワーカースレッド数
+
+    # ツールプロファイル設定（セッション開始時に送るツールの絞り込み）
+    TOOL_PROFILE_ENABLED = True
+    TOOL_PROFILE_HOT_WINDOW = 1800     # 最後の利用からこの秒数以内のグループは最初から含める
+    TOOL_PROFILE_FREQUENT_SCORE = 3.0  # 減衰スコアがこれ以上のグループは最初から含める
+    TOOL_PROFILE_HALF_LIFE = 86400     # 利用スコアの半減期（秒）
+
     # セッション設定
     SESSION_RESET_TIMEOUT = 10  # 秒（応答後このくらい経過でリセット）
     VOICE_MESSAGE_TIMEOUT = 60  # 秒（音声メッセージモードのタイムアウト）
@@ -85,6 +157,16 @@ class Config:
             raise ValueError("GOOGLE_API_KEY または GEMINI_API_KEY が設定されていません")
         return key
 
+    @classmethod
+    def get_gemini_base_url(cls) -> Optional[str]:
+        """Gemini APIの接続先を取得（ローカルスタブ用。通常は未設定）"""
+        return os.getenv("GEMINI_BASE_URL")
+
+    @classmethod
+    def get_gemini_ca_cert(cls) -> Optional[str]:
+        """GEMINI_BASE_URLの証明書を検証するCA証明書のパス（任意）"""
+        return os.getenv("GEMINI_CA_CERT")
+
     @classmethod
     def get_tavily_api_key(cls) -> str:
         """Tavily APIキーを取得（Web検索用）"""
@@ -112,12 +194,31 @@ class Config:
         """OpenClaw Gatewayトークンを取得（任意）"""
         return os.getenv("OPENCLAW_GATEWAY_TOKEN")
 
+    # 起動時間
+    BOOT_PROFILE = os.getenv("BOOT_PROFILE") == "1"  # 準備完了時に起動の内訳を表示
+    BOOT_BUDGET_MS = 2500  # 起動の予算（bench.run_boot_benchで超えたら失敗）
+
+    # ビデオ通話
+    WEBRTC_DEBUG = os.getenv("WEBRTC_DEBUG") == "1"  # aiortc/aioiceのデバッグログを出す
+
     # Gmail APIスコープ
     GMAIL_SCOPES = [
         'https://www.googleapis.com/auth/gmail.readonly',
         'https://www.googleapis.com/auth/gmail.send',
         'https://www.googleapis.com/auth/gmail.modify'
     ]
+    GMAIL_METADATA_CACHE_SIZE = 500  # メールのヘッダーを覚えておく件数
+    GMAIL_SYNC_ENABLED = True  # メールボックスを端末にキャッシュして差分同期する
+    GMAIL_MAILBOX_PATH = os.path.join(BASE_DIR, "mailbox.db")
+    GMAIL_SYNC_INTERVAL = 60  # 差分同期の間隔（秒）
+    GMAIL_SYNC_DAYS = 14  # 初回同期で取得する期間（日）
+    GMAIL_SYNC_MAX_MESSAGES = 200  # キャッシュするメールの最大数
+
+    # カレンダーの予定のキャッシュ（syncTokenで差分同期）
+    CALENDAR_SYNC_INTERVAL = 120  # 予定を引く時に差分を確認する間隔（秒）
+    CALENDAR_RESYNC_INTERVAL = 86400  # 期間をずらして取り直す間隔（秒）
+    CALENDAR_SYNC_PAST_DAYS = 7  # キャッシュする期間（過去）
+    CALENDAR_SYNC_FUTURE_DAYS = 60  # キャッシュする期間（未来）
 
 
 # 設定ディレクトリの作成
@@ -1,22 +1,50 @@
 """
 Core層
 
-音声処理、Gemini Live API、Firebase連携、WebRTC
+音声処理、Gemini Live API、Gemini呼び出しの共通窓口、Firebase連携、WebRTC
 """
 
-from .audio import (
-    AudioHandler,
-    find_audio_device,
-    resample_audio,
-    generate_startup_sound,
-    generate_notification_sound,
-    generate_reset_sound,
-    generate_music_start_sound
-)
-from .gemini_realtime_client import GeminiRealtimeClient
-from .firebase_voice import FirebaseVoiceMessenger
-from .firebase_signaling import FirebaseSignaling
-from .webrtc import VideoCallManager, get_video_call_manager, AIORTC_AVAILABLE
+import importlib
+from importlib.util import find_spec
+
+# 各モジュールは最初に使われた時に読み込む（PEP 562）。
+# 特にwebrtc（aiortc/av）はビデオ通話を始めるまで読み込まない
+_LAZY_ATTRS = {
+    'AudioHandler': 'audio',
+    'find_audio_device': 'audio',
+    'resample_audio': 'audio',
+    'generate_startup_sound': 'audio',
+    'generate_notification_sound': 'audio',
+    'generate_reset_sound': 'audio',
+    'generate_music_start_sound': 'audio',
+    'CameraService': 'camera',
+    'get_camera_service': 'camera',
+    'GeminiRealtimeClient': 'gemini_realtime_client',
+    'SessionConfigCache': 'session_config',
+    'LLMGateway': 'llm_gateway',
+    'get_llm_gateway': 'llm_gateway',
+    'FirebaseVoiceMessenger': 'firebase_voice',
+    'FirebaseSignaling': 'firebase_signaling',
+    'VideoCallManager': 'webrtc',
+    'get_video_call_manager': 'webrtc',
+}
+
+# ビデオ通話が使えるか（webrtcを読み込まずに、インストールされているかだけ確認）
+AIORTC_AVAILABLE = find_spec("aiortc") is not None and find_spec("av") is not None
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
 
 __all__ = [
     'AudioHandler',
@@ -26,7 +54,12 @@ __all__ = [
     'generate_notification_sound',
     'generate_reset_sound',
     'generate_music_start_sound',
+    'CameraService',
+    'get_camera_service',
     'GeminiRealtimeClient',
+    'SessionConfigCache',
+    'LLMGateway',
+    'get_llm_gateway',
     'FirebaseVoiceMessenger',
     'FirebaseSignaling',
     'VideoCallManager',
@@ -8,14 +8,26 @@
 import io
 import wave
 import numpy as np
-import pyaudio
 from typing import Optional, Callable
 
 from config import Config
 
+# PyAudio（シミュレーションモードではWAVバックエンドを使うため任意）
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    PYAUDIO_AVAILABLE = False
 
-def find_audio_device(p: pyaudio.PyAudio, device_type: str = "input") -> Optional[int]:
-    """オーディオデバイスを自動検出"""
+PA_INT16 = pyaudio.paInt16 if PYAUDIO_AVAILABLE else 8
+
+
+def find_audio_device(p, device_type: str = "input") -> Optional[int]:
+    """オーディオデバイスを自動検出
+
+    Args:
+        p: PyAudio、またはPyAudio互換のバックエンド
+    """
     input_target_names = ["usbmic", "USB PnP Sound", "USB Audio", "USB PnP Audio"]
     output_target_names = ["usbspk", "UACDemo", "USB Audio", "USB PnP Audio"]
     target_names = input_target_names if device_type == "input" else output_target_names
@@ -75,8 +87,16 @@ def resample_audio(audio_data: bytes, from_rate: int, to_rate: int, gain: float
 class AudioHandler:
     """オーディオ入出力ハンドラ（raspi-voice3ベース）"""
 
-    def __init__(self):
-        self.audio = pyaudio.PyAudio()
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: PyAudio互換のバックエンド（Noneなら実デバイスのPyAudio）
+        """
+        if backend is None:
+            if not PYAUDIO_AVAILABLE:
+                raise RuntimeError("PyAudioがインストールされていません")
+            backend = pyaudio.PyAudio()
+        self.audio = backend
         self.input_stream = None
         self.output_stream = None
         self.is_recording = False
@@ -93,7 +113,7 @@ class AudioHandler:
 
         try:
             self.input_stream = self.audio.open(
-                format=pyaudio.paInt16,
+                format=PA_INT16,
                 channels=Config.CHANNELS,
                 rate=Config.INPUT_SAMPLE_RATE,
                 input=True,
@@ -135,7 +155,7 @@ class AudioHandler:
 
         try:
             self.output_stream = self.audio.open(
-                format=pyaudio.paInt16,
+                format=PA_INT16,
                 channels=Config.CHANNELS,
                 rate=Config.OUTPUT_SAMPLE_RATE,
                 output=True,
@@ -0,0 +1,91 @@
+"""
+起動時間の計測
+
+起動の各段階（モジュールの読み込み・各サービスの初期化・Live APIへの接続・準備完了音）に
+かかった時間を記録し、内訳を表示する。
+- 起点はこのモジュールを読み込んだ時刻（main.pyの最初に読み込む）
+- 並行して初期化する段階も、それぞれの開始・所要時間を記録する
+- BOOT_PROFILE=1 で起動すると、準備完了音の時点で内訳を表示する
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+_process_start = time.perf_counter()
+
+
+class BootProfile:
+    """起動の段階ごとの時間"""
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = start if start is not None else time.perf_counter()
+        self._lock = threading.Lock()
+        self.steps: List[Dict[str, Any]] = []
+        self.marks: Dict[str, float] = {}
+
+    def _offset_ms(self, t: float) -> float:
+        return round((t - self.start) * 1000, 1)
+
+    @contextmanager
+    def step(self, name: str):
+        """段階の時間を計る"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.steps.append({
+                    "name": name,
+                    "start_ms": self._offset_ms(begin),
+                    "duration_ms": round((end - begin) * 1000, 1),
+                    "thread": threading.current_thread().name,
+                })
+
+    def run(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """関数を段階として実行（スレッドプールに渡す用）"""
+        with self.step(name):
+            return func(*args, **kwargs)
+
+    def mark(self, name: str) -> float:
+        """起点からの経過時間を記録（例: 準備完了）"""
+        offset = self._offset_ms(time.perf_counter())
+        with self._lock:
+            self.marks[name] = offset
+        return offset
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "steps": sorted(self.steps, key=lambda s: s["start_ms"]),
+                "marks": dict(self.marks),
+            }
+
+    def report(self, width: int = 40) -> str:
+        """内訳（開始位置と長さを棒で表示）"""
+        data = self.to_dict()
+        total = max(
+            [s["start_ms"] + s["duration_ms"] for s in data["steps"]] + list(data["marks"].values()) + [1.0]
+        )
+        scale = width / total
+        lines = [f"{'段階':<24}{'開始(ms)':>10}{'時間(ms)':>10}"]
+        for s in data["steps"]:
+            offset = int(s["start_ms"] * scale)
+            length = max(1, int(s["duration_ms"] * scale))
+            lines.append(
+                f"{s['name']:<24}{s['start_ms']:>10.0f}{s['duration_ms']:>10.0f}  "
+                f"{' ' * offset}{'#' * length}"
+            )
+        for name, offset in sorted(data["marks"].items(), key=lambda m: m[1]):
+            lines.append(f"{name:<24}{offset:>10.0f}")
+        return "\n".join(lines)
+
+
+_boot_profile = BootProfile(_process_start)
+
+
+def get_boot_profile() -> BootProfile:
+    """起動時間の記録を取得（シングルトン）"""
+    return _boot_profile
@@ -0,0 +1,419 @@
+"""
+カメラサービス（フレームブローカー）
+
+常駐のrpicam-vid（MJPEG出力）がセンサーを一度だけ開き、
+フレームを撮影要求と購読者（ビデオ通話など）に配る。
+- 撮影要求（ビジョン・ライフログ・リマインダー）: 最新フレームのJPEGをすぐに返す
+- 購読者: 購読者ごとのフレームレート・サイズ・ピクセル形式に変換して配信
+- センサー起動・露出調整のコストは起動時に一度だけ
+- 購読者がおらず一定時間使われなければプロセスを止めて省電力化（次の要求で再起動）
+- 定期撮影（ライフログ）は常駐させない: 動いていれば最新フレーム、止まっていればrpicam-stillで1枚
+- rpicam-vidが使えない場合はrpicam-stillで1枚撮影にフォールバック
+"""
+
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from importlib.util import find_spec
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from config import Config
+
+# PyAV（購読者向けのデコード・リサイズ用。読み込みは初めてデコードする時）
+AV_AVAILABLE = find_spec("av") is not None
+
+logger = logging.getLogger("conversation")
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+READ_SIZE = 64 * 1024
+
+
+def capture_still(width: int, height: int, timeout: float = 10) -> Optional[bytes]:
+    """rpicam-stillで1枚撮影（フォールバック用）"""
+    fd, image_path = tempfile.mkstemp(prefix="ai_necklace_", suffix=".jpg")
+    os.close(fd)
+    try:
+        result = subprocess.run(
+            ["rpicam-still", "-o", image_path, "-t", "500",
+             "--width", str(width), "--height", str(height), "-n"],
+            capture_output=True, timeout=timeout
+        )
+        if result.returncode != 0:
+            return None
+        with open(image_path, "rb") as f:
+            return f.read() or None
+    except Exception:
+        return None
+    finally:
+        try:
+            os.unlink(image_path)
+        except OSError:
+            pass
+
+
+class FrameSubscription:
+    """フレームの購読
+
+    fpsを指定するとそのレートまで間引き、pixel_formatを指定すると
+    JPEGをデコードして指定サイズ・形式のav.VideoFrameで配信する（未指定ならJPEGバイト）。
+    コールバックはカメラの読み取りスレッドから呼ばれる。
+    """
+
+    def __init__(self, name: str, callback: Callable, fps: Optional[float] = None,
+                 size: Optional[Tuple[int, int]] = None, pixel_format: Optional[str] = None):
+        if pixel_format and not AV_AVAILABLE:
+            raise RuntimeError("PyAVがインストールされていません")
+        self.name = name
+        self.callback = callback
+        self.fps = fps
+        self.size = size
+        self.pixel_format = pixel_format
+
+        self._last_delivered = 0.0
+        self._decoder = None
+        self.delivered = 0
+        self.dropped = 0
+
+    def _create_decoder(self, source_width: int):
+        import av
+        decoder = av.CodecContext.create("mjpeg", "r")
+        # 縮小はDCT領域で行う（1/2, 1/4, 1/8）とデコードが軽い
+        if self.size:
+            lowres = 0
+            while lowres < 3 and (source_width >> (lowres + 1)) >= self.size[0]:
+                lowres += 1
+            if lowres:
+                decoder.options = {"lowres": str(lowres)}
+        return decoder
+
+    def _adapt(self, jpeg: bytes, source_width: int):
+        """購読者の形式に変換"""
+        if not self.pixel_format:
+            return jpeg
+        if self._decoder is None:
+            self._decoder = self._create_decoder(source_width)
+        import av
+        frames = self._decoder.decode(av.Packet(jpeg))
+        if not frames:
+            return None
+        width, height = self.size or (frames[0].width, frames[0].height)
+        return frames[0].reformat(width=width, height=height, format=self.pixel_format)
+
+    def _offer(self, jpeg: bytes, timestamp: float, source_width: int) -> None:
+        """フレームを配信（レートを超える分は間引く）"""
+        if self.fps and timestamp - self._last_delivered < 0.8 / self.fps:
+            self.dropped += 1
+            return
+        self._last_delivered = timestamp
+        try:
+            payload = self._adapt(jpeg, source_width)
+            if payload is not None:
+                self.delivered += 1
+                self.callback(payload)
+        except Exception as e:
+            logger.debug(f"フレーム配信エラー ({self.name}): {e}")
+
+
+class CameraService:
+    """常駐カメラ（最新フレームの保持と購読者への配信）"""
+
+    def __init__(self, width: int = Config.CAMERA_WIDTH, height: int = Config.CAMERA_HEIGHT,
+                 framerate: int = Config.CAMERA_FPS,
+                 idle_timeout: float = Config.CAMERA_IDLE_TIMEOUT,
+                 warmup_frames: int = Config.CAMERA_WARMUP_FRAMES):
+        self.width = width
+        self.height = height
+        self.framerate = framerate
+        self.idle_timeout = idle_timeout
+        self.warmup_frames = warmup_frames
+
+        self._lock = threading.Lock()  # プロセスと購読者
+        # 最新フレーム（撮影要求が待つ間もsubscribe/unsubscribeを止めないよう別のロック）
+        self._frame_ready = threading.Condition(threading.Lock())
+        self._process: Optional[subprocess.Popen] = None
+        self._process_fps = 0
+        self._reader: Optional[threading.Thread] = None
+        self._frame_process: Optional[subprocess.Popen] = None  # 最新フレームを出しているプロセス
+        self._latest: Optional[bytes] = None
+        self._latest_time = 0.0
+        self._frame_count = 0
+        self._last_request = 0.0
+        self._failures = 0
+        self._retry_at = 0.0  # 常駐に失敗し続けた場合、この時刻まではrpicam-stillを使う
+        self._idle_timer: Optional[threading.Timer] = None
+        self._subscribers: Dict[str, FrameSubscription] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def last_request(self) -> float:
+        """最後に撮影・購読が要求された時刻"""
+        return self._last_request
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    @property
+    def subscriber_names(self) -> Set[str]:
+        with self._lock:
+            return set(self._subscribers)
+
+    # ---- プロセス管理 ----
+
+    def _desired_fps(self) -> int:
+        """購読者の要求を満たすフレームレート"""
+        rates = [s.fps for s in self._subscribers.values() if s.fps]
+        return int(max([self.framerate] + rates))
+
+    def _start_locked(self) -> bool:
+        """rpicam-vidを起動（ロック保持中に呼ぶ）"""
+        fps = self._desired_fps()
+        if self.is_running:
+            if self._process_fps == fps:
+                return True
+            # 購読者の要求レートが変わったら開き直す
+            self._stop_locked()
+
+        cmd = [
+            "rpicam-vid",
+            "-t", "0",
+            "--width", str(self.width),
+            "--height", str(self.height),
+            "--framerate", str(fps),
+            "--codec", "mjpeg",
+            "-o", "-",
+            "-n",
+        ]
+        try:
+            self._process = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0
+            )
+        except Exception as e:
+            logger.error(f"カメラ起動エラー: {e}")
+            self._process = None
+            return False
+
+        self._process_fps = fps
+        with self._frame_ready:
+            self._frame_process = self._process
+            self._latest = None
+            self._latest_time = 0.0
+            self._frame_count = 0
+        self._reader = threading.Thread(
+            target=self._read_loop, args=(self._process,), daemon=True, name="camera-reader"
+        )
+        self._reader.start()
+        logger.info(f"カメラ常駐開始 ({self.width}x{self.height} {fps}fps)")
+        return True
+
+    def _stop_locked(self) -> None:
+        """rpicam-vidを停止（ロック保持中に呼ぶ）"""
+        process = self._process
+        self._process = None
+        with self._frame_ready:
+            self._frame_process = None
+            self._latest = None
+            self._frame_ready.notify_all()
+        if self._idle_timer:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if process is None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        logger.info("カメラ常駐停止")
+
+    def _read_loop(self, process: subprocess.Popen) -> None:
+        """MJPEGストリームをJPEGフレームに分割して配信"""
+        buffer = bytearray()
+        stream = process.stdout
+        try:
+            while True:
+                data = stream.read(READ_SIZE)
+                if not data:
+                    break
+                buffer += data
+
+                while True:
+                    start = buffer.find(JPEG_SOI)
+                    if start < 0:
+                        buffer.clear()
+                        break
+                    end = buffer.find(JPEG_EOI, start + 2)
+                    if end < 0:
+                        if start > 0:
+                            del buffer[:start]
+                        break
+                    frame = bytes(buffer[start:end + 2])
+                    del buffer[:end + 2]
+                    self._publish(process, frame)
+        except Exception as e:
+            logger.debug(f"カメラ読み取りエラー: {e}")
+        finally:
+            with self._lock:
+                if self._process is process:
+                    self._process = None
+            with self._frame_ready:
+                if self._frame_process is process:
+                    self._frame_process = None
+                    self._latest = None
+                self._frame_ready.notify_all()
+
+    def _publish(self, process: subprocess.Popen, frame: bytes) -> None:
+        with self._lock:
+            subscribers: List[FrameSubscription] = list(self._subscribers.values())
+        with self._frame_ready:
+            if self._frame_process is not process:
+                return
+            self._frame_count += 1
+            # 起動直後は露出・ホワイトバランスが安定していないので捨てる
+            if self._frame_count <= self.warmup_frames:
+                return
+            self._latest = frame
+            self._latest_time = timestamp = time.time()
+            self._frame_ready.notify_all()
+        self._failures = 0
+
+        for subscription in subscribers:
+            subscription._offer(frame, timestamp, self.width)
+
+    def _schedule_idle_stop_locked(self) -> None:
+        if self._idle_timer:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if self.idle_timeout <= 0 or self._subscribers:
+            return
+        self._idle_timer = threading.Timer(self.idle_timeout, self._idle_check)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _idle_check(self) -> None:
+        with self._lock:
+            if self._subscribers:
+                return
+            if time.time() - self._last_request >= self.idle_timeout:
+                self._stop_locked()
+
+    # ---- 公開API ----
+
+    def capture_jpeg(self, max_age: float = 0.5, timeout: float = 5.0,
+                     keep_alive: bool = True) -> Optional[bytes]:
+        """最新フレームをJPEGで取得
+
+        Args:
+            max_age: 許容するフレームの古さ（秒）。これより古ければ次のフレームを待つ
+            timeout: フレームを待つ最大時間（秒）
+            keep_alive: Falseなら常駐を起動・延長しない（止まっていればrpicam-stillで1枚撮る）
+        """
+        deadline = time.time() + timeout
+        with self._lock:
+            if keep_alive:
+                self._last_request = time.time()
+                started = time.time() >= self._retry_at and self._start_locked()
+                if started:
+                    self._schedule_idle_stop_locked()
+            else:
+                started = self.is_running
+            process = self._process
+
+        if started:
+            frame, latest = self._wait_frame(max_age, deadline)
+            if frame is not None:
+                return frame
+
+            with self._lock:
+                self._failures += 1
+                if self._subscribers:
+                    # 購読者（ビデオ通話など）の配信は止めない。rpicam-stillは同時にセンサーを開けないので、
+                    # 古くても最後のフレームを返す（再起動は購読者側の復旧に任せる）
+                    logger.warning("カメラフレーム取得失敗（購読中のため最後のフレームを返します）")
+                    return latest
+                if self._failures >= 3:
+                    self._retry_at = time.time() + 60
+                if self._process is process:
+                    self._stop_locked()
+            logger.warning("カメラフレーム取得失敗（rpicam-stillで撮影）")
+
+        return capture_still(self.width, self.height)
+
+    def _wait_frame(self, max_age: float,
+                    deadline: float) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """新しいフレームを待つ（ブローカーのロックは持たない）
+
+        Returns:
+            (max_age以内のフレーム, 最後のフレーム)
+        """
+        with self._frame_ready:
+            while True:
+                if self._latest is not None and time.time() - self._latest_time <= max_age:
+                    return self._latest, self._latest
+                remaining = deadline - time.time()
+                # 止まったら待たない（購読者のレート変更による再起動なら次のプロセスのフレームを待つ）
+                if remaining <= 0 or self._frame_process is None:
+                    return None, self._latest
+                self._frame_ready.wait(min(remaining, 0.5))
+
+    def subscribe(self, name: str, callback: Callable, fps: Optional[float] = None,
+                  size: Optional[Tuple[int, int]] = None,
+                  pixel_format: Optional[str] = None) -> FrameSubscription:
+        """フレームを購読（同名の購読は置き換え）
+
+        Args:
+            name: 購読者名
+            callback: フレームを受け取る関数（カメラの読み取りスレッドから呼ばれる）
+            fps: 最大フレームレート（Noneならカメラのレートのまま）
+            size: 配信サイズ（pixel_format指定時のみ有効）
+            pixel_format: 指定するとav.VideoFrameで配信（例: "yuv420p"）
+        """
+        subscription = FrameSubscription(name, callback, fps, size, pixel_format)
+        with self._lock:
+            self._subscribers[name] = subscription
+            self._last_request = time.time()
+            self._schedule_idle_stop_locked()
+            self._start_locked()
+        logger.info(f"カメラ購読開始: {name}")
+        return subscription
+
+    def unsubscribe(self, name: str) -> None:
+        """購読を終了"""
+        with self._lock:
+            subscription = self._subscribers.pop(name, None)
+            if subscription is None:
+                return
+            # 高いレートを要求していた購読者がいなくなったら元のレートに戻す
+            if self.is_running and self._process_fps != self._desired_fps():
+                self._start_locked()
+            self._schedule_idle_stop_locked()
+        logger.info(
+            f"カメラ購読終了: {name} (配信{subscription.delivered}, 間引き{subscription.dropped})"
+        )
+
+    def stop(self) -> None:
+        """停止"""
+        with self._lock:
+            self._subscribers.clear()
+            self._stop_locked()
+
+
+# シングルトン
+_camera_service: Optional[CameraService] = None
+_camera_service_lock = threading.Lock()
+
+
+def get_camera_service() -> CameraService:
+    """カメラサービスを取得"""
+    global _camera_service
+    with _camera_service_lock:
+        if _camera_service is None:
+            _camera_service = CameraService()
+        return _camera_service
@@ -128,33 +128,109 @@ class FirebaseVoiceMessenger:
 
     def upload_lifelog_photo(self, photo_data: bytes, date: str, time_str: str) -> bool:
         """ライフログ写真をFirebaseにアップロード"""
-        filename = f"{time_str}.jpg"
+        photo_url = self.upload_lifelog_image(photo_data, date, time_str)
+        if not photo_url:
+            return False
+        doc_data = self.lifelog_photo_doc(photo_url, time_str)
+        return self.write_lifelog_entries({f"{date}/{time_str}": doc_data})
+
+    def record_lifelog_unchanged(self, date: str, time_str: str, same_as: str) -> bool:
+        """前の写真から変化がなかったことを記録（写真はアップロードしない）
+
+        Args:
+            date: 日付（YYYY-MM-DD）
+            time_str: 撮影時刻（HHMMSS）
+            same_as: 同じ場面として保存済みの写真の撮影時刻（HHMMSS）
+        """
+        doc_data = self.lifelog_unchanged_doc(time_str, same_as)
+        return self.write_lifelog_entries({f"{date}/{time_str}": doc_data})
+
+    def upload_lifelog_image(self, photo_data: bytes, date: str, time_str: str,
+                             filename: Optional[str] = None,
+                             content_type: str = "image/jpeg") -> Optional[str]:
+        """ライフログ写真をFirebase Storageにアップロード（失敗時はNone）
+
+        Args:
+            filename: lifelogs/{date}/ 以下のパス（省略時は {time_str}.jpg）
+        """
+        filename = filename or f"{time_str}.jpg"
         storage_url = f"https://firebasestorage.googleapis.com/v0/b/{self.storage_bucket}/o"
         encoded_path = requests.utils.quote(f"lifelogs/{date}/{filename}", safe='')
         upload_url = f"{storage_url}/{encoded_path}"
 
-        headers = {"Content-Type": "image/jpeg"}
-        response = requests.post(upload_url, headers=headers, data=photo_data)
-
+        headers = {"Content-Type": content_type}
+        try:
+            response = requests.post(upload_url, headers=headers, data=photo_data, timeout=30)
+        except requests.exceptions.RequestException:
+            return None
         if response.status_code != 200:
-            return False
-
-        photo_url = f"{storage_url}/{encoded_path}?alt=media"
-        timestamp = int(time.time() * 1000)
-        time_formatted = f"{time_str[:2]}:{time_str[2:4]}"
+            return None
+        return f"{storage_url}/{encoded_path}?alt=media"
 
+    def lifelog_photo_doc(self, photo_url: str, time_str: str,
+                          timestamp: Optional[int] = None,
+                          thumb_url: Optional[str] = None) -> Dict[str, Any]:
+        """ライフログ写真のエントリ"""
         doc_data = {
             "deviceId": self.device_id,
-            "timestamp": timestamp,
-            "time": time_formatted,
+            "timestamp": timestamp or int(time.time() * 1000),
+            "time": f"{time_str[:2]}:{time_str[2:4]}",
             "photoUrl": photo_url,
             "analyzed": False,
             "analysis": ""
         }
+        if thumb_url:
+            doc_data["thumbUrl"] = thumb_url
+        return doc_data
+
+    def lifelog_unchanged_doc(self, time_str: str, same_as: str,
+                              timestamp: Optional[int] = None) -> Dict[str, Any]:
+        """「変化なし」のエントリ"""
+        return {
+            "deviceId": self.device_id,
+            "timestamp": timestamp or int(time.time() * 1000),
+            "time": f"{time_str[:2]}:{time_str[2:4]}",
+            "unchanged": True,
+            "sameAs": same_as
+        }
+
+    def write_lifelog_entries(self, entries: Dict[str, Dict[str, Any]]) -> bool:
+        """ライフログのエントリをまとめて書き込む（マルチパス更新で1リクエスト）
+
+        Args:
+            entries: {"YYYY-MM-DD/HHMMSS": エントリ}
+        """
+        if not entries:
+            return True
+        db_url = f"{self.db_url}/lifelogs.json"
+        try:
+            response = requests.patch(db_url, json=entries, timeout=10)
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
 
-        db_url = f"{self.db_url}/lifelogs/{date}/{time_str}.json"
-        response = requests.put(db_url, json=doc_data)
-        return True
+    def write_lifelog_analysis(self, results: Dict[str, str]) -> bool:
+        """分析結果をまとめて書き込む（写真ごとのanalyzed/analysisだけを更新）
+
+        Args:
+            results: {"YYYY-MM-DD/HHMMSS": 分析結果}
+        """
+        updates: Dict[str, Any] = {}
+        for key, analysis in results.items():
+            updates[f"{key}/analyzed"] = True
+            updates[f"{key}/analysis"] = analysis
+        return self.write_lifelog_entries(updates)
+
+    def get_lifelog_entries(self, date: str) -> Dict[str, Dict[str, Any]]:
+        """その日のライフログエントリを取得（{HHMMSS: エントリ}、失敗時は空）"""
+        db_url = f"{self.db_url}/lifelogs/{date}.json"
+        try:
+            response = requests.get(db_url, timeout=10)
+        except requests.exceptions.RequestException:
+            return {}
+        if response.status_code != 200:
+            return {}
+        return response.json() or {}
 
     def get_messages(self, limit: int = 10, unplayed_only: bool = False) -> List[Dict]:
         """メッセージ一覧を取得"""
@@ -5,21 +5,48 @@ Gemini Live APIクライアント
 """
 
 import asyncio
+import ssl
 import time
 import logging
-from typing import Optional, Callable, Any, Dict, List
+from typing import Optional, Callable, Any, Dict, FrozenSet, List, Tuple
 
 from google import genai
 from google.genai import types
 
 from config import Config
-from prompts import get_system_prompt
-from capabilities import get_executor
+from capabilities import get_executor, is_music_active, is_video_call_active
+from capabilities.imaging import prepare_image
+from capabilities.tool_profiles import ALL_GROUPS
+from .session_config import SessionConfigCache
 
 # ロガー設定（main.pyと同じロガーを使用）
 logger = logging.getLogger("conversation")
 
 
+def create_genai_client(api_key: str) -> genai.Client:
+    """Geminiクライアントを作成
+
+    GEMINI_BASE_URLが設定されていればその接続先（ローカルスタブなど）を使う。
+    """
+    base_url = Config.get_gemini_base_url()
+    if not base_url:
+        return genai.Client(api_key=api_key)
+
+    async_client_args = {}
+    ca_cert = Config.get_gemini_ca_cert()
+    if ca_cert:
+        async_client_args["ssl"] = ssl.create_default_context(cafile=ca_cert)
+
+    logger.info(f"Gemini接続先: {base_url}")
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            base_url=base_url,
+            async_client_args=async_client_args or None
+        )
+    )
+
+
 class GeminiRealtimeClient:
     """Gemini Live APIクライアント"""
 
@@ -29,10 +56,18 @@ class GeminiRealtimeClient:
         self.on_response_complete = on_response_complete
 
         self.executor = get_executor()
+        # セッション設定は一度だけ構築して再利用（起動時にサイズを報告）
+        self.session_config = SessionConfigCache(self.executor)
+
+        # 現在のセッションで送っているツールグループ（Noneは全ツール）
+        self.tool_groups: Optional[FrozenSet[str]] = None
+        self.session_config.get(self._select_tool_groups())
 
         # Gemini クライアント初期化
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = create_genai_client(self.api_key)
         self.session = None
+        self._session_cm = None
+        self._retired_session_cm = None
         self.is_connected = False
         self.is_responding = False
         self.loop = None
@@ -50,50 +85,98 @@ class GeminiRealtimeClient:
         # 録音状態
         self._is_recording = False
 
-    def _get_session_config(self) -> Dict[str, Any]:
-        """セッション設定を取得"""
-        return {
-            "response_modalities": ["AUDIO"],
-            "system_instruction": get_system_prompt(),
-            "speech_config": types.SpeechConfig(
-                voice_config=types.VoiceConfig(
-                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                        voice_name=Config.VOICE
-                    )
-                )
-            ),
-            "realtime_input_config": {
-                "automatic_activity_detection": {"disabled": True}
-            },
-            "tools": self.executor.get_gemini_tools(),
-        }
+    def _select_tool_groups(self) -> Optional[FrozenSet[str]]:
+        """セッション開始時のツールグループを選択（再生中の音楽・通話中の通話は止められるように残す）"""
+        pinned = []
+        if is_music_active():
+            pinned.append("music")
+        if is_video_call_active():
+            pinned.append("call")
+        return self.executor.select_tool_profile(pinned)
+
+    def _get_session_config(self, groups: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        """セッション設定を取得（Capability登録が変わるまでキャッシュを再利用）"""
+        return self.session_config.get(groups)
+
+    async def _open_session(self, config: Dict[str, Any]) -> Tuple[Any, Any]:
+        """Live APIセッションを開く（コンテキストマネージャとセッションを返す）"""
+        session_cm = self.client.aio.live.connect(
+            model=Config.MODEL,
+            config=config
+        )
+        session = await session_cm.__aenter__()
+        return session_cm, session
+
+    @staticmethod
+    async def _close_session(session_cm) -> None:
+        """Live APIセッションを閉じる"""
+        if session_cm is None:
+            return
+        try:
+            await session_cm.__aexit__(None, None, None)
+        except Exception:
+            pass
 
     async def connect(self) -> None:
         """接続"""
         try:
-            config = self._get_session_config()
-            self.session = await self.client.aio.live.connect(
-                model=Config.MODEL,
-                config=config
-            )
+            groups = self._select_tool_groups()
+            config = self._get_session_config(groups)
+            self._session_cm, self.session = await self._open_session(config)
+            self.tool_groups = groups
             self.is_connected = True
             self.loop = asyncio.get_event_loop()
+            # 非同期Capabilityはこのループ上で実行する
+            self.executor.bind_loop(self.loop)
 
-            logger.info("Gemini Live API接続完了")
+            logger.info(f"Gemini Live API接続完了 ({self.session_config.format_groups(groups)})")
         except Exception as e:
             logger.error(f"接続エラー: {e}")
             raise
 
     async def disconnect(self) -> None:
         """切断"""
+        await self._close_session(self._retired_session_cm)
+        self._retired_session_cm = None
         if self.session:
-            try:
-                await self.session.close()
-            except Exception:
-                pass
+            await self._close_session(self._session_cm)
+            self._session_cm = None
             self.session = None
             self.is_connected = False
 
+    async def _expand_session(self, groups: List[str], request: str) -> bool:
+        """ツールグループを追加したセッションに切り替えて依頼を続行
+
+        Live APIはセッション中にツールを追加できないため、
+        拡張した設定で新しいセッションを開き、依頼内容を引き継ぐ。
+        古いセッションは受信ループが切り替えを検知した後に閉じる。
+        """
+        for group in groups:
+            self.executor.usage.record(group)
+
+        current = self.tool_groups if self.tool_groups is not None else ALL_GROUPS
+        new_groups: Optional[FrozenSet[str]] = frozenset(current | set(groups))
+        if new_groups >= ALL_GROUPS:
+            new_groups = None
+
+        start = time.time()
+        try:
+            session_cm, session = await self._open_session(self._get_session_config(new_groups))
+        except Exception as e:
+            logger.error(f"ツール拡張エラー: {e}")
+            return False
+
+        self._retired_session_cm = self._session_cm
+        self._session_cm, self.session = session_cm, session
+        self.tool_groups = new_groups
+        logger.info(
+            f"ツール拡張: {self.session_config.format_groups(new_groups)} "
+            f"({(time.time() - start) * 1000:.0f}ms)"
+        )
+
+        await self.send_text_message(request)
+        return True
+
     async def send_activity_start(self) -> None:
         """音声活動開始を通知"""
         if not self.is_connected or not self.session:
@@ -145,6 +228,32 @@ class GeminiRealtimeClient:
             except Exception as e:
                 logger.error(f"音声送信エラー: {e}")
 
+    async def send_video_frame(self, image_data: bytes) -> bool:
+        """カメラのフレームを映像入力として送る（LIVE_VIDEO_MODE用）"""
+        if not self.is_connected or not self.session:
+            return False
+
+        try:
+            await self.session.send_realtime_input(
+                video=types.Blob(
+                    data=prepare_image(image_data, "brief"),
+                    mime_type="image/jpeg"
+                )
+            )
+            return True
+        except Exception as e:
+            logger.error(f"映像送信エラー: {e}")
+            return False
+
+    async def send_camera_frame(self) -> bool:
+        """常駐カメラの最新フレームを映像入力として送る"""
+        from .camera import get_camera_service
+        loop = asyncio.get_running_loop()
+        image_data = await loop.run_in_executor(None, get_camera_service().capture_jpeg)
+        if not image_data:
+            return False
+        return await self.send_video_frame(image_data)
+
     async def send_text_message(self, text: str) -> None:
         """テキストメッセージを送信（アラーム通知用）"""
         if not self.is_connected or not self.session:
@@ -175,10 +284,17 @@ class GeminiRealtimeClient:
         """メッセージ受信ループ"""
         try:
             while self.is_connected and self.session:
+                session = self.session
                 try:
-                    async for response in self.session.receive():
+                    async for response in session.receive():
                         await self._handle_response(response)
                         self.reconnect_count = 0
+                        if self.session is not session:
+                            # ツール拡張で新しいセッションに切り替わった
+                            break
+                    if self._retired_session_cm is not None:
+                        await self._close_session(self._retired_session_cm)
+                        self._retired_session_cm = None
                 except Exception as e:
                     if "closed" in str(e).lower():
                         logger.warning("セッションが閉じられました")
@@ -234,6 +350,8 @@ class GeminiRealtimeClient:
     async def _handle_tool_call(self, tool_call) -> None:
         """ツール呼び出しを処理"""
         function_responses = []
+        expand_groups: List[str] = []
+        expand_request = ""
 
         for fc in tool_call.function_calls:
             name = fc.name
@@ -241,20 +359,19 @@ class GeminiRealtimeClient:
 
             logger.info(f"[CAPABILITY] {name} {arguments}")
 
-            # 長時間かかる処理は別スレッドで
-            if name in ["voice_send_photo", "camera_capture", "gmail_send_photo"]:
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None, lambda: self.executor.execute(name, arguments)
-                )
-            else:
-                result = self.executor.execute(name, arguments)
+            # 非同期Capabilityはこのループ上で、同期Capabilityは専用プールで実行
+            result = await self.executor.execute_async(name, arguments)
 
             # voice_sendの場合は録音モードを有効化
             if result.data and result.data.get("start_voice_recording"):
                 self.voice_message_mode = True
                 self.voice_message_timestamp = time.time()
 
+            # ツール拡張の場合はセッション切り替え後に依頼を続行
+            if result.data and result.data.get("expand_groups"):
+                expand_groups.extend(result.data["expand_groups"])
+                expand_request = result.data.get("request") or expand_request
+
             # FunctionResponseを作成
             function_responses.append(
                 types.FunctionResponse(
@@ -264,6 +381,16 @@ class GeminiRealtimeClient:
                 )
             )
 
+        # 拡張セッションに切り替えられた場合、古いセッションへの応答は不要
+        if expand_groups:
+            if await self._expand_session(expand_groups, expand_request):
+                return
+            function_responses = [
+                types.FunctionResponse(id=r.id, name=r.name, response={"result": "今はできません"})
+                if r.name == "capability_expand" else r
+                for r in function_responses
+            ]
+
         # ツール結果を送信
         if function_responses:
             await self.send_tool_response(function_responses)
@@ -0,0 +1,230 @@
+"""
+ライフログのアップロードキュー
+
+撮影スレッドはファイルを保存してキューに積むだけにし、
+写真のアップロードとデータベースへの書き込みはバックグラウンドで行う。
+- 写真（設定により縮小版）とサムネイルはStorageに1枚ずつアップロードし、
+  エントリはまとめて1回のマルチパス更新で書き込む
+- 失敗したものは間隔を延ばしながら再送する（諦めたものは索引に未送信のまま残り、次の起動で再送する）
+- 回線が遅くても撮影や他の機能（camera_captureなど）を待たせない
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from config import Config
+
+logger = logging.getLogger("conversation")
+
+
+@dataclass
+class LifelogUpload:
+    """アップロード待ちのライフログ"""
+    date: str                       # YYYY-MM-DD
+    time_str: str                   # HHMMSS
+    timestamp: int                  # 撮影時刻（ミリ秒）
+    image_path: Optional[str] = None  # 写真（Noneなら「変化なし」のエントリ）
+    thumb_path: Optional[str] = None  # サムネイル
+    same_as: Optional[str] = None     # 「変化なし」の場合、同じ場面の写真の撮影時刻
+    photo_url: Optional[str] = None   # アップロード済みなら写真のURL
+    thumb_url: Optional[str] = None   # アップロード済みならサムネイルのURL
+    attempts: int = 0
+    next_try: float = 0.0
+
+    @property
+    def key(self) -> str:
+        return f"{self.date}/{self.time_str}"
+
+
+class LifelogUploader:
+    """ライフログのアップロードをバックグラウンドで行うキュー"""
+
+    def __init__(self, messenger, batch_size: int = Config.LIFELOG_UPLOAD_BATCH_SIZE,
+                 batch_wait: float = Config.LIFELOG_UPLOAD_BATCH_WAIT,
+                 max_retries: int = Config.LIFELOG_UPLOAD_MAX_RETRIES,
+                 on_uploaded: Optional[Callable[[str, str], None]] = None,
+                 resize: Optional[Callable[[bytes], bytes]] = None):
+        """
+        Args:
+            messenger: FirebaseVoiceMessenger
+            on_uploaded: 書き込み完了ごとに(日付, 撮影時刻)で呼ばれる
+            resize: アップロード前に写真を縮小する関数（Noneなら元のまま）
+        """
+        self.messenger = messenger
+        self.on_uploaded = on_uploaded
+        self.resize = resize
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+
+        self._queue: "queue.Queue[LifelogUpload]" = queue.Queue()
+        self._retry: List[LifelogUpload] = []
+        self._keys: Set[str] = set()  # キュー・再送待ちにあるもの（同じものを二重に積まない）
+        self._stop = threading.Event()
+        self._sending = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="lifelog-uploader")
+        self._thread.start()
+
+        self.uploaded = 0
+        self.failed = 0
+
+    # ---- 公開API ----
+
+    def enqueue_photo(self, date: str, time_str: str, image_path: str,
+                      thumb_path: Optional[str] = None, timestamp: Optional[int] = None) -> None:
+        """保存した写真をアップロード待ちに追加"""
+        self._put(LifelogUpload(date, time_str, timestamp or int(time.time() * 1000),
+                                image_path=image_path, thumb_path=thumb_path))
+
+    def enqueue_unchanged(self, date: str, time_str: str, same_as: str,
+                          timestamp: Optional[int] = None) -> None:
+        """「変化なし」のエントリを書き込み待ちに追加"""
+        self._put(LifelogUpload(date, time_str, timestamp or int(time.time() * 1000), same_as=same_as))
+
+    def resume(self, rows: Iterable[Dict]) -> int:
+        """索引で未送信になっているもの（前回の起動で送れなかった分）を積み直す
+
+        Returns:
+            積んだ件数
+        """
+        count = 0
+        for row in rows:
+            if f"{row['date']}/{row['time']}" in self._keys:
+                continue
+            timestamp = int(row['taken_at'] * 1000)
+            if row['kind'] == 'unchanged':
+                self.enqueue_unchanged(row['date'], row['time'], row['same_as'], timestamp)
+            else:
+                self.enqueue_photo(row['date'], row['time'], row['path'], row['thumb_path'], timestamp)
+            count += 1
+        return count
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retry) + (1 if self._sending else 0)
+
+    def stop(self, flush_timeout: float = 5.0) -> None:
+        """停止（残りはflush_timeout秒まで送信を試みる）"""
+        deadline = time.time() + flush_timeout
+        while self.pending and time.time() < deadline:
+            time.sleep(0.1)
+        self._stop.set()
+        self._thread.join(timeout=2)
+        if self.pending:
+            logger.warning(f"ライフログ未送信: {self.pending}件")
+
+    # ---- 内部処理 ----
+
+    def _put(self, item: LifelogUpload) -> None:
+        self._keys.add(item.key)
+        self._queue.put(item)
+
+    def _next_batch(self) -> List[LifelogUpload]:
+        """送信する分を集める（最初の1件が来てから少し待って、まとめて送る）"""
+        batch: List[LifelogUpload] = []
+        now = time.time()
+        ready = [item for item in self._retry if item.next_try <= now]
+        for item in ready[:self.batch_size]:
+            self._retry.remove(item)
+            batch.append(item)
+        self._sending = bool(batch)
+
+        timeout = 1.0 if not batch else 0.0
+        deadline = time.time() + self.batch_wait
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+            self._sending = True
+            timeout = max(0.0, deadline - time.time())
+        return batch
+
+    def _schedule_retry(self, item: LifelogUpload) -> None:
+        item.attempts += 1
+        if item.attempts > self.max_retries:
+            self.failed += 1
+            self._keys.discard(item.key)
+            logger.warning(f"ライフログ送信失敗（次の起動で再送します）: {item.key}")
+            return
+        item.next_try = time.time() + min(300, 5 * 2 ** (item.attempts - 1))
+        self._retry.append(item)
+
+    def _send(self, batch: List[LifelogUpload]) -> None:
+        entries: Dict[str, dict] = {}
+        sent: List[LifelogUpload] = []
+
+        for item in batch:
+            if item.image_path is None:
+                doc = self.messenger.lifelog_unchanged_doc(item.time_str, item.same_as, item.timestamp)
+            else:
+                if item.photo_url is None:
+                    try:
+                        with open(item.image_path, "rb") as f:
+                            photo_data = f.read()
+                    except OSError:
+                        # 圧縮・削除などで写真がなくなっていれば送らない
+                        self._keys.discard(item.key)
+                        continue
+                    if self.resize:
+                        photo_data = self.resize(photo_data)
+                    item.photo_url = self.messenger.upload_lifelog_image(
+                        photo_data, item.date, item.time_str
+                    )
+                    if not item.photo_url:
+                        self._schedule_retry(item)
+                        continue
+                if item.thumb_path and item.thumb_url is None:
+                    item.thumb_url = self._upload_thumbnail(item)
+                doc = self.messenger.lifelog_photo_doc(
+                    item.photo_url, item.time_str, item.timestamp, thumb_url=item.thumb_url
+                )
+            entries[item.key] = doc
+            sent.append(item)
+
+        if not entries:
+            return
+        if self.messenger.write_lifelog_entries(entries):
+            self.uploaded += len(sent)
+            for item in sent:
+                self._keys.discard(item.key)
+            if self.on_uploaded:
+                for item in sent:
+                    self.on_uploaded(item.date, item.time_str)
+        else:
+            # 写真はアップロード済みなのでエントリの書き込みだけやり直す
+            for item in sent:
+                self._schedule_retry(item)
+
+    def _upload_thumbnail(self, item: LifelogUpload) -> Optional[str]:
+        """サムネイルをアップロード（失敗してもエントリは書き込む）"""
+        try:
+            with open(item.thumb_path, "rb") as f:
+                thumb_data = f.read()
+        except OSError:
+            return None
+        name = os.path.basename(item.thumb_path)
+        content_type = "image/webp" if name.endswith(".webp") else "image/jpeg"
+        return self.messenger.upload_lifelog_image(
+            thumb_data, item.date, item.time_str,
+            filename=f"thumbs/{name}", content_type=content_type
+        )
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._send(batch)
+            except Exception as e:
+                logger.error(f"ライフログ送信エラー: {e}")
+                for item in batch:
+                    self._schedule_retry(item)
+            finally:
+                self._sending = False
@@ -0,0 +1,384 @@
+"""
+LLMリクエストゲートウェイ
+
+Live API以外のGemini呼び出し（Vision・詳細分析・移動検知・文字起こし・予定抽出・
+ライフログ分析）をすべてここを通して送る。
+- 非同期クライアント1つを使い回す（接続の再利用）
+- 専用のイベントループスレッドで実行し、音声対話のループを塞がない
+- 同時実行数の上限と優先度付きの順番待ち（対話中のVisionをライフログ分析より先に）
+- 呼び出しごとの制限時間、ジッター付きの再試行
+- 対話用の呼び出しは、遅い時に同じリクエストをもう1本送って早い方を使う（ヘッジ）
+- 呼び出し元ごとの遅延（p50/p95）とトークン数を集計
+- モデルはタスクごとに遅延を見ながら選び、タイムアウト時は別のモデルに切り替える
+  （core/model_router.py）
+"""
+
+import asyncio
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional
+
+from config import Config
+from .model_router import ModelRouter
+
+logger = logging.getLogger("conversation")
+
+# 優先度（小さいほど先）
+PRIORITY_INTERACTIVE = 0  # ユーザーが答えを待っている
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2   # ライフログ分析など
+
+# 再試行する HTTP ステータス
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+# 残り時間がこれ未満なら再試行しない
+MIN_ATTEMPT_TIME = 1.0
+
+LATENCY_WINDOW = 200
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in RETRYABLE_CODES:
+        return True
+    # httpx / aiohttp の通信エラー
+    return type(error).__name__ in ("ConnectError", "ReadTimeout", "RemoteProtocolError",
+                                    "ClientConnectionError", "ServerDisconnectedError")
+
+
+class CallSiteStats:
+    """呼び出し元ごとの集計"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.models: Dict[str, int] = {}
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return _percentile(list(self.latencies), p)
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "models": dict(self.models),
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+        }
+
+
+class _PrioritySlots:
+    """優先度付きの同時実行枠（ゲートウェイのループ上でのみ使う）"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: List = []
+        self._seq = itertools.count()
+
+    def try_acquire(self) -> bool:
+        if self.active < self.limit and not self._has_waiters():
+            self.active += 1
+            return True
+        return False
+
+    def _has_waiters(self) -> bool:
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        return bool(self._waiters)
+
+    async def acquire(self, priority: int) -> None:
+        if self.try_acquire():
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 枠を渡された直後に取り消された場合は返す
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # 枠をそのまま次の人に渡す
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class LLMGateway:
+    """Gemini（Live API以外）への呼び出しの窓口"""
+
+    def __init__(self, max_concurrency: int = Config.LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._slots: Optional[_PrioritySlots] = None
+        self._stats: Dict[str, CallSiteStats] = {}
+        self.router = ModelRouter()
+
+    # ---- 準備 ----
+
+    @property
+    def client(self):
+        """共有のGeminiクライアント（遅延初期化）"""
+        with self._client_lock:
+            if self._client is None:
+                from .gemini_realtime_client import create_genai_client
+                self._client = create_genai_client(Config.get_google_api_key())
+            return self._client
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    self._slots = _PrioritySlots(self.max_concurrency)
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=run, daemon=True, name="llm-gateway").start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def _site(self, site: str) -> CallSiteStats:
+        stats = self._stats.get(site)
+        if stats is None:
+            stats = self._stats[site] = CallSiteStats()
+        return stats
+
+    # ---- 公開API ----
+
+    def _submit(self, site: str, contents: Any, config: Any, model: Optional[str],
+                priority: int, timeout: float, retries: Optional[int],
+                hedge: bool) -> concurrent.futures.Future:
+        # モデルの指定がなければタスクの設定と実績から選ぶ
+        models = [model] if model else self.router.plan(site)
+        config = self.router.apply(site, config)
+        return asyncio.run_coroutine_threadsafe(
+            self._generate(site, models, contents, config,
+                           priority, timeout, retries, hedge),
+            self._ensure_loop()
+        )
+
+    def generate(self, site: str, contents: Any, config: Any = None, model: Optional[str] = None,
+                 priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None,
+                 retries: Optional[int] = None, hedge: bool = False):
+        """generate_contentを実行して応答を返す（同期、失敗時は例外）
+
+        Args:
+            site: 呼び出し元の名前（タスクの種類、例: "vision"）
+            model: 使うモデル（省略時はタスクごとに選ぶ）
+            timeout: 再試行を含めた制限時間（秒）
+            hedge: 遅い時に同じリクエストをもう1本送る（対話用）
+        """
+        timeout = timeout or Config.LLM_TIMEOUT
+        future = self._submit(site, contents, config, model, priority, timeout, retries, hedge)
+        try:
+            return future.result(timeout=timeout + 1)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"{site}: {timeout}秒以内に応答がありません")
+
+    async def agenerate(self, site: str, contents: Any, config: Any = None,
+                        model: Optional[str] = None, priority: int = PRIORITY_NORMAL,
+                        timeout: Optional[float] = None, retries: Optional[int] = None,
+                        hedge: bool = False):
+        """generateの非同期版（どのイベントループからでもawaitできる）"""
+        timeout = timeout or Config.LLM_TIMEOUT
+        future = self._submit(site, contents, config, model, priority, timeout, retries, hedge)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """呼び出し元ごとの集計"""
+        return {site: stats.to_dict() for site, stats in sorted(self._stats.items())}
+
+    def log_stats(self) -> None:
+        for site, s in self.stats().items():
+            logger.info(
+                f"LLM[{site}] {s['calls']}回 p50={s['p50_ms']}ms p95={s['p95_ms']}ms "
+                f"エラー{s['errors']} 再試行{s['retries']} 切替{s['fallbacks']} "
+                f"ヘッジ{s['hedges']}(勝ち{s['hedge_wins']}) "
+                f"トークン{s['prompt_tokens']}+{s['output_tokens']} モデル{s['models']}"
+            )
+        for key, s in self.router.stats().items():
+            logger.info(f"LLM[{key}] p50={s['p50_ms']}ms p95={s['p95_ms']}ms 失敗{s['failures']}"
+                        + (" (除外中)" if s["demoted"] else ""))
+
+    # ---- 内部処理（ゲートウェイのループ上） ----
+
+    async def _call(self, site: str, model: str, contents: Any, config: Any):
+        start = time.monotonic()
+        response = await self.client.aio.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+        # 順番待ちを除いたモデルの遅延
+        self.router.record(site, model, time.monotonic() - start)
+        return response
+
+    def _hedge_delay(self, stats: CallSiteStats) -> float:
+        """ヘッジを送るまでの待ち時間（十分な実績があればその呼び出し元のp95）"""
+        if len(stats.latencies) >= Config.LLM_HEDGE_MIN_SAMPLES:
+            return max(0.5, stats.percentile(95))
+        return Config.LLM_HEDGE_DELAY
+
+    async def _attempt(self, site: str, stats: CallSiteStats, model: str, contents: Any,
+                       config: Any, priority: int, hedge: bool):
+        async with self._slots.slot(priority):
+            first = asyncio.ensure_future(self._call(site, model, contents, config))
+            try:
+                if not hedge:
+                    return await first
+
+                done, _ = await asyncio.wait({first}, timeout=self._hedge_delay(stats))
+                if done or not self._slots.try_acquire():
+                    # 空き枠がなければヘッジしない（他のリクエストを待たせない）
+                    return await first
+            except BaseException:
+                # タイムアウトなどで取り消されたら、リクエストを残さない（枠の数と実際の通信を合わせる）
+                first.cancel()
+                raise
+
+            stats.hedges += 1
+            second = asyncio.ensure_future(self._call(site, model, contents, config))
+            pending = {first, second}
+            error: Optional[BaseException] = None
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is second:
+                                stats.hedge_wins += 1
+                            return task.result()
+                        error = task.exception()
+                raise error
+            finally:
+                for task in pending:
+                    task.cancel()
+                self._slots.release()
+
+    async def _generate(self, site: str, models: List[str], contents: Any, config: Any,
+                        priority: int, timeout: float, retries: Optional[int], hedge: bool):
+        stats = self._site(site)
+        retries = Config.LLM_MAX_RETRIES if retries is None else retries
+        deadline = time.monotonic() + timeout
+        attempt_timeout = self.router.attempt_timeout(site)
+        attempt = 0
+        model_index = 0
+
+        while True:
+            model = models[model_index]
+            start = time.monotonic()
+            limit = deadline - start
+            if attempt < retries:
+                # 応答が止まった1回で制限時間を使い切らず、再試行の時間を残す
+                limit = min(limit, max(MIN_ATTEMPT_TIME, timeout * Config.LLM_ATTEMPT_TIMEOUT_RATIO))
+            if attempt_timeout and model_index < len(models) - 1:
+                # 切り替え先があれば、遅いモデルを待ち続けない
+                limit = min(limit, attempt_timeout)
+            try:
+                response = await asyncio.wait_for(
+                    self._attempt(site, stats, model, contents, config, priority, hedge),
+                    timeout=max(0.1, limit)
+                )
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    stats.timeouts += 1
+                retryable = _is_retryable(e)
+                if retryable:
+                    self.router.record(site, model, None)
+                remaining = deadline - time.monotonic()
+                if attempt >= retries or not retryable or remaining < MIN_ATTEMPT_TIME:
+                    stats.calls += 1
+                    stats.errors += 1
+                    logger.warning(f"LLM[{site}] 失敗 ({model}): {type(e).__name__} {e}")
+                    raise
+                attempt += 1
+                if model_index < len(models) - 1:
+                    # 別のモデルにすぐ切り替える
+                    model_index += 1
+                    stats.fallbacks += 1
+                    logger.info(f"LLM[{site}] {model} -> {models[model_index]} に切り替え")
+                    continue
+                stats.retries += 1
+                # フルジッター（同時に失敗した呼び出しが一斉に再送しないように）
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                await asyncio.sleep(min(delay, max(0.0, remaining - MIN_ATTEMPT_TIME)))
+                continue
+
+            stats.calls += 1
+            stats.models[model] = stats.models.get(model, 0) + 1
+            stats.latencies.append(time.monotonic() - start)
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                stats.prompt_tokens += getattr(usage, "prompt_token_count", None) or 0
+                stats.output_tokens += getattr(usage, "candidates_token_count", None) or 0
+            return response
+
+
+# シングルトン
+_llm_gateway: Optional[LLMGateway] = None
+_llm_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """LLMゲートウェイを取得"""
+    global _llm_gateway
+    with _llm_gateway_lock:
+        if _llm_gateway is None:
+            _llm_gateway = LLMGateway()
+        return _llm_gateway
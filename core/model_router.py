@@ -0,0 +1,154 @@
+"""
+タスク別のモデル選択
+
+Gemini呼び出し（Live API以外）の種類ごとに、使うモデル・出力トークン上限・画像サイズと
+遅延の目標を決めておき、実際の遅延（p50/p95）を見ながらモデルを選ぶ。
+- モデルは安い順（品質が足りる範囲）に並べ、p95が目標以内の最も安いモデルを使う
+- 目標を超えた・タイムアウトしたモデルはしばらく外し、時間をおいて試し直す
+- 失敗・タイムアウト時は、残りのモデルのうち速いものに切り替える
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import Config
+
+# p95を判断に使う最小の実績数
+MIN_SAMPLES = 5
+# 目標を超えたモデルを外しておく秒数（過ぎたら実績を捨てて試し直す）
+RETRY_AFTER = 600
+LATENCY_WINDOW = 50
+
+
+@dataclass(frozen=True)
+class TaskRoute:
+    """タスクの種類ごとの設定"""
+    models: Tuple[str, ...]         # 候補（安い順）
+    max_output_tokens: int
+    latency_budget: float           # 目標の遅延（p95、秒）
+    image_preset: Optional[str] = None  # 画像を送る場合の縮小サイズ（IMAGE_PRESETSのキー）
+
+
+TASK_ROUTES: Dict[str, TaskRoute] = {
+    # 対話（ユーザーが答えを待っている）
+    "vision": TaskRoute((Config.LITE_MODEL, Config.VISION_MODEL), 300, 4.0),  # 画像は質問で選ぶ
+    "detail": TaskRoute((Config.VISION_MODEL, Config.LITE_MODEL), 1500, 20.0, "ocr"),
+    "detail_prefetch": TaskRoute((Config.VISION_MODEL, Config.LITE_MODEL), 1500, 30.0, "ocr"),
+    # 判定・抽出（短い出力）
+    "movement": TaskRoute((Config.LITE_MODEL, Config.VISION_MODEL), 200, 5.0, "movement"),
+    "schedule_extract": TaskRoute((Config.LITE_MODEL, Config.VISION_MODEL), 300, 10.0),
+    "transcribe": TaskRoute((Config.LITE_MODEL, Config.VISION_MODEL), 1024, 10.0),
+    # バックグラウンド
+    "lifelog_analysis": TaskRoute((Config.LITE_MODEL, Config.VISION_MODEL), 2048, 60.0, "brief"),
+}
+
+
+def get_route(task: str) -> Optional[TaskRoute]:
+    return TASK_ROUTES.get(task)
+
+
+def route_image_preset(task: str, default: str = "brief") -> str:
+    """タスクで送る画像の縮小サイズ"""
+    route = TASK_ROUTES.get(task)
+    return route.image_preset if route and route.image_preset else default
+
+
+class _ModelStats:
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.failures = 0
+        self.demoted_until = 0.0
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class ModelRouter:
+    """タスクごとにモデルを選ぶ"""
+
+    def __init__(self, routes: Optional[Dict[str, TaskRoute]] = None):
+        self.routes = routes if routes is not None else TASK_ROUTES
+        self._stats: Dict[Tuple[str, str], _ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, task: str, model: str) -> _ModelStats:
+        key = (task, model)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _ModelStats()
+        return stats
+
+    def plan(self, task: str) -> List[str]:
+        """試す順のモデル（先頭が選んだモデル、残りは失敗時の切り替え先）"""
+        route = self.routes.get(task)
+        if route is None:
+            return [Config.VISION_MODEL]
+        now = time.time()
+        with self._lock:
+            available = [m for m in route.models if self._get(task, m).demoted_until <= now]
+            # 全て外れていれば、最も速かったものを使う
+            chosen = available[0] if available else min(
+                route.models, key=lambda m: self._get(task, m).percentile(95) or float("inf")
+            )
+            # 切り替え先は速い順（実績がなければ一覧の順）
+            rest = sorted(
+                (m for m in route.models if m != chosen),
+                key=lambda m: self._get(task, m).percentile(95) or 0.0
+            )
+        return [chosen] + rest
+
+    def attempt_timeout(self, task: str) -> Optional[float]:
+        """切り替え先がある場合の1回の制限時間（目標の2倍）"""
+        route = self.routes.get(task)
+        return route.latency_budget * 2 if route else None
+
+    def apply(self, task: str, config: Any) -> Any:
+        """出力トークン上限をタスクの設定で補う（呼び出し側の指定が優先）"""
+        route = self.routes.get(task)
+        if route is None:
+            return config
+        if config is None:
+            from google.genai import types
+            config = types.GenerateContentConfig()
+        if getattr(config, "max_output_tokens", None) is None:
+            config.max_output_tokens = route.max_output_tokens
+        return config
+
+    def record(self, task: str, model: str, latency: Optional[float]) -> None:
+        """結果を記録（latencyがNoneなら失敗・タイムアウト）"""
+        route = self.routes.get(task)
+        with self._lock:
+            stats = self._get(task, model)
+            if latency is None:
+                stats.failures += 1
+                stats.demoted_until = time.time() + RETRY_AFTER
+                stats.latencies.clear()
+                return
+            stats.latencies.append(latency)
+            if (route and len(stats.latencies) >= MIN_SAMPLES
+                    and stats.percentile(95) > route.latency_budget):
+                stats.demoted_until = time.time() + RETRY_AFTER
+                stats.latencies.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """{タスク/モデル: {p50_ms, p95_ms, samples, failures, demoted}}"""
+        now = time.time()
+        result = {}
+        with self._lock:
+            for (task, model), stats in sorted(self._stats.items()):
+                p50 = stats.percentile(50)
+                p95 = stats.percentile(95)
+                result[f"{task}/{model}"] = {
+                    "p50_ms": round(p50 * 1000) if p50 is not None else None,
+                    "p95_ms": round(p95 * 1000) if p95 is not None else None,
+                    "samples": len(stats.latencies),
+                    "failures": stats.failures,
+                    "demoted": stats.demoted_until > now,
+                }
+        return result
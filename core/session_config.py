@@ -0,0 +1,148 @@
+"""
+セッション設定キャッシュ
+
+Gemini Live APIの接続ごとに組み立てていたセッション設定
+（システムプロンプト + ツール定義 + 音声設定）を一度だけ構築し、
+内容ハッシュ付きで再利用する。
+Capabilityの登録が変わった場合のみ再構築する。
+ツールプロファイル（送るツールグループの組み合わせ）ごとに保持する。
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional
+
+from google.genai import types
+
+from config import Config
+from prompts import get_system_prompt
+
+logger = logging.getLogger("conversation")
+
+
+@dataclass
+class CompiledSessionConfig:
+    """構築済みのセッション設定"""
+    config: Dict[str, Any]   # live.connectに渡す設定
+    content_hash: str        # プロンプト・ツール・音声設定の内容ハッシュ
+    registry_version: int    # 構築時のCapability登録版数
+    prompt_tokens: int       # システムプロンプトの推定トークン数
+    tools_tokens: int        # ツール定義の推定トークン数
+    tool_count: int          # ツール数
+    groups: Optional[FrozenSet[str]] = None  # ツールグループ（Noneは全ツール）
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数を概算
+
+    ASCIIは約4文字で1トークン、日本語などの非ASCII文字は約1文字で1トークンとして数える。
+    """
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+class SessionConfigCache:
+    """セッション設定の構築・キャッシュ"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._compiled: Dict[Optional[FrozenSet[str]], CompiledSessionConfig] = {}
+
+    def get(self, groups: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        """セッション設定を取得（必要な場合のみ再構築）
+
+        Args:
+            groups: 送るツールグループ。Noneなら全ツール
+        """
+        compiled = self._compiled.get(groups)
+        if compiled is None or compiled.registry_version != self.executor.registry_version:
+            compiled = self._compile(groups)
+        return dict(compiled.config)
+
+    def compiled(self, groups: Optional[FrozenSet[str]] = None) -> CompiledSessionConfig:
+        """構築済み設定（未構築なら構築する）"""
+        self.get(groups)
+        return self._compiled[groups]
+
+    def _compile(self, groups: Optional[FrozenSet[str]]) -> CompiledSessionConfig:
+        """セッション設定を構築"""
+        registry_version = self.executor.registry_version
+        prompt = get_system_prompt(groups)
+        tools = self.executor.get_gemini_tools(groups)
+
+        tools_json = json.dumps(tools, ensure_ascii=False, sort_keys=True)
+        content_hash = hashlib.sha256(
+            json.dumps({
+                "model": Config.MODEL,
+                "voice": Config.VOICE,
+                "prompt": prompt,
+                "tools": tools_json,
+            }, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+        # 内容が変わっていなければ既存の設定オブジェクトを使い回す
+        previous = self._compiled.get(groups)
+        if previous is not None and previous.content_hash == content_hash:
+            previous.registry_version = registry_version
+            return previous
+
+        config = {
+            "response_modalities": ["AUDIO"],
+            "system_instruction": prompt,
+            "speech_config": types.SpeechConfig(
+                voice_config=types.VoiceConfig(
+                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                        voice_name=Config.VOICE
+                    )
+                )
+            ),
+            "realtime_input_config": {
+                "automatic_activity_detection": {"disabled": True}
+            },
+            "tools": tools,
+        }
+
+        tool_count = sum(len(t.get("function_declarations", [])) for t in tools)
+        compiled = CompiledSessionConfig(
+            config=config,
+            content_hash=content_hash,
+            registry_version=registry_version,
+            prompt_tokens=estimate_tokens(prompt),
+            tools_tokens=estimate_tokens(tools_json),
+            tool_count=tool_count,
+            groups=groups,
+        )
+        self._compiled[groups] = compiled
+
+        # セッション開始コストの把握用にサイズを報告
+        logger.info(self.format_report(groups))
+
+        return compiled
+
+    def report(self, groups: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        """セッション設定のサイズレポートを取得"""
+        compiled = self.compiled(groups)
+        return {
+            "groups": self.format_groups(groups),
+            "hash": compiled.content_hash,
+            "prompt_tokens": compiled.prompt_tokens,
+            "tools_tokens": compiled.tools_tokens,
+            "tool_count": compiled.tool_count,
+            "total_tokens": compiled.prompt_tokens + compiled.tools_tokens,
+        }
+
+    @staticmethod
+    def format_groups(groups: Optional[FrozenSet[str]]) -> str:
+        return "全ツール" if groups is None else "+".join(sorted(groups))
+
+    def format_report(self, groups: Optional[FrozenSet[str]] = None) -> str:
+        """ログ出力用のレポート文字列"""
+        r = self.report(groups)
+        return (
+            f"セッション設定[{r['groups']}]: hash={r['hash']}, "
+            f"プロンプト 約{r['prompt_tokens']}トークン, "
+            f"ツール {r['tool_count']}個 約{r['tools_tokens']}トークン, "
+            f"合計 約{r['total_tokens']}トークン"
+        )
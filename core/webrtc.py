@@ -7,7 +7,6 @@ aiortcを使用したWebRTCビデオ通話管理
 
 import asyncio
 import logging
-import subprocess
 import io
 import wave
 import re
@@ -16,6 +15,7 @@ from typing import Optional, Callable, Dict, Any
 from fractions import Fraction
 
 from config import Config
+from .camera import get_camera_service
 
 logger = logging.getLogger("conversation")
 
@@ -64,9 +64,10 @@ def parse_ice_candidate(candidate_str: str) -> Optional[Dict]:
         logger.debug(f"ICE候補パースエラー: {e}")
         return None
 
-# aiortcのデバッグログを有効化
-logging.getLogger("aioice").setLevel(logging.DEBUG)
-logging.getLogger("aiortc").setLevel(logging.DEBUG)
+# aiortcのデバッグログ（接続の調査用。WEBRTC_DEBUG=1 の時だけ）
+if Config.WEBRTC_DEBUG:
+    logging.getLogger("aioice").setLevel(logging.DEBUG)
+    logging.getLogger("aiortc").setLevel(logging.DEBUG)
 
 # aiortcのインポート（インストールされていない場合のフォールバック）
 try:
@@ -114,41 +115,37 @@ except ImportError:
 
 
 class CameraVideoTrack(MediaStreamTrack):
-    """Raspberry Piカメラからのビデオトラック"""
+    """Raspberry Piカメラからのビデオトラック（カメラサービスの購読者）"""
 
     kind = "video"
 
+    SUBSCRIBER_NAME = "webrtc"
+
     def __init__(self):
         super().__init__()
-        self._process = None
         self._running = False
         self._frame_count = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
     async def start(self):
         """カメラ開始"""
         if self._running:
             return
 
-        self._running = True
-        # rpicam-vidでRAW出力（YUV420）
-        cmd = [
-            "rpicam-vid",
-            "-t", "0",  # 無限
-            "--width", str(Config.VIDEO_WIDTH),
-            "--height", str(Config.VIDEO_HEIGHT),
-            "--framerate", str(Config.VIDEO_FPS),
-            "--codec", "yuv420",
-            "-o", "-",  # stdout
-            "-n",  # プレビューなし
-        ]
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=1)
 
         try:
-            self._process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.DEVNULL,
-                bufsize=Config.VIDEO_WIDTH * Config.VIDEO_HEIGHT * 3 // 2
+            # センサーは他の用途（ビジョン・ライフログ）と共有し、通話用のサイズ・レートで受け取る
+            get_camera_service().subscribe(
+                self.SUBSCRIBER_NAME,
+                self._on_frame,
+                fps=Config.VIDEO_FPS,
+                size=(Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT),
+                pixel_format="yuv420p",
             )
+            self._running = True
             logger.info("カメラストリーム開始")
         except Exception as e:
             logger.error(f"カメラ起動エラー: {e}")
@@ -156,49 +153,47 @@ class CameraVideoTrack(MediaStreamTrack):
 
     async def stop(self):
         """カメラ停止"""
-        self._running = False
-        if self._process:
-            self._process.terminate()
-            try:
-                self._process.wait(timeout=2)
-            except subprocess.TimeoutExpired:
-                self._process.kill()
-            self._process = None
+        if self._running:
+            self._running = False
+            get_camera_service().unsubscribe(self.SUBSCRIBER_NAME)
         logger.info("カメラストリーム停止")
 
+    def _on_frame(self, frame) -> None:
+        """カメラの読み取りスレッドから呼ばれる"""
+        if self._loop and self._running:
+            self._loop.call_soon_threadsafe(self._put_latest, frame)
+
+    def _put_latest(self, frame) -> None:
+        """最新フレームだけを保持（送信が遅れたら古いフレームを捨てる）"""
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(frame)
+
+    def _black_frame(self):
+        frame = VideoFrame(width=Config.VIDEO_WIDTH, height=Config.VIDEO_HEIGHT, format="yuv420p")
+        for plane, value in zip(frame.planes, (16, 128, 128)):
+            plane.update(bytes([value]) * plane.buffer_size)
+        return frame
+
     async def recv(self):
         """フレーム取得"""
-        if not self._running or not self._process:
+        frame = None
+        if self._running and self._queue:
+            try:
+                frame = await asyncio.wait_for(self._queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                frame = None
+        else:
             await asyncio.sleep(1.0 / Config.VIDEO_FPS)
-            # 黒フレームを返す
-            frame = VideoFrame(width=Config.VIDEO_WIDTH, height=Config.VIDEO_HEIGHT, format="yuv420p")
-            frame.pts = self._frame_count
-            frame.time_base = Fraction(1, Config.VIDEO_FPS)
-            self._frame_count += 1
-            return frame
 
-        # YUV420データを読み込み（非同期で実行）
-        frame_size = Config.VIDEO_WIDTH * Config.VIDEO_HEIGHT * 3 // 2
-        try:
-            loop = asyncio.get_event_loop()
-            data = await loop.run_in_executor(None, self._process.stdout.read, frame_size)
-            if len(data) != frame_size:
-                await asyncio.sleep(0.01)
-                return await self.recv()
-
-            frame = VideoFrame(width=Config.VIDEO_WIDTH, height=Config.VIDEO_HEIGHT, format="yuv420p")
-            frame.planes[0].update(data[:Config.VIDEO_WIDTH * Config.VIDEO_HEIGHT])
-            frame.planes[1].update(data[Config.VIDEO_WIDTH * Config.VIDEO_HEIGHT:Config.VIDEO_WIDTH * Config.VIDEO_HEIGHT * 5 // 4])
-            frame.planes[2].update(data[Config.VIDEO_WIDTH * Config.VIDEO_HEIGHT * 5 // 4:])
-            frame.pts = self._frame_count
-            frame.time_base = Fraction(1, Config.VIDEO_FPS)
-            self._frame_count += 1
-            return frame
+        # カメラが止まっている間は黒フレームを返す
+        if frame is None:
+            frame = self._black_frame()
 
-        except Exception as e:
-            logger.debug(f"フレーム読み取りエラー: {e}")
-            await asyncio.sleep(0.01)
-            return await self.recv()
+        frame.pts = self._frame_count
+        frame.time_base = Fraction(1, Config.VIDEO_FPS)
+        self._frame_count += 1
+        return frame
 
 
 class AudioTrackFromDevice(MediaStreamTrack):
@@ -9,31 +9,39 @@ raspi-voice10 - Gemini Live API版 Capability UX ベースの音声AIアシス
 import os
 import sys
 import signal
+import argparse
 import asyncio
 import time
 import io
 import wave
 import subprocess
 import tempfile
+import importlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from logging.handlers import RotatingFileHandler
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+# 起動時間の計測の起点（他のモジュールより先に読み込む）
+from core.boot_profile import get_boot_profile
 
 import numpy as np
 
 from config import Config
 from core import (
     AudioHandler,
-    GeminiRealtimeClient,
     generate_startup_sound,
     generate_notification_sound,
     generate_reset_sound,
     FirebaseSignaling,
-    get_video_call_manager,
+    get_camera_service,
+    get_llm_gateway,
     AIORTC_AVAILABLE,
 )
 from capabilities import (
     init_gmail,
+    stop_mailbox_sync,
     init_firebase,
     init_calendar,
     get_firebase_messenger,
@@ -45,8 +53,7 @@ from capabilities import (
     stop_lifelog_thread,
     set_firebase_messenger,
     set_play_audio_callback,
-    pause_lifelog,
-    resume_lifelog,
+    set_live_frame_sender,
     set_videocall_callbacks,
     start_reminder_thread,
     stop_reminder_thread,
@@ -55,8 +62,15 @@ from capabilities import (
     set_music_audio_callbacks,
     is_music_active,
     close_openclaw_client,
+    get_executor,
 )
 
+if TYPE_CHECKING:
+    # Live APIクライアントは接続する時に読み込む（型注釈用）
+    from core.gemini_realtime_client import GeminiRealtimeClient
+
+get_boot_profile().mark("imports")
+
 # systemdで実行時にprint出力をリアルタイムで表示
 sys.stdout.reconfigure(line_buffering=True)
 sys.stderr.reconfigure(line_buffering=True)
@@ -95,13 +109,14 @@ running = True
 button: Optional[object] = None
 is_recording = False
 audio_handler: Optional[AudioHandler] = None
+_audio_backend = None  # シミュレーション時のPyAudio互換バックエンド
 last_button_press_time: float = 0  # ダブルクリック検出用
 DOUBLE_CLICK_THRESHOLD = 0.5  # ダブルクリック判定時間（秒）
 
 # ビデオ通話状態
 _signaling: Optional[FirebaseSignaling] = None
 _pending_incoming_call: Optional[dict] = None
-_gemini_client: Optional[GeminiRealtimeClient] = None
+_gemini_client: Optional["GeminiRealtimeClient"] = None
 
 
 def signal_handler(sig, frame):
@@ -149,11 +164,15 @@ def start_videocall_from_raspi() -> bool:
         logger.warning("ビデオ通話が利用できません")
         return False
 
+    if _main_loop is None:
+        logger.error("メインイベントループが未設定")
+        return False
+
     try:
-        loop = asyncio.get_event_loop()
+        # Capabilityはワーカースレッドで実行されるため、メインループに投入して待つ
         future = asyncio.run_coroutine_threadsafe(
             _start_outgoing_call(),
-            loop
+            _main_loop
         )
         return future.result(timeout=5)
     except Exception as e:
@@ -169,7 +188,7 @@ async def _start_outgoing_call() -> bool:
         return False
 
     try:
-        video_manager = get_video_call_manager()
+        video_manager = _video_call_manager()
 
         # PeerConnection作成
         if not await video_manager.create_peer_connection():
@@ -186,17 +205,14 @@ async def _start_outgoing_call() -> bool:
 
         video_manager.on_ice_candidate = on_ice_candidate
 
-        # ローカルメディア開始（カメラ/マイク）
-        pause_lifelog()  # ライフログ一時停止
+        # ローカルメディア開始（カメラ/マイク。カメラはライフログ・ビジョンと共有）
         if not await video_manager.start_local_media():
-            resume_lifelog()
             return False
 
         # 発信セッション作成
         session_id = _signaling.create_call()
         if not session_id:
             await video_manager.end_call()
-            resume_lifelog()
             return False
 
         # Offer作成・送信
@@ -204,7 +220,6 @@ async def _start_outgoing_call() -> bool:
         if not offer:
             _signaling.end_call(session_id)
             await video_manager.end_call()
-            resume_lifelog()
             return False
 
         _signaling.send_offer(session_id, offer)
@@ -213,7 +228,6 @@ async def _start_outgoing_call() -> bool:
 
     except Exception as e:
         logger.error(f"発信エラー: {e}")
-        resume_lifelog()
         return False
 
 
@@ -222,7 +236,7 @@ def end_videocall() -> bool:
     global _signaling
 
     try:
-        video_manager = get_video_call_manager()
+        video_manager = _video_call_manager()
 
         if _main_loop:
             asyncio.run_coroutine_threadsafe(
@@ -233,7 +247,6 @@ def end_videocall() -> bool:
         if _signaling:
             _signaling.end_call()
 
-        resume_lifelog()  # ライフログ再開
         logger.info("ビデオ通話終了")
         return True
 
@@ -244,7 +257,7 @@ def end_videocall() -> bool:
 
 def is_in_videocall() -> bool:
     """通話中かどうか"""
-    video_manager = get_video_call_manager()
+    video_manager = _video_call_manager()
     return video_manager.is_in_call
 
 
@@ -286,7 +299,7 @@ def on_answer_received(session_id: str, answer: dict) -> None:
 
 async def _handle_answer(answer: dict) -> None:
     """Answer処理（非同期）"""
-    video_manager = get_video_call_manager()
+    video_manager = _video_call_manager()
     await video_manager.handle_answer(answer)
 
 
@@ -325,7 +338,7 @@ def on_ice_candidate_received(session_id: str, candidate: dict) -> None:
 
 async def _handle_ice_candidate(candidate: dict) -> None:
     """ICE候補処理（非同期）"""
-    video_manager = get_video_call_manager()
+    video_manager = _video_call_manager()
     result = await video_manager.add_ice_candidate(candidate)
     logger.info(f"ICE候補追加結果: {result}")
 
@@ -351,9 +364,8 @@ def on_call_ended(session_id: str) -> None:
 
 async def _cleanup_call() -> None:
     """通話終了クリーンアップ"""
-    video_manager = get_video_call_manager()
+    video_manager = _video_call_manager()
     await video_manager.end_call()
-    resume_lifelog()
     _restart_audio_handler()
 
 
@@ -381,7 +393,7 @@ async def accept_incoming_call() -> bool:
     logger.info("=== ビデオ通話応答 ===")
 
     try:
-        video_manager = get_video_call_manager()
+        video_manager = _video_call_manager()
 
         # メインオーディオストリームを停止（デバイス競合回避）
         if audio_handler:
@@ -406,9 +418,7 @@ async def accept_incoming_call() -> bool:
         video_manager.on_ice_candidate = on_ice_candidate
 
         # ローカルメディア開始
-        pause_lifelog()
         if not await video_manager.start_local_media():
-            resume_lifelog()
             _restart_audio_handler()
             return False
 
@@ -416,14 +426,12 @@ async def accept_incoming_call() -> bool:
         offer = session.get("offer")
         if not offer:
             await video_manager.end_call()
-            resume_lifelog()
             _restart_audio_handler()
             return False
 
         answer = await video_manager.handle_offer(offer)
         if not answer:
             await video_manager.end_call()
-            resume_lifelog()
             _restart_audio_handler()
             return False
 
@@ -435,13 +443,19 @@ async def accept_incoming_call() -> bool:
 
     except Exception as e:
         logger.error(f"着信応答エラー: {e}")
-        resume_lifelog()
         _restart_audio_handler()
         return False
 
 
 _main_loop = None  # メインイベントループの参照
 
+
+def _video_call_manager():
+    """ビデオ通話マネージャー（aiortcは初めて使う時に読み込む）"""
+    from core import get_video_call_manager
+    return get_video_call_manager()
+
+
 def init_videocall(loop=None) -> bool:
     """ビデオ通話初期化"""
     global _signaling, _main_loop
@@ -577,15 +591,12 @@ def on_voice_message_received(message):
 
 def transcribe_audio(wav_data: bytes) -> Optional[str]:
     """Gemini APIで音声を文字起こし"""
-    from google import genai
     from google.genai import types
 
     try:
-        client = genai.Client(api_key=Config.get_google_api_key())
-
         # Gemini APIで音声を文字起こし
-        response = client.models.generate_content(
-            model=Config.VISION_MODEL,
+        response = get_llm_gateway().generate(
+            "transcribe",
             contents=[
                 types.Content(
                     role="user",
@@ -670,7 +681,7 @@ def record_voice_message() -> Optional[io.BytesIO]:
     return wav_buffer
 
 
-def send_recorded_voice_message(client: GeminiRealtimeClient) -> bool:
+def send_recorded_voice_message(client: "GeminiRealtimeClient") -> bool:
     """録音した音声をスマホに送信"""
     client.reset_voice_message_mode()
 
@@ -695,7 +706,7 @@ def send_recorded_voice_message(client: GeminiRealtimeClient) -> bool:
         return False
 
 
-async def audio_input_loop(client: GeminiRealtimeClient, audio_handler: AudioHandler):
+async def audio_input_loop(client: "GeminiRealtimeClient", audio_handler: AudioHandler):
     """音声入力ループ"""
     global running, button, is_recording, _pending_incoming_call, last_button_press_time
     chunk_count = 0
@@ -783,6 +794,9 @@ async def audio_input_loop(client: GeminiRealtimeClient, audio_handler: AudioHan
                         if audio_handler.start_input_stream():
                             is_recording = True
                             await client.send_activity_start()
+                            # 話しかけると同時に目の前の映像も渡す（音声の送信は待たせない）
+                            if Config.LIVE_VIDEO_MODE == "press":
+                                asyncio.create_task(client.send_camera_frame())
                         else:
                             continue
 
@@ -815,13 +829,19 @@ async def main_async():
     """非同期メインループ"""
     global running, button, audio_handler
 
+    from core import GeminiRealtimeClient
+
+    boot = get_boot_profile()
+
     # ビデオ通話初期化（正しいイベントループで）
     loop = asyncio.get_running_loop()
-    videocall_ok = init_videocall(loop)
+    with boot.step("videocall"):
+        videocall_ok = init_videocall(loop)
     print(f"ビデオ通話: {'有効' if videocall_ok else '無効'}")
 
-    audio_handler = AudioHandler()
-    audio_handler.start_output_stream()
+    with boot.step("audio"):
+        audio_handler = AudioHandler(_audio_backend)
+        audio_handler.start_output_stream()
 
     # コールバック設定
     set_play_audio_callback(audio_handler.play_audio_buffer)
@@ -831,7 +851,8 @@ async def main_async():
         play_callback=audio_handler.play_audio_buffer
     )
 
-    client = GeminiRealtimeClient(audio_handler)
+    with boot.step("live_client"):
+        client = GeminiRealtimeClient(audio_handler)
     receive_task = None
     input_task = None
     first_start = True
@@ -851,6 +872,21 @@ async def main_async():
     start_alarm_thread()
     start_lifelog_thread()
 
+    # camera_captureの映像をLiveセッションに直接送る（LIVE_VIDEO_MODE）
+    def live_frame_sender(image_data: bytes) -> bool:
+        if not client.is_connected:
+            return False
+        try:
+            return asyncio.run_coroutine_threadsafe(
+                client.send_video_frame(image_data),
+                client.loop
+            ).result(timeout=5)
+        except Exception:
+            return False
+
+    if Config.LIVE_VIDEO_MODE != "off":
+        set_live_frame_sender(live_frame_sender)
+
     # プロアクティブリマインダー通知コールバック
     def reminder_notify(message: str):
         if client.is_connected:
@@ -905,7 +941,8 @@ async def main_async():
                         continue
                 else:
                     try:
-                        await client.connect()
+                        with boot.step("connect") if first_start else nullcontext():
+                            await client.connect()
                     except Exception:
                         await asyncio.sleep(5)
                         continue
@@ -929,6 +966,11 @@ async def main_async():
                         audio_handler.play_audio_buffer(startup_sound)
                     first_start = False
 
+                    ready_ms = boot.mark("ready")
+                    logger.info(f"起動完了: {ready_ms:.0f}ms")
+                    if Config.BOOT_PROFILE:
+                        print(boot.report())
+
             await asyncio.sleep(0.1)
 
         # タスクキャンセル
@@ -956,17 +998,54 @@ async def main_async():
         stop_lifelog_thread()
         stop_reminder_thread()
         stop_music_player()
+        stop_mailbox_sync()
         # OpenClawクリーンアップ
         close_openclaw_client()
+        get_executor().shutdown()
+        get_camera_service().stop()
+        # Gemini呼び出しの遅延・トークン数をログに残す
+        get_llm_gateway().log_stats()
         # ビデオ通話クリーンアップ
         if _signaling:
             _signaling.stop_listening()
 
 
+def parse_args() -> argparse.Namespace:
+    """コマンドライン引数"""
+    parser = argparse.ArgumentParser(description="raspi-voice10 音声AIアシスタント")
+    parser.add_argument("--simulate", action="store_true",
+                        help="実機なしで動かす（ボタン・マイク・スピーカー・カメラを代替）")
+    parser.add_argument("--script", help="ボタン操作スクリプト（省略時は標準入力のEnterで押す/離す）")
+    parser.add_argument("--mic", help="マイク入力にするWAV、またはWAVのディレクトリ（録音ごとに順番に使用）")
+    parser.add_argument("--speaker-out", help="スピーカー出力を書き出すWAV")
+    parser.add_argument("--camera-fixtures", help="カメラの代わりに使う画像・動画のディレクトリ")
+    parser.add_argument("--fast", action="store_true",
+                        help="シミュレーションの音声入出力を実時間で待たない")
+    return parser.parse_args()
+
+
+def setup_simulation(args: argparse.Namespace) -> None:
+    """シミュレーションモードの準備"""
+    global button, _audio_backend
+    from sim import ScriptedButton, WavAudioBackend, install_camera_shims
+
+    install_camera_shims(args.camera_fixtures)
+    _audio_backend = WavAudioBackend(args.mic, args.speaker_out, realtime=not args.fast)
+    button = ScriptedButton(args.script, on_quit=lambda: signal_handler(None, None))
+    Config.USE_BUTTON = True
+
+    print("シミュレーションモード")
+    print(f"  ボタン: {args.script or '標準入力'}")
+    print(f"  マイク: {args.mic or '無音'} / スピーカー: {args.speaker_out or '破棄'}")
+    print(f"  カメラ: {args.camera_fixtures or 'テストパターン'}")
+
+
 def main():
     """エントリーポイント"""
     global running, button
 
+    args = parse_args()
+
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
@@ -977,16 +1056,26 @@ def main():
         print(f"エラー: {e}")
         sys.exit(1)
 
-    # Gmail初期化
-    gmail_ok = init_gmail()
-    print(f"Gmail: {'有効' if gmail_ok else '無効'}")
+    boot = get_boot_profile()
 
-    # カレンダー初期化
-    calendar_ok = init_calendar()
-    print(f"カレンダー: {'有効' if calendar_ok else '無効'}")
+    # Gmail・カレンダー・Firebase・アラームは互いに依存しないので並行して初期化
+    # （一番重いLive APIクライアント（google.genai）の読み込みも並行して済ませておく）
+    with ThreadPoolExecutor(max_workers=5, thread_name_prefix="init") as pool:
+        live_future = pool.submit(boot.run, "live_import", importlib.import_module,
+                                  "core.gemini_realtime_client")
+        gmail_future = pool.submit(boot.run, "gmail", init_gmail)
+        calendar_future = pool.submit(boot.run, "calendar", init_calendar)
+        firebase_future = pool.submit(boot.run, "firebase", init_firebase, on_voice_message_received)
+        alarms_future = pool.submit(boot.run, "alarms", load_alarms)
 
-    # Firebase初期化
-    firebase_ok = init_firebase(on_voice_message_received)
+        gmail_ok = gmail_future.result()
+        calendar_ok = calendar_future.result()
+        firebase_ok = firebase_future.result()
+        alarms_future.result()
+        live_future.result()
+
+    print(f"Gmail: {'有効' if gmail_ok else '無効'}")
+    print(f"カレンダー: {'有効' if calendar_ok else '無効'}")
     print(f"Firebase: {'有効' if firebase_ok else '無効'}")
 
     if firebase_ok:
@@ -996,13 +1085,13 @@ def main():
     # ビデオ通話初期化（asyncio.run内で行う）
     # init_videocallはmain_async内で呼び出す
 
-    # アラーム読み込み
-    load_alarms()
-
     # ボタン初期化
-    if Config.USE_BUTTON and GPIO_AVAILABLE:
+    if args.simulate:
+        setup_simulation(args)
+    elif Config.USE_BUTTON and GPIO_AVAILABLE:
         try:
-            button = Button(Config.BUTTON_PIN, pull_up=True, bounce_time=0.1)
+            with boot.step("button"):
+                button = Button(Config.BUTTON_PIN, pull_up=True, bounce_time=0.1)
             print(f"ボタン: GPIO{Config.BUTTON_PIN}")
         except Exception as e:
             print(f"ボタン初期化エラー: {e}")
@@ -7,7 +7,13 @@ v5との違い:
 - 黒子としての存在を定義
 """
 
-SYSTEM_PROMPT = """あなたはユーザーの代わりに世界と関わる存在です。
+from typing import Iterable, Optional
+
+from config import Config
+
+
+# 共通部分（常に送る）
+_PROMPT_HEAD = """あなたはユーザーの代わりに世界と関わる存在です。
 
 【あなたの本質】
 あなたはアプリを操作しません。
@@ -50,7 +56,10 @@ SYSTEM_PROMPT = """あなたはユーザーの代わりに世界と関わる存
 「メールある？」「返信して」「スマホに連絡」
 → 適切な相手に適切な方法で届ける
 
-■ 予定を管理する
+"""
+
+# ツールグループ別の説明（そのグループのツールを送るセッションのみ含める）
+_PROMPT_CALENDAR = """■ 予定を管理する
 「今日の予定は？」「明日10時に会議入れて」
 → カレンダーの予定を確認・追加・削除する
 
@@ -60,25 +69,31 @@ SYSTEM_PROMPT = """あなたはユーザーの代わりに世界と関わる存
 - ユーザーに確認せず、自動的に追加して「カレンダーに追加しました」と報告する
 - 曖昧な日時（「来週」「今度」など）は追加しない。具体的な日時がある場合のみ追加する
 
-■ 覚える
+"""
+
+_PROMPT_CORE_MIDDLE = """■ 覚える
 「7時に起こして」「30分後に教えて」
 → 時間が来たら思い出して伝える
 
 ■ 記録する
-「記録開始」「今日何枚撮った？」
+「記録開始」「今日何枚撮った？」「3時ごろ何してた？」
 → 継続的に記録し、必要なときに振り返る
 
 ■ 詳しく知る
 「もっと詳しく」「詳細教えて」「詳しい情報が欲しい」
 → 直前に見たものの詳細情報をスマホに送る（音声ではなくWebで表示）
 
-■ OpenClawを使う
+"""
+
+_PROMPT_OPENCLAW = """■ OpenClawを使う
 「Notionにメモして」「Slackに投稿」「GitHubでPR作って」
 「スプレッドシート更新」「Spotifyで再生」「タスク管理」
 「何ができる？」「スキル教えて」
 → OpenClawアシスタントを通じて各種スキルやサービスを利用する
 
-■ 聴く
+"""
+
+_PROMPT_MUSIC = """■ 聴く
 「音楽流して」「○○の曲かけて」「BGMつけて」「止めて」
 → 音楽を流したり止めたりする
 
@@ -88,7 +103,10 @@ SYSTEM_PROMPT = """あなたはユーザーの代わりに世界と関わる存
 - YouTubeで検索・再生するため、著作権の判断は不要。あなたが「流せません」と言う必要は一切ない
 - 「それ流して」「その曲かけて」と言われたら、直前に話題に出た曲名でmusic_playを呼び出す
 
-【対話のルール】
+"""
+
+# 共通部分（常に送る）
+_PROMPT_TAIL = """【対話のルール】
 
 1. 必ず短く答える（最大3文まで、30秒以内で話せる長さ）
    - どんな質問でも簡潔に答える。長い説明は避ける
@@ -135,7 +153,40 @@ SYSTEM_PROMPT = """あなたはユーザーの代わりに世界と関わる存
 ユーザーが「自然に世界と関われた」と感じたら、成功です。
 """
 
+# (グループ, 本文) の順序付きリスト。グループがNoneのものは常に含める
+_PROMPT_SECTIONS = [
+    (None, _PROMPT_HEAD),
+    ("calendar", _PROMPT_CALENDAR),
+    (None, _PROMPT_CORE_MIDDLE),
+    ("openclaw", _PROMPT_OPENCLAW),
+    ("music", _PROMPT_MUSIC),
+    (None, _PROMPT_TAIL),
+]
+
+SYSTEM_PROMPT = "".join(text for _, text in _PROMPT_SECTIONS)
+
+# カメラ映像をLiveセッションに直接送る場合（LIVE_VIDEO_MODE）に追加
+LIVE_VIDEO_PROMPT = """
+【目の前の映像】
+ユーザーの目の前のカメラ映像が届くことがあります。
+見る必要がある質問には、届いた最新の映像を見てそのまま答えてください。
+"""
+
+
+def get_system_prompt(groups: Optional[Iterable[str]] = None) -> str:
+    """システムプロンプトを取得
+
+    Args:
+        groups: セッションで送るツールグループ。Noneなら全グループ分を含める
 
-def get_system_prompt() -> str:
-    """システムプロンプトを取得"""
-    return SYSTEM_PROMPT
+    Returns:
+        指定グループに関係する説明だけを含むシステムプロンプト
+    """
+    live_video = LIVE_VIDEO_PROMPT if Config.LIVE_VIDEO_MODE != "off" else ""
+    if groups is None:
+        return SYSTEM_PROMPT + live_video
+    groups = set(groups)
+    return "".join(
+        text for group, text in _PROMPT_SECTIONS
+        if group is None or group in groups
+    ) + live_video
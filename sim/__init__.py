@@ -0,0 +1,18 @@
+"""
+シミュレーション
+
+実機なし（GPIO・USBマイク/スピーカー・カメラなし）でmain.pyを動かすための代替部品
+- ScriptedButton: スクリプト/標準入力で操作するボタン
+- WavAudioBackend: WAVファイルを入力・出力に使うPyAudio互換バックエンド
+- install_camera_shims: rpicam-still/rpicam-vidをフィクスチャ画像・動画で置き換える
+"""
+
+from .button import ScriptedButton
+from .audio import WavAudioBackend
+from .camera import install_camera_shims
+
+__all__ = [
+    'ScriptedButton',
+    'WavAudioBackend',
+    'install_camera_shims',
+]
@@ -0,0 +1,191 @@
+"""
+シミュレーション用オーディオバックエンド
+
+PyAudio互換のインターフェース（open / get_device_count / get_device_info_by_index / terminate）で、
+マイク入力をWAVファイル、スピーカー出力をWAVファイルに置き換える。
+実デバイスと同じく読み書きは実時間でブロックする（realtime=False で無効化）。
+"""
+
+import logging
+import os
+import threading
+import time
+import wave
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("conversation")
+
+_DEVICES = [
+    {"name": "sim-mic", "maxInputChannels": 1, "maxOutputChannels": 0},
+    {"name": "sim-speaker", "maxInputChannels": 0, "maxOutputChannels": 1},
+]
+
+
+def _load_wav(path: str, rate: int) -> np.ndarray:
+    """WAVを読み込み、モノラル・指定サンプルレートのint16配列に変換"""
+    with wave.open(path, "rb") as wf:
+        channels = wf.getnchannels()
+        src_rate = wf.getframerate()
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"16bit PCMのみ対応: {path}")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if src_rate != rate and len(samples) > 0:
+        target_length = int(len(samples) * rate / src_rate)
+        samples = np.interp(
+            np.linspace(0, len(samples) - 1, target_length),
+            np.arange(len(samples)),
+            samples
+        )
+    return samples.astype(np.int16)
+
+
+def _collect_wavs(path: Optional[str]) -> List[str]:
+    if not path:
+        return []
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(".wav")
+        )
+    return [path]
+
+
+class _InputStream:
+    """WAVファイルを読むマイク入力ストリーム（終端以降は無音）"""
+
+    def __init__(self, samples: np.ndarray, rate: int, realtime: bool):
+        self._samples = samples
+        self._rate = rate
+        self._realtime = realtime
+        self._pos = 0
+        self._started = time.monotonic()
+
+    def read(self, num_frames: int, exception_on_overflow: bool = True) -> bytes:
+        chunk = self._samples[self._pos:self._pos + num_frames]
+        if len(chunk) < num_frames:
+            chunk = np.concatenate([chunk, np.zeros(num_frames - len(chunk), dtype=np.int16)])
+        self._pos += num_frames
+
+        # 実デバイスと同じく、バッファが溜まるまでブロック
+        if self._realtime:
+            wait = self._started + self._pos / self._rate - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        return chunk.tobytes()
+
+    def stop_stream(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _OutputStream:
+    """スピーカー出力ストリーム（WavAudioBackendの出力ファイルに書き込む）"""
+
+    def __init__(self, backend: "WavAudioBackend", rate: int, realtime: bool):
+        self._backend = backend
+        self._rate = rate
+        self._realtime = realtime
+        self._play_until = time.monotonic()
+
+    def write(self, frames: bytes) -> None:
+        self._backend._write_output(frames, self._rate)
+
+        # 実デバイスと同じく、再生が追いつくまでブロック
+        if self._realtime:
+            now = time.monotonic()
+            self._play_until = max(self._play_until, now) + len(frames) / 2 / self._rate
+            wait = self._play_until - now - 0.1  # 100ms分はバッファに溜められる
+            if wait > 0:
+                time.sleep(wait)
+
+    def stop_stream(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class WavAudioBackend:
+    """WAVファイルを使うPyAudio互換バックエンド"""
+
+    def __init__(self, input_path: Optional[str] = None, output_path: Optional[str] = None,
+                 realtime: bool = True):
+        """
+        Args:
+            input_path: マイク入力に使うWAV、またはWAVのディレクトリ（録音開始ごとに順番に使う）
+            output_path: スピーカー出力を書き出すWAV（Noneなら捨てる）
+            realtime: 実時間でブロックするか
+        """
+        self.input_paths = _collect_wavs(input_path)
+        self.output_path = output_path
+        self.realtime = realtime
+
+        self._next_input = 0
+        self._lock = threading.Lock()
+        self._writer: Optional[wave.Wave_write] = None
+        self._writer_rate = 0
+        self.frames_written = 0
+
+        if input_path and not self.input_paths:
+            logger.warning(f"[SIM] マイク入力のWAVが見つかりません: {input_path}")
+
+    # PyAudio互換インターフェース
+
+    def get_device_count(self) -> int:
+        return len(_DEVICES)
+
+    def get_device_info_by_index(self, index: int) -> dict:
+        return dict(_DEVICES[index])
+
+    def open(self, format=None, channels: int = 1, rate: int = 16000,
+             input: bool = False, output: bool = False, **kwargs):
+        if input:
+            return _InputStream(self._next_input_samples(rate), rate, self.realtime)
+        if output:
+            return _OutputStream(self, rate, self.realtime)
+        raise ValueError("input または output を指定してください")
+
+    def terminate(self) -> None:
+        with self._lock:
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+
+    # 内部処理
+
+    def _next_input_samples(self, rate: int) -> np.ndarray:
+        if not self.input_paths:
+            return np.zeros(0, dtype=np.int16)
+        with self._lock:
+            path = self.input_paths[self._next_input % len(self.input_paths)]
+            self._next_input += 1
+        logger.info(f"[SIM] マイク入力: {os.path.basename(path)}")
+        return _load_wav(path, rate)
+
+    def _write_output(self, frames: bytes, rate: int) -> None:
+        if not self.output_path:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = wave.open(self.output_path, "wb")
+                self._writer.setnchannels(1)
+                self._writer.setsampwidth(2)
+                self._writer.setframerate(rate)
+                self._writer_rate = rate
+            if rate != self._writer_rate:
+                samples = np.frombuffer(frames, dtype=np.int16)
+                target_length = int(len(samples) * self._writer_rate / rate)
+                frames = np.interp(
+                    np.linspace(0, len(samples) - 1, target_length),
+                    np.arange(len(samples)),
+                    samples
+                ).astype(np.int16).tobytes()
+            self._writer.writeframes(frames)
+            self.frames_written += len(frames) // 2
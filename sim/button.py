@@ -0,0 +1,127 @@
+"""
+シミュレーション用ボタン
+
+gpiozero.Buttonの代わりにis_pressedを提供する。
+スクリプトファイルを指定するとその通りに押し・離しを行い、
+指定しなければ標準入力のEnterで押す/離すを切り替える（qで終了）。
+
+スクリプトの書式（1行1コマンド、#以降はコメント）:
+    wait 2.0        # 2秒待つ
+    press 1.5       # 1.5秒押して離す（話す）
+    double          # ダブルクリック（セッションリセット）
+    hold            # 押したままにする
+    release         # 離す
+    loop            # 先頭に戻る（ソークテスト用）
+    quit            # 終了
+"""
+
+import logging
+import sys
+import threading
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger("conversation")
+
+DOUBLE_CLICK_INTERVAL = 0.15  # ダブルクリックの押下間隔（秒）
+
+
+def parse_script(text: str) -> List[Tuple[str, float]]:
+    """スクリプトを(コマンド, 引数)のリストに変換"""
+    commands = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        command = parts[0].lower()
+        if command not in ("wait", "press", "double", "hold", "release", "loop", "quit"):
+            raise ValueError(f"{lineno}行目: 不明なコマンド '{parts[0]}'")
+        arg = float(parts[1]) if len(parts) > 1 else 0.0
+        commands.append((command, arg))
+    return commands
+
+
+class ScriptedButton:
+    """スクリプト/標準入力で操作するボタン（gpiozero.Button互換のis_pressed）"""
+
+    def __init__(self, script_path: Optional[str] = None,
+                 on_quit: Optional[Callable[[], None]] = None):
+        self._pressed = False
+        self._on_quit = on_quit
+        self._stop = threading.Event()
+
+        if script_path:
+            with open(script_path, "r", encoding="utf-8") as f:
+                commands = parse_script(f.read())
+            target = lambda: self._run_script(commands)
+        else:
+            target = self._run_stdin
+
+        self._thread = threading.Thread(target=target, daemon=True, name="sim-button")
+        self._thread.start()
+
+    @property
+    def is_pressed(self) -> bool:
+        return self._pressed
+
+    def _set(self, pressed: bool) -> None:
+        if self._pressed != pressed:
+            self._pressed = pressed
+            logger.info(f"[SIM] ボタン{'押下' if pressed else '解放'}")
+
+    def _sleep(self, seconds: float) -> bool:
+        """待機（停止要求があればFalse）"""
+        return not self._stop.wait(seconds)
+
+    def _quit(self) -> None:
+        self._set(False)
+        logger.info("[SIM] 終了")
+        if self._on_quit:
+            self._on_quit()
+
+    def _run_script(self, commands: List[Tuple[str, float]]) -> None:
+        index = 0
+        while index < len(commands) and not self._stop.is_set():
+            command, arg = commands[index]
+            index += 1
+
+            if command == "wait":
+                self._sleep(arg)
+            elif command == "press":
+                self._set(True)
+                self._sleep(arg or 1.0)
+                self._set(False)
+            elif command == "double":
+                self._set(True)
+                self._sleep(0.05)
+                self._set(False)
+                self._sleep(DOUBLE_CLICK_INTERVAL)
+                self._set(True)
+                self._sleep(0.05)
+                self._set(False)
+            elif command == "hold":
+                self._set(True)
+            elif command == "release":
+                self._set(False)
+            elif command == "loop":
+                index = 0
+            elif command == "quit":
+                self._quit()
+                return
+
+        self._set(False)
+
+    def _run_stdin(self) -> None:
+        print("[SIM] Enterで押す/離す、qで終了")
+        for line in sys.stdin:
+            if self._stop.is_set():
+                return
+            if line.strip().lower() == "q":
+                self._quit()
+                return
+            self._set(not self._pressed)
+        self._quit()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._set(False)
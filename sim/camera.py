@@ -0,0 +1,218 @@
+"""
+シミュレーション用カメラ
+
+rpicam-still / rpicam-vid と同じ引数で呼べる代替コマンドを sim/bin に置き、
+PATHの先頭に追加して実カメラの代わりにフィクスチャ画像・動画を返す（PyAV使用）。
+
+フィクスチャ（SIM_CAMERA_FIXTURES のディレクトリ）:
+- 画像（.jpg/.jpeg/.png）: rpicam-stillは呼ばれるたびに順番に返す、rpicam-vidは順番にスライド表示
+- 動画（.mp4/.mkv/.avi/.mov）: rpicam-vidはループ再生、rpicam-stillは先頭フレーム
+- どちらもなければ動くテストパターン
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from fractions import Fraction
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
+BIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bin")
+FIXTURES_ENV = "SIM_CAMERA_FIXTURES"
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+VIDEO_EXTS = (".mp4", ".mkv", ".avi", ".mov")
+
+SLIDE_SECONDS = 5.0  # rpicam-vidで画像フィクスチャを切り替える間隔
+
+
+def install_camera_shims(fixtures_dir: Optional[str] = None) -> None:
+    """rpicam-still / rpicam-vid をシミュレーション版に差し替える（このプロセスと子プロセス）"""
+    os.environ["PATH"] = BIN_DIR + os.pathsep + os.environ.get("PATH", "")
+    if fixtures_dir:
+        os.environ[FIXTURES_ENV] = os.path.abspath(fixtures_dir)
+
+
+def _fixtures(exts) -> List[str]:
+    directory = os.environ.get(FIXTURES_ENV)
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(exts)
+    )
+
+
+def _next_index() -> int:
+    """rpicam-stillの呼び出し回数（フィクスチャ画像を順番に返すため）"""
+    path = os.path.join(tempfile.gettempdir(), f"sim_camera_index_{os.getuid()}")
+    try:
+        with open(path, "r") as f:
+            index = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        index = 0
+    try:
+        with open(path, "w") as f:
+            f.write(str(index + 1))
+    except OSError:
+        pass
+    return index
+
+
+def _parse(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-o", "--output", default=None)
+    parser.add_argument("-t", "--timeout", type=int, default=5000)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--framerate", type=float, default=30)
+    parser.add_argument("--codec", default="h264")
+    parser.add_argument("-q", "--quality", type=int, default=93)
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def _first_frame(path: str):
+    with av.open(path) as container:
+        for frame in container.decode(video=0):
+            return frame
+    raise ValueError(f"フレームがありません: {path}")
+
+
+def _test_pattern(width: int, height: int, index: int):
+    """動くテストパターン（縦縞のグラデーション + 移動するバー）"""
+    x = np.linspace(0, 255, width, dtype=np.uint8)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:, :, 0] = x
+    image[:, :, 1] = x[::-1]
+    image[:, :, 2] = 128
+    bar = (index * 8) % width
+    image[:, bar:bar + 16] = 255
+    return av.VideoFrame.from_ndarray(image, format="rgb24")
+
+
+def _frames(args: argparse.Namespace) -> Iterator:
+    """rpicam-vid用のフレーム列（無限）"""
+    videos = _fixtures(VIDEO_EXTS)
+    images = _fixtures(IMAGE_EXTS)
+    index = 0
+    if videos:
+        while True:
+            with av.open(videos[0]) as container:
+                for frame in container.decode(video=0):
+                    yield frame
+    elif images:
+        frames = [_first_frame(path) for path in images]
+        per_slide = max(1, int(SLIDE_SECONDS * args.framerate))
+        while True:
+            yield frames[(index // per_slide) % len(frames)]
+            index += 1
+    else:
+        while True:
+            yield _test_pattern(args.width, args.height, index)
+            index += 1
+
+
+def _jpeg_encoder(width: int, height: int, qscale: int):
+    ctx = av.CodecContext.create("mjpeg", "w")
+    ctx.width = width
+    ctx.height = height
+    ctx.pix_fmt = "yuvj420p"
+    ctx.time_base = Fraction(1, 30)
+    ctx.qmin = ctx.qmax = qscale
+    ctx.open()
+    return ctx
+
+
+def rpicam_still(argv: List[str]) -> int:
+    """rpicam-stillの代替: フィクスチャ画像を指定サイズのJPEGで出力"""
+    if not AV_AVAILABLE:
+        print("rpicam-still(sim): PyAVがインストールされていません", file=sys.stderr)
+        return 1
+
+    args = _parse(argv)
+    if not args.output:
+        print("rpicam-still(sim): -o が必要です", file=sys.stderr)
+        return 1
+
+    # 実機と同じく -t の間（露出調整）待つ
+    time.sleep(max(0, args.timeout) / 1000)
+
+    images = _fixtures(IMAGE_EXTS)
+    videos = _fixtures(VIDEO_EXTS)
+    if images:
+        frame = _first_frame(images[_next_index() % len(images)])
+    elif videos:
+        frame = _first_frame(videos[0])
+    else:
+        frame = _test_pattern(args.width, args.height, _next_index())
+
+    qscale = max(2, min(31, round(31 - args.quality * 29 / 100)))
+    encoder = _jpeg_encoder(args.width, args.height, qscale)
+    frame = frame.reformat(width=args.width, height=args.height, format="yuvj420p")
+    packets = encoder.encode(frame) + encoder.encode(None)
+
+    with open(args.output, "wb") as f:
+        for packet in packets:
+            f.write(bytes(packet))
+    return 0
+
+
+def rpicam_vid(argv: List[str]) -> int:
+    """rpicam-vidの代替: フィクスチャをyuv420 / mjpeg / h264のストリームで出力"""
+    if not AV_AVAILABLE:
+        print("rpicam-vid(sim): PyAVがインストールされていません", file=sys.stderr)
+        return 1
+
+    args = _parse(argv)
+    out = sys.stdout.buffer if args.output in (None, "-") else open(args.output, "wb")
+    codec = args.codec.lower()
+
+    encoder = None
+    if codec == "mjpeg":
+        encoder = _jpeg_encoder(args.width, args.height, 5)
+    elif codec != "yuv420":
+        encoder = av.CodecContext.create("libx264", "w")
+        encoder.width = args.width
+        encoder.height = args.height
+        encoder.pix_fmt = "yuv420p"
+        encoder.time_base = Fraction(1, int(args.framerate))
+        encoder.options = {"preset": "ultrafast", "tune": "zerolatency"}
+        encoder.open()
+
+    interval = 1.0 / args.framerate
+    started = time.monotonic()
+    deadline = started + args.timeout / 1000 if args.timeout > 0 else None
+
+    try:
+        for index, frame in enumerate(_frames(args)):
+            # 実機と同じフレームレートで出力
+            due = started + index * interval
+            now = time.monotonic()
+            if deadline and now >= deadline:
+                break
+            if due > now:
+                time.sleep(due - now)
+
+            if encoder is None:
+                data = frame.reformat(width=args.width, height=args.height,
+                                      format="yuv420p").to_ndarray().tobytes()
+            else:
+                frame = frame.reformat(width=args.width, height=args.height,
+                                       format=encoder.pix_fmt)
+                frame.pts = index
+                data = b"".join(bytes(p) for p in encoder.encode(frame))
+            out.write(data)
+            out.flush()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+    return 0